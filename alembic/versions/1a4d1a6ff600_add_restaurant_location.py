@@ -0,0 +1,45 @@
+"""add restaurant location
+
+Revision ID: 1a4d1a6ff600
+Revises: a02ff15713f0
+Create Date: 2023-02-04 10:12:31.402117
+
+"""
+import geoalchemy2  # POSTGIS
+import sqlalchemy as sa
+import sqlmodel  # NEW
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1a4d1a6ff600"
+down_revision = "a02ff15713f0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    # Adding a stored generated column rewrites the table, which backfills
+    # `location` for every existing row.
+    op.add_column(
+        "restaurant",
+        sa.Column(
+            "location",
+            geoalchemy2.types.Geography(geometry_type="POINT", srid=4326),
+            sa.Computed("ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography"),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "idx_restaurant_location",
+        "restaurant",
+        ["location"],
+        unique=False,
+        postgresql_using="gist",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_restaurant_location", table_name="restaurant")
+    op.drop_column("restaurant", "location")
@@ -0,0 +1,46 @@
+"""add restaurant search text
+
+Revision ID: 3b8e1f0c27d4
+Revises: f6e237e5552c
+Create Date: 2023-02-10 11:05:42.731946
+
+"""
+import geoalchemy2  # POSTGIS
+import sqlalchemy as sa
+import sqlmodel  # NEW
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3b8e1f0c27d4"
+down_revision = "f6e237e5552c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Like `location`, adding the stored generated column rewrites the table
+    # and backfills it for every existing row
+    op.add_column(
+        "restaurant",
+        sa.Column(
+            "search_text",
+            sa.Text(),
+            sa.Computed("name || ' ' || street || ' ' || city || ' ' || state"),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_restaurant_search_text_trgm",
+        "restaurant",
+        ["search_text"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"search_text": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_restaurant_search_text_trgm", table_name="restaurant")
+    op.drop_column("restaurant", "search_text")
@@ -0,0 +1,66 @@
+"""add restaurant listing indexes
+
+Revision ID: 4e6ec4da46e0
+Revises: 1a4d1a6ff600
+Create Date: 2023-02-06 18:40:02.118354
+
+"""
+import geoalchemy2  # POSTGIS
+import sqlalchemy as sa
+import sqlmodel  # NEW
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4e6ec4da46e0"
+down_revision = "1a4d1a6ff600"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The keyset pagination sorts on (created_at, id), rows without
+    # created_at would never be reached by a cursor
+    op.execute("UPDATE restaurant SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column(
+        "restaurant",
+        "created_at",
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text("now()"),
+        nullable=False,
+    )
+    op.create_index(
+        "ix_restaurant_created_at_id", "restaurant", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_restaurant_city_created_at_id",
+        "restaurant",
+        ["city", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_restaurant_state_created_at_id",
+        "restaurant",
+        ["state", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_restaurant_rating_created_at_id",
+        "restaurant",
+        ["rating", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_restaurant_rating_created_at_id", table_name="restaurant")
+    op.drop_index("ix_restaurant_state_created_at_id", table_name="restaurant")
+    op.drop_index("ix_restaurant_city_created_at_id", table_name="restaurant")
+    op.drop_index("ix_restaurant_created_at_id", table_name="restaurant")
+    op.alter_column(
+        "restaurant",
+        "created_at",
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text("now()"),
+        nullable=True,
+    )
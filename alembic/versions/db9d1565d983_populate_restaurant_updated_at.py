@@ -0,0 +1,41 @@
+"""populate restaurant updated_at
+
+Revision ID: db9d1565d983
+Revises: 4e6ec4da46e0
+Create Date: 2023-02-07 10:12:45.503218
+
+"""
+import geoalchemy2  # POSTGIS
+import sqlalchemy as sa
+import sqlmodel  # NEW
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "db9d1565d983"
+down_revision = "4e6ec4da46e0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # `updated_at` is the validator of the conditional requests, every row
+    # needs one from the moment it is inserted
+    op.execute("UPDATE restaurant SET updated_at = created_at WHERE updated_at IS NULL")
+    op.alter_column(
+        "restaurant",
+        "updated_at",
+        existing_type=sa.DateTime(timezone=True),
+        server_default=sa.text("now()"),
+        nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "restaurant",
+        "updated_at",
+        existing_type=sa.DateTime(timezone=True),
+        server_default=None,
+        nullable=True,
+    )
@@ -0,0 +1,151 @@
+"""add restaurant cell rollup
+
+Revision ID: f6e237e5552c
+Revises: db9d1565d983
+Create Date: 2023-02-08 09:31:17.264113
+
+"""
+import geoalchemy2  # POSTGIS
+import sqlalchemy as sa
+import sqlmodel  # NEW
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f6e237e5552c"
+down_revision = "db9d1565d983"
+branch_labels = None
+depends_on = None
+
+# Same sizes as `ROLLUP_CELL_SIZES`, frozen for this revision
+LEVELS = "(VALUES (0, 1.0::float8), (1, 0.1::float8), (2, 0.01::float8))"
+
+
+def cell_totals(rows: str) -> str:
+    # `rows` is one of the relation names of this revision, never user input
+    return (
+        "SELECT l.level,"  # nosec B608
+        f"""
+               floor(r.lat / l.size)::int AS cell_y,
+               floor(r.lng / l.size)::int AS cell_x,
+               count(*) AS count,
+               sum(r.rating) AS rating_sum,
+               sum(r.rating * r.rating) AS rating_sq_sum
+        FROM {rows} AS r CROSS JOIN {LEVELS} AS l(level, size)
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        """
+    )
+
+
+# The ratings and cells an update moved out and into, as multisets. Updates
+# of other columns cancel out and leave the rollups alone, which an `UPDATE
+# OF` trigger can't do, as triggers with transition tables take no columns.
+MOVED_OUT = (
+    "(SELECT lat, lng, rating FROM old_rows"
+    " EXCEPT ALL SELECT lat, lng, rating FROM new_rows)"
+)
+MOVED_IN = (
+    "(SELECT lat, lng, rating FROM new_rows"
+    " EXCEPT ALL SELECT lat, lng, rating FROM old_rows)"
+)
+
+
+def subtract_totals(rows: str) -> str:
+    return (
+        "UPDATE restaurant_cell_rollup AS c"  # nosec B608
+        f"""
+        SET count = c.count - o.count,
+            rating_sum = c.rating_sum - o.rating_sum,
+            rating_sq_sum = c.rating_sq_sum - o.rating_sq_sum
+        FROM ({cell_totals(rows)}) AS o
+        WHERE c.level = o.level
+          AND c.cell_y = o.cell_y
+          AND c.cell_x = o.cell_x;
+        """
+    )
+
+
+def add_totals(rows: str) -> str:
+    return (
+        "INSERT INTO restaurant_cell_rollup AS c"  # nosec B608
+        f"""
+        {cell_totals(rows)}
+        ON CONFLICT (level, cell_y, cell_x) DO UPDATE
+        SET count = c.count + excluded.count,
+            rating_sum = c.rating_sum + excluded.rating_sum,
+            rating_sq_sum = c.rating_sq_sum + excluded.rating_sq_sum;
+        """
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "restaurant_cell_rollup",
+        sa.Column("level", sa.Integer(), nullable=False),
+        sa.Column("cell_y", sa.Integer(), nullable=False),
+        sa.Column("cell_x", sa.Integer(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column("rating_sum", sa.BigInteger(), nullable=False),
+        sa.Column("rating_sq_sum", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("level", "cell_y", "cell_x"),
+    )
+
+    # One function for the three triggers, a trigger with transition tables
+    # can't fire on several events. Totals come out in key order, so
+    # concurrent writers tend to lock the cells in the same order.
+    # Only the queries of this revision are interpolated
+    op.execute(
+        "CREATE FUNCTION restaurant_cell_rollup_apply() "  # nosec B608
+        f"""RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                {subtract_totals("old_rows")}
+            ELSIF TG_OP = 'INSERT' THEN
+                {add_totals("new_rows")}
+            ELSE
+                {subtract_totals(MOVED_OUT)}
+                {add_totals(MOVED_IN)}
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER restaurant_cell_rollup_insert
+        AFTER INSERT ON restaurant
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION restaurant_cell_rollup_apply()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER restaurant_cell_rollup_update
+        AFTER UPDATE ON restaurant
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION restaurant_cell_rollup_apply()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER restaurant_cell_rollup_delete
+        AFTER DELETE ON restaurant
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION restaurant_cell_rollup_apply()
+        """
+    )
+
+    # The triggers hold a lock blocking writes until the migration commits,
+    # so no row is counted twice
+    op.execute(f"INSERT INTO restaurant_cell_rollup {cell_totals('restaurant')}")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER restaurant_cell_rollup_delete ON restaurant")
+    op.execute("DROP TRIGGER restaurant_cell_rollup_update ON restaurant")
+    op.execute("DROP TRIGGER restaurant_cell_rollup_insert ON restaurant")
+    op.execute("DROP FUNCTION restaurant_cell_rollup_apply()")
+    op.drop_table("restaurant_cell_rollup")
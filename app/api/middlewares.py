@@ -0,0 +1,88 @@
+# isort: skip_file
+import time
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import request_scope
+from app.infrastructure.request_metrics import (
+    QueryStats,
+    RequestMetrics,
+    query_stats,
+    request_metrics,
+)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+MAX_REQUEST_ID_LENGTH = 128
+
+
+class RequestContextMiddleware:
+    """
+    Gives every request an id, taken from the `X-Request-ID` header when the
+    client sends one, exposes the request to the logs and echoes the id in
+    the response
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH:
+            request_id = uuid4().hex
+        scope["request_id"] = request_id
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_scope.reset(token)
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, response status and database usage of every
+    request, labelled by the template of the route it matched
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Unhandled errors end up as a 500 from the outer error middleware
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        self.metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - start
+            self.metrics.in_flight -= 1
+            query_stats.reset(token)
+            # Set by the router, once the request has been matched
+            route = getattr(scope.get("route"), "path", None)
+            self.metrics.observe(scope["method"], route, status, seconds, stats)
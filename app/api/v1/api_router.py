@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 
+from .routes.monitoring_routes import router as monitoring_routes
 from .routes.restaurant_routes import router as restaurant_routes
 
 router = APIRouter()
 router.include_router(restaurant_routes, prefix="/restaurants", tags=["restaurants"])
+router.include_router(monitoring_routes, prefix="/monitoring", tags=["monitoring"])
@@ -0,0 +1,58 @@
+from datetime import datetime as dt
+from typing import Optional
+
+from fastapi import Header, HTTPException, Query, status
+
+from app.schemas import Restaurant, RestaurantFilter
+from app.utils.conditional import Preconditions, parse_if_match
+
+
+def get_restaurant_filter(
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    min_rating: Optional[int] = Query(None, ge=0, le=4),
+    max_rating: Optional[int] = Query(None, ge=0, le=4),
+) -> RestaurantFilter:
+    return RestaurantFilter(
+        city=city, state=state, min_rating=min_rating, max_rating=max_rating
+    )
+
+
+def get_fields(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma separated columns to return, all of them by default",
+        example="id,name,lat,lng",
+    ),
+) -> Optional[list[str]]:
+    """
+    Parses a sparse fieldset, returning the requested columns in the order of
+    the response schema, or None when every column is requested
+    """
+    if fields is None:
+        return None
+
+    requested = {name.strip() for name in fields.split(",")} - {""}
+    unknown = requested - Restaurant.__fields__.keys()
+    if not requested or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}, expected "
+            f"some of {', '.join(Restaurant.__fields__)}"
+            if unknown
+            else "No fields requested",
+        )
+    return [name for name in Restaurant.__fields__ if name in requested]
+
+
+def get_preconditions(
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+) -> Preconditions:
+    return Preconditions(
+        if_none_match=if_none_match, if_modified_since=if_modified_since
+    )
+
+
+def get_if_match(if_match: Optional[str] = Header(None)) -> Optional[list[dt]]:
+    return parse_if_match(if_match)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+
+from app.infrastructure.db import get_db_pool_status
+from app.infrastructure.statistics_cache import statistics_cache
+
+router = APIRouter()
+
+
+@router.get("/pool")
+async def get_pool_status() -> dict:
+    """
+    Connection pool usage of this worker and the time spent waiting
+    for a connection on checkout
+    """
+    return get_db_pool_status()
+
+
+@router.get("/cache")
+async def get_cache_status() -> dict:
+    """
+    Size and hit ratio of this worker's radius statistics cache
+    """
+    return statistics_cache.stats()
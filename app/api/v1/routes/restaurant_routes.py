@@ -1,23 +1,166 @@
 # isort: skip_file
 import json
+from datetime import datetime as dt
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 
-from app.core import get_logger
-from app.models import Restaurant
-from app.schemas import RestaurantCountResponse, RestaurantCreate, RestaurantUpdate
+from app.api.v1.dependencies import (
+    get_fields,
+    get_if_match,
+    get_preconditions,
+    get_restaurant_filter,
+)
+from app.core import get_app_settings, get_logger
+from app.schemas import (
+    ExportFormat,
+    Restaurant,
+    RestaurantBulkDelete,
+    RestaurantBulkResult,
+    RestaurantBulkUpdate,
+    RestaurantCountResponse,
+    RestaurantCreate,
+    RestaurantFilter,
+    RestaurantGrid,
+    RestaurantImportJob,
+    RestaurantNearestPage,
+    RestaurantPage,
+    RestaurantSearchPage,
+    RestaurantUpdate,
+    StatisticsCircle,
+)
 from app.services.restaurant_services import RestaurantService
+from app.utils.conditional import (
+    Preconditions,
+    entity_etag,
+    listing_etag,
+    not_modified_response,
+    set_validators,
+)
 from app.utils.errors import AppError
+from app.utils.serialization import FastJSONResponse, project
 
 logger = get_logger(__name__)
+settings = get_app_settings()
 router = APIRouter()
 
 
-@router.get("/", response_model=list[Restaurant])
+@router.get("/", response_model=RestaurantPage)
 async def get_all_restaurants(
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    filters: RestaurantFilter = Depends(get_restaurant_filter),
+    fields: Optional[list[str]] = Depends(get_fields),
+    preconditions: Preconditions = Depends(get_preconditions),
     restaurant_service: RestaurantService = Depends(),
-) -> list[Restaurant]:
-    return restaurant_service.get_all()
+) -> RestaurantPage:
+    result = await restaurant_service.get_page(
+        limit, cursor, descending, filters, fields
+    )
+    if isinstance(result, AppError):
+        raise HTTPException(detail=result.message, status_code=result.error_type)
+
+    # The page is validated by its own rows, a table-wide version would
+    # need a full count on every poll
+    etag = listing_etag(
+        ((r["id"], r["updated_at"]) for r in result.data), result.next_cursor, fields
+    )
+    if preconditions.not_modified(etag):
+        return not_modified_response(etag)
+
+    data = result.data
+    if fields is not None:
+        data = [project(row, fields) for row in data]
+
+    # Rows already match `RestaurantPage`, skip its validation and encoding
+    response = FastJSONResponse({"data": data, "next_cursor": result.next_cursor})
+    set_validators(response, etag)
+    return response
+
+
+@router.get("/nearest", response_model=RestaurantNearestPage)
+async def get_nearest_restaurants(
+    latitude: float,
+    longitude: float,
+    k: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE),
+    max_distance: Optional[float] = Query(None, gt=0),
+    cursor: Optional[str] = None,
+    filters: RestaurantFilter = Depends(get_restaurant_filter),
+    restaurant_service: RestaurantService = Depends(),
+) -> RestaurantNearestPage:
+    result = await restaurant_service.get_nearest(
+        latitude, longitude, k, max_distance, cursor, filters
+    )
+    if isinstance(result, AppError):
+        raise HTTPException(detail=result.message, status_code=result.error_type)
+
+    return result
+
+
+@router.get("/search", response_model=RestaurantSearchPage)
+async def search_restaurants(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    radius: Optional[float] = Query(None, gt=0),
+    filters: RestaurantFilter = Depends(get_restaurant_filter),
+    restaurant_service: RestaurantService = Depends(),
+) -> RestaurantSearchPage:
+    query = q.strip()
+    if not query:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Empty search"
+        )
+
+    circle = (latitude, longitude, radius)
+    if any(value is None for value in circle):
+        if any(value is not None for value in circle):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="latitude, longitude and radius must be given together",
+            )
+        circle = None
+
+    result = await restaurant_service.search(query, limit, cursor, filters, circle)
+    if isinstance(result, AppError):
+        raise HTTPException(detail=result.message, status_code=result.error_type)
+
+    return result
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_restaurants(
+    format: ExportFormat = ExportFormat.ndjson,
+    fields: Optional[list[str]] = Depends(get_fields),
+    restaurant_service: RestaurantService = Depends(),
+) -> StreamingResponse:
+    result = await restaurant_service.export(format, fields)
+    if isinstance(result, AppError):
+        raise HTTPException(detail=result.message, status_code=result.error_type)
+
+    media_type = "application/json"
+    if format == ExportFormat.ndjson:
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        result,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=restaurants.{format.value}"
+        },
+    )
 
 
 @router.get("/statistics", response_model=RestaurantCountResponse, tags=["statistics"])
@@ -27,7 +170,40 @@ async def count_restaurants_by_radius(
     radius: int,
     restaurant_service: RestaurantService = Depends(),
 ) -> RestaurantCountResponse:
-    result = restaurant_service.count_restaurants_by_radius(latitude, longitude, radius)
+    result = await restaurant_service.count_restaurants_by_radius(
+        latitude, longitude, radius
+    )
+
+    if isinstance(result, AppError):
+        raise HTTPException(detail=result.message, status_code=result.error_type)
+
+    return result
+
+
+@router.get("/statistics/grid", response_model=RestaurantGrid, tags=["statistics"])
+async def get_statistics_grid(
+    bbox: str,
+    cell_size: float = Query(..., gt=0),
+    restaurant_service: RestaurantService = Depends(),
+) -> RestaurantGrid:
+    result = await restaurant_service.grid_statistics(bbox, cell_size)
+
+    if isinstance(result, AppError):
+        raise HTTPException(detail=result.message, status_code=result.error_type)
+
+    return result
+
+
+@router.post(
+    "/statistics/batch",
+    response_model=list[RestaurantCountResponse],
+    tags=["statistics"],
+)
+async def count_restaurants_by_radius_batch(
+    circles: list[StatisticsCircle],
+    restaurant_service: RestaurantService = Depends(),
+) -> list[RestaurantCountResponse]:
+    result = await restaurant_service.count_restaurants_by_radius_batch(circles)
 
     if isinstance(result, AppError):
         raise HTTPException(detail=result.message, status_code=result.error_type)
@@ -38,11 +214,34 @@ async def count_restaurants_by_radius(
 @router.get("/{id}", response_model=Restaurant)
 async def get_restaurant_by_id(
     id: str,
+    fields: Optional[list[str]] = Depends(get_fields),
+    preconditions: Preconditions = Depends(get_preconditions),
     restaurant_service: RestaurantService = Depends(),
 ) -> Restaurant:
-    restaurant = restaurant_service.get(id)
+    if preconditions.present:
+        # Revalidation only needs the version, not the row
+        updated_at = await restaurant_service.get_version(id)
+        if isinstance(updated_at, AppError):
+            raise HTTPException(
+                detail=updated_at.message, status_code=updated_at.error_type
+            )
+        if updated_at:
+            etag = entity_etag(updated_at, fields)
+            if preconditions.not_modified(etag, updated_at):
+                return not_modified_response(etag, updated_at)
+
+    restaurant = await restaurant_service.get(id, fields)
+    if isinstance(restaurant, AppError):
+        raise HTTPException(detail=restaurant.message, status_code=restaurant.error_type)
+
     if restaurant:
-        return restaurant
+        updated_at = restaurant["updated_at"]
+        if fields is not None:
+            restaurant = project(restaurant, fields)
+        response = FastJSONResponse(restaurant)
+        if updated_at:
+            set_validators(response, entity_etag(updated_at, fields), updated_at)
+        return response
     else:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Restaurant not found"
@@ -54,7 +253,7 @@ async def create_restaurant(
     restaurant: RestaurantCreate,
     restaurant_service: RestaurantService = Depends(),
 ) -> Restaurant:
-    result = restaurant_service.create(restaurant)
+    result = await restaurant_service.create(restaurant)
     if isinstance(result, AppError):
         raise HTTPException(detail=result.message, status_code=result.error_type)
 
@@ -67,12 +266,12 @@ async def bulk_create_restaurants(
     restaurant_service: RestaurantService = Depends(),
 ) -> Response:
 
-    result = restaurant_service.bulk_create(restaurants)
+    result = await restaurant_service.bulk_create(restaurants)
     if isinstance(result, AppError):
         raise HTTPException(detail=result.message, status_code=result.error_type)
 
     return Response(
-        content=json.dumps({"data": "Restaurants created succesfully"}),
+        content=json.dumps({"data": "Restaurants created succesfully", "ids": result}),
         status_code=201,
         headers={"Content-Type": "application/json"},
     )
@@ -81,39 +280,97 @@ async def bulk_create_restaurants(
 @router.post("/bulk_create_from_csv")
 async def bulk_create_restaurants_from_csv(
     csv_file: UploadFile,
+    background: bool = Query(
+        False, description="Import in a background job, tracked at /imports/{id}"
+    ),
     restaurant_service: RestaurantService = Depends(),
 ) -> Response:
-    result = restaurant_service.bulk_create_from_csv(csv_file)
+    if background:
+        job = await restaurant_service.start_csv_import(csv_file)
+        if isinstance(job, AppError):
+            raise HTTPException(detail=job.message, status_code=job.error_type)
+
+        return Response(
+            content=RestaurantImportJob(**job.to_dict()).json(),
+            status_code=202,
+            headers={
+                "Content-Type": "application/json",
+                "Location": f"{settings.API_V1_STR}/restaurants/imports/{job.id}",
+            },
+        )
+
+    result = await restaurant_service.bulk_create_from_csv(csv_file)
     if isinstance(result, AppError):
         raise HTTPException(detail=result.message, status_code=result.error_type)
 
     return Response(
-        content=json.dumps({"data": "Restaurants created succesfully"}),
+        content=json.dumps({"data": "Restaurants created succesfully", **result.dict()}),
         status_code=201,
         headers={"Content-Type": "application/json"},
     )
 
 
+@router.get("/imports/{id}", response_model=RestaurantImportJob)
+async def get_import_job(
+    id: str,
+    restaurant_service: RestaurantService = Depends(),
+) -> RestaurantImportJob:
+    job = restaurant_service.get_import_job(id)
+    if isinstance(job, AppError):
+        raise HTTPException(detail=job.message, status_code=job.error_type)
+
+    return RestaurantImportJob(**job.to_dict())
+
+
+@router.patch("/bulk", response_model=RestaurantBulkResult)
+async def bulk_update_restaurants(
+    restaurants: list[RestaurantBulkUpdate],
+    restaurant_service: RestaurantService = Depends(),
+) -> RestaurantBulkResult:
+    result = await restaurant_service.bulk_update(restaurants)
+    if isinstance(result, AppError):
+        raise HTTPException(detail=result.message, status_code=result.error_type)
+
+    return result
+
+
+@router.post("/bulk_delete", response_model=RestaurantBulkResult)
+async def bulk_delete_restaurants(
+    request: RestaurantBulkDelete,
+    restaurant_service: RestaurantService = Depends(),
+) -> RestaurantBulkResult:
+    result = await restaurant_service.bulk_delete(request)
+    if isinstance(result, AppError):
+        raise HTTPException(detail=result.message, status_code=result.error_type)
+
+    return result
+
+
 @router.put("/{id}", response_model=Restaurant)
 async def update_restaurant(
     id: str,
     restaurant: RestaurantUpdate,
+    versions: Optional[list[dt]] = Depends(get_if_match),
     restaurant_service: RestaurantService = Depends(),
 ) -> Restaurant:
-    result = restaurant_service.update(id, restaurant)
+    result = await restaurant_service.update(id, restaurant, versions)
 
     if isinstance(result, AppError):
         raise HTTPException(detail=result.message, status_code=result.error_type)
 
-    return result
+    # The returned row already matches `Restaurant`
+    response = FastJSONResponse(result)
+    set_validators(response, entity_etag(result["updated_at"]), result["updated_at"])
+    return response
 
 
 @router.delete("/{id}")
 async def delete_restaurant(
     id: str,
+    versions: Optional[list[dt]] = Depends(get_if_match),
     restaurant_service: RestaurantService = Depends(),
 ) -> Restaurant:
-    result = restaurant_service.delete(id)
+    result = await restaurant_service.delete(id, versions)
 
     if isinstance(result, AppError):
         raise HTTPException(detail=result.message, status_code=result.error_type)
@@ -1,2 +1,3 @@
+# isort: skip_file
 from .config import get_app_settings
-from .settings import get_logger
+from .settings import get_logger, request_scope, start_log_listener, stop_log_listener
@@ -1 +1,7 @@
-from .loggin_config import get_logger
+# isort: skip_file
+from .loggin_config import (
+    get_logger,
+    request_scope,
+    start_log_listener,
+    stop_log_listener,
+)
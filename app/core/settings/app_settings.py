@@ -1,19 +1,96 @@
-from typing import Any
-
-from pydantic import SecretStr
-
-from app.core.settings.base_settings import BaseConfig
-
-
-class AppConfig(BaseConfig):
-    debug: bool = False
-    SECRET_KEY: SecretStr
-    PROJECT_NAME: str = "Melp Restaurants API"
-    API_V1_STR: str = "/api/v1"
-
-    class Config:
-        validate_assignment = True
-
-    @property
-    def fastapi_kwargs(self) -> dict[str, Any]:
-        return {"debug": self.debug}
+from enum import Enum
+from typing import Any, Optional
+
+from pydantic import SecretStr
+
+from app.core.settings.base_settings import BaseConfig
+
+# Async drivers used by the API for each sync database URI scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def make_async_uri(uri: str) -> str:
+    scheme, separator, rest = uri.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+class DatabaseBackendTypes(Enum):
+    postgresql: str = "postgresql"
+    sqlite: str = "sqlite"
+
+
+class StatisticsEngineTypes(Enum):
+    database: str = "database"
+    memory: str = "memory"
+    rollup: str = "rollup"
+
+
+class AppConfig(BaseConfig):
+    debug: bool = False
+    SECRET_KEY: SecretStr
+    PROJECT_NAME: str = "Melp Restaurants API"
+    API_V1_STR: str = "/api/v1"
+
+    DEFAULT_PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 500
+    EXPORT_BATCH_SIZE: int = 1000
+    CSV_BATCH_SIZE: int = 5000
+    BULK_INSERT_BATCH_SIZE: int = 1000
+    # Rows per statement of the bulk updates and deletes
+    BULK_WRITE_BATCH_SIZE: int = 1000
+
+    # Connection pool of the API engine
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    DB_APPLICATION_NAME: str = "melp_restaurant_api"
+    # How long a read replica failing to connect is left out of the rotation
+    DB_REPLICA_EJECTION_SECONDS: float = 30
+
+    # `memory` answers radius statistics from an in-process spatial index
+    STATISTICS_ENGINE: StatisticsEngineTypes = StatisticsEngineTypes.database
+    STATISTICS_INDEX_CELL_SIZE: float = 0.05
+    # `rollup` adds up the per-cell rollups of the cells inside the circle
+    STATISTICS_ROLLUP_MAX_CELLS: int = 2500
+    STATISTICS_BATCH_MAX_SIZE: int = 500
+    STATISTICS_GRID_MAX_CELLS: int = 10000
+
+    # Cache of radius statistics, keyed by coordinates rounded to
+    # `STATISTICS_CACHE_PRECISION` decimals
+    STATISTICS_CACHE_ENABLED: bool = False
+    STATISTICS_CACHE_SIZE: int = 10000
+    STATISTICS_CACHE_TTL: float = 30
+    STATISTICS_CACHE_PRECISION: int = 4
+    STATISTICS_CACHE_REGION_SIZE: float = 0.5
+
+    # Background CSV imports running at once, each one holding a connection
+    # of the pool while it copies a batch, keep it below `DB_POOL_SIZE`
+    IMPORT_JOB_CONCURRENCY: int = 1
+    # Finished imports kept for their progress to be looked up
+    IMPORT_JOB_HISTORY: int = 100
+    # Where uploads wait for their import, the system temporary directory
+    # by default
+    IMPORT_SPOOL_DIR: Optional[str] = None
+
+    class Config:
+        validate_assignment = True
+
+    @property
+    def database_backend(self) -> DatabaseBackendTypes:
+        """
+        Storage backend selected by the scheme of `DATABASE_URI`
+        """
+        scheme = self.DATABASE_URI.partition("://")[0]
+        return DatabaseBackendTypes(scheme.partition("+")[0])
+
+    @property
+    def fastapi_kwargs(self) -> dict[str, Any]:
+        return {"debug": self.debug}
@@ -1,45 +1,176 @@
-import logging
-import os
-
-from dotenv import load_dotenv
-
-LOG_FORMAT = "%(asctime)s %(name)-6s %(levelname)-4s %(message)s"
-LOG_FILE_INFO = "logs.log"
-LOG_FILE_ERROR = "error_log.log"
-
-load_dotenv(override=True)
-
-DEV = os.getenv("ENVIRONMENT") == "dev"
-
-
-def get_logger(log_name=""):
-    # Creating logger
-    log = logging.getLogger(log_name)
-    log_formatter = logging.Formatter(LOG_FORMAT)
-
-    # Console Handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(log_formatter)
-    console_handler.setLevel(logging.DEBUG)
-
-    # File Handler
-    file_handler_info = logging.FileHandler(LOG_FILE_INFO, mode="a")
-    file_handler_info.setFormatter(log_formatter)
-    file_handler_info.setLevel(logging.DEBUG)
-
-    if DEV:
-        log.addHandler(file_handler_info)
-
-    # Error handlers
-    file_handler_error = logging.FileHandler(LOG_FILE_ERROR, mode="a")
-    file_handler_error.setFormatter(log_formatter)
-    file_handler_error.setLevel(logging.ERROR)
-
-    # Adding error handlers
-    if DEV:
-        log.addHandler(file_handler_error)
-        log.addHandler(console_handler)
-
-    log.setLevel(logging.DEBUG)
-
-    return log
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from dotenv import load_dotenv
+
+LOG_FILE_INFO = "logs.log"
+LOG_FILE_ERROR = "error_log.log"
+QUEUE_HANDLER_NAME = "app_queue"
+
+load_dotenv(override=True)
+
+DEV = os.getenv("ENVIRONMENT") == "dev"
+# Share of the records below WARNING that are kept, errors are never dropped
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+
+# ASGI scope of the request being served, see `RequestContextMiddleware`
+request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Samples the records below WARNING and tags the kept ones with the id and
+    route of the current request. It runs in the thread of the caller,
+    before the record is queued.
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and self.sample_rate < 1:
+            # Sampling of log records, not a cryptographic use
+            if random.random() >= self.sample_rate:  # nosec B311
+                return False
+
+        scope = request_scope.get()
+        record.request_id = None
+        record.route = None
+        if scope is not None:
+            record.request_id = scope.get("request_id")
+            # Set by the router, once the request has been matched
+            route = scope.get("route")
+            record.route = getattr(route, "path", None)
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Queues records for the `QueueListener`, the message is rendered here so
+    its arguments are not shared across threads, the rest is formatted by
+    the listener
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per record, with the request context
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "route": getattr(record, "route", None),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def build_handlers() -> list[logging.Handler]:
+    formatter = JSONFormatter()
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    console_handler.setLevel(logging.DEBUG)
+
+    # Opened on the first record
+    file_handler_info = logging.FileHandler(LOG_FILE_INFO, mode="a", delay=True)
+    file_handler_info.setFormatter(formatter)
+    file_handler_info.setLevel(logging.DEBUG)
+
+    file_handler_error = logging.FileHandler(LOG_FILE_ERROR, mode="a", delay=True)
+    file_handler_error.setFormatter(formatter)
+    file_handler_error.setLevel(logging.ERROR)
+
+    return [console_handler, file_handler_info, file_handler_error]
+
+
+class RestartableQueueListener(QueueListener):
+    """
+    `QueueListener` started again by each startup of the app after the
+    shutdown stopped it, starting and stopping twice are no-ops
+    """
+
+    def start(self) -> None:
+        if self._thread is None:
+            super().start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+
+def build_queue_handler() -> tuple[QueueHandler, QueueListener]:
+    """
+    Starts the listener writing the records to the console and files from
+    its own thread, and returns the handler feeding it
+    """
+    log_queue = queue.SimpleQueue()
+    listener = RestartableQueueListener(
+        log_queue, *build_handlers(), respect_handler_level=True
+    )
+    listener.start()
+    # Flushes the queued records on exit, when not stopped by the shutdown
+    atexit.register(listener.stop)
+
+    handler = ContextQueueHandler(log_queue)
+    handler.set_name(QUEUE_HANDLER_NAME)
+    handler.addFilter(ContextFilter(LOG_SAMPLE_RATE))
+    return handler, listener
+
+
+# Process-wide, the only handler of the app loggers. Only in dev, like the
+# handlers it feeds.
+queue_handler, log_listener = build_queue_handler() if DEV else (None, None)
+
+
+def start_log_listener() -> None:
+    if log_listener is not None:
+        log_listener.start()
+
+
+def stop_log_listener() -> None:
+    """
+    Writes the queued records and stops the thread of the listener
+    """
+    if log_listener is not None:
+        log_listener.stop()
+
+
+def get_logger(log_name=""):
+    log = logging.getLogger(log_name)
+
+    # Idempotent, and replaces the handler left by a reloaded module
+    for handler in list(log.handlers):
+        if handler.name == QUEUE_HANDLER_NAME and handler is not queue_handler:
+            log.removeHandler(handler)
+    if queue_handler is not None and queue_handler not in log.handlers:
+        log.addHandler(queue_handler)
+
+    log.setLevel(logging.DEBUG)
+
+    return log
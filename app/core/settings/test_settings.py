@@ -0,0 +1,44 @@
+from typing import Any, Optional
+
+from pydantic import validator
+
+from app.core.settings.app_settings import AppConfig, make_async_uri
+
+
+class TestConfig(AppConfig):
+    """
+    Settings of the benchmark runs, against the local PostGIS of
+    `docker-compose.yml` by default
+    """
+
+    TEST_DATABASE_NAME: str = "melp_benchmark"
+    TEST_DATABASE_USER: str = "postgres"
+    TEST_DATABASE_PASSWORD: str = "SuperSecret"
+    TEST_DATABASE_HOST: str = "localhost"
+    TEST_DATABASE_PORT: str = "5432"
+
+    # Sync URI, used by alembic and scripts
+    DATABASE_URI: Optional[str] = None
+    # Async URI used by the API, derived from `DATABASE_URI` when not set
+    ASYNC_DATABASE_URI: Optional[str] = None
+    # Benchmarks measure the primary alone
+    READ_REPLICA_URIS: list[str] = []
+
+    @validator("DATABASE_URI", pre=True)
+    def assemble_db_connection(cls, v: Optional[str], values: dict[str, Any]) -> str:
+        if isinstance(v, str):
+            return v
+        db_name = values.get("TEST_DATABASE_NAME")
+        db_user = values.get("TEST_DATABASE_USER")
+        db_password = values.get("TEST_DATABASE_PASSWORD")
+        db_host = values.get("TEST_DATABASE_HOST")
+        db_port = values.get("TEST_DATABASE_PORT")
+        return f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+    @validator("ASYNC_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(
+        cls, v: Optional[str], values: dict[str, Any]
+    ) -> str:
+        if isinstance(v, str):
+            return v
+        return make_async_uri(values.get("DATABASE_URI"))
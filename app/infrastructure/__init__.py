@@ -1 +1 @@
-from .db import get_db_session
+from .db import get_db_read_session, get_db_session, get_sync_db_session
@@ -1,13 +1,173 @@
+# isort: skip_file
+from typing import Any, Optional
+
+from fastapi import Header
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import get_app_settings
+from app.core.settings.app_settings import DatabaseBackendTypes, make_async_uri
+from app.infrastructure.db_pool import (
+    PoolMetrics,
+    get_pool_status,
+    instrumented_pool_class,
+)
+from app.infrastructure.db_replicas import CONNECTION_ERRORS, ReplicaSet
+from app.infrastructure.request_metrics import instrument_engine
+from app.infrastructure.sqlite import create_schema, on_begin, on_connect
 
 app_settings = get_app_settings()
 
-engine = create_engine(app_settings.DATABASE_URI)
+
+def get_connect_args(uri: str) -> dict[str, Any]:
+    """
+    Per-connection session settings, in the format expected by the driver
+    """
+    driver = make_url(uri).get_driver_name()
+    timeout = app_settings.DB_STATEMENT_TIMEOUT_MS
+
+    if driver == "asyncpg":
+        server_settings = {"application_name": app_settings.DB_APPLICATION_NAME}
+        if timeout is not None:
+            server_settings["statement_timeout"] = str(timeout)
+        return {"server_settings": server_settings}
+
+    if driver == "psycopg2":
+        connect_args = {"application_name": app_settings.DB_APPLICATION_NAME}
+        if timeout is not None:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+        return connect_args
+
+    return {}
+
+
+pool_kwargs = {
+    "pool_size": app_settings.DB_POOL_SIZE,
+    "max_overflow": app_settings.DB_MAX_OVERFLOW,
+    "pool_timeout": app_settings.DB_POOL_TIMEOUT,
+    "pool_recycle": app_settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": app_settings.DB_POOL_PRE_PING,
+}
+
+
+def configure_backend(sync_engine) -> None:
+    """
+    Registers the per-connection setup of the storage backend
+    """
+    if sync_engine.dialect.name == DatabaseBackendTypes.sqlite.value:
+        event.listen(sync_engine, "connect", on_connect)
+        event.listen(sync_engine, "begin", on_begin)
+
+
+# Sync engine, kept for alembic and scripts. SQLite connections can't be
+# shared between threads, so its pool is left to the dialect.
+engine = create_engine(
+    app_settings.DATABASE_URI,
+    connect_args=get_connect_args(app_settings.DATABASE_URI),
+    **(
+        pool_kwargs
+        if app_settings.database_backend == DatabaseBackendTypes.postgresql
+        else {}
+    ),
+)
+configure_backend(engine)
+
+
+def create_api_engine(uri: str, metrics: PoolMetrics):
+    api_engine = create_async_engine(
+        uri,
+        connect_args=get_connect_args(uri),
+        poolclass=instrumented_pool_class(metrics),
+        **pool_kwargs,
+    )
+    configure_backend(api_engine.sync_engine)
+    instrument_engine(api_engine.sync_engine)
+    return api_engine
+
+
+pool_metrics = PoolMetrics()
+async_engine = create_api_engine(app_settings.ASYNC_DATABASE_URI, pool_metrics)
+
+# Reads that tolerate replication lag go to the replicas, if any
+replica_uris = [make_async_uri(uri) for uri in app_settings.READ_REPLICA_URIS]
+replica_metrics = [PoolMetrics() for _ in replica_uris]
+read_replicas = ReplicaSet(
+    [create_api_engine(u, m) for u, m in zip(replica_uris, replica_metrics)],
+    replica_metrics,
+    ejection_time=app_settings.DB_REPLICA_EJECTION_SECONDS,
+)
+
+# Instances stay loaded after commit, since lazy loads can't run implicitly
+# on an async session
+async_session_factory = sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+def get_db_pool_status() -> dict:
+    status = get_pool_status(async_engine.pool, pool_metrics)
+    if read_replicas.engines:
+        status["replicas"] = read_replicas.status()
+    return status
+
+
+async def create_database_schema() -> None:
+    """
+    Creates the SQLite schema if missing, PostgreSQL is migrated by alembic
+    """
+    if app_settings.database_backend == DatabaseBackendTypes.sqlite:
+        async with async_engine.begin() as connection:
+            await connection.run_sync(create_schema)
+
+
+async def dispose_engines() -> None:
+    await async_engine.dispose()
+    await read_replicas.dispose()
+
+
+async def get_db_session() -> AsyncSession:
+    async with async_session_factory() as session:
+        yield session
+
+
+async def connect_replica(engine) -> Optional[AsyncSession]:
+    """
+    Session on a read replica, connected up front. None when the replica
+    can't be reached, which ejects it.
+    """
+    session = async_session_factory(bind=engine)
+    try:
+        await session.connection()
+    except CONNECTION_ERRORS:
+        await session.close()
+        return None
+    return session
+
+
+async def get_db_read_session(
+    x_read_your_writes: Optional[str] = Header(None),
+) -> AsyncSession:
+    """
+    Session for reads that may lag behind the primary. Clients that need to
+    see their own writes send `X-Read-Your-Writes: true` to read from the
+    primary instead. Reads landing on a replica that went down are retried
+    once on the primary.
+    """
+    session = None
+    if x_read_your_writes is None or x_read_your_writes.lower() not in ("1", "true"):
+        engine = read_replicas.choose()
+        if engine is not None:
+            session = await connect_replica(engine)
+
+    async with session or async_session_factory(bind=async_engine) as session:
+        yield session
 
 
-def get_db_session() -> Session:
+def get_sync_db_session() -> Session:
     with Session(engine) as session:
         try:
             yield session
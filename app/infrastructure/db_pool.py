@@ -0,0 +1,49 @@
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+from app.utils.metrics import Histogram
+
+
+class PoolMetrics:
+    """
+    Connection checkout statistics of an engine pool
+    """
+
+    def __init__(self):
+        self.checkout_wait = Histogram()
+        self.timeouts = 0
+
+
+def instrumented_pool_class(metrics: PoolMetrics) -> type[AsyncAdaptedQueuePool]:
+    """
+    Builds a pool class recording how long checkouts wait for a connection.
+    The metrics are bound to the class, so they survive `Pool.recreate`.
+    """
+
+    class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except TimeoutError:
+                metrics.timeouts += 1
+                raise
+            finally:
+                metrics.checkout_wait.observe(time.perf_counter() - start)
+
+    return InstrumentedAsyncAdaptedQueuePool
+
+
+def get_pool_status(pool: Pool, metrics: PoolMetrics) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # Negative while the pool hasn't opened `size` connections yet
+        "overflow": max(pool.overflow(), 0),
+        "timeout": pool.timeout(),
+        "timeouts": metrics.timeouts,
+        "checkout_wait_seconds": metrics.checkout_wait.snapshot(),
+    }
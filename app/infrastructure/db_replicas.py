@@ -0,0 +1,94 @@
+import asyncio
+import itertools
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core import get_logger
+from app.infrastructure.db_pool import PoolMetrics, get_pool_status
+
+logger = get_logger(__name__)
+
+# Errors meaning the replica itself is unreachable, not a bad statement
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError)
+
+
+class ReplicaSet:
+    """
+    Read replica engines picked round-robin. A replica raising a connection
+    error is ejected for `ejection_time` seconds, then tried again by the
+    next request that lands on it.
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        metrics: list[PoolMetrics],
+        ejection_time: float,
+    ):
+        self.engines = engines
+        self.metrics = metrics
+        self.ejection_time = ejection_time
+        self._ejected_until = [0.0] * len(engines)
+        self._next = itertools.count()
+
+        for index, engine in enumerate(engines):
+            event.listen(engine.sync_engine, "do_connect", self._connect_handler(index))
+            event.listen(engine.sync_engine, "handle_error", self._error_handler(index))
+
+    def _connect_handler(self, index: int):
+        # Failed connection attempts raise the driver's own errors, which
+        # never reach `handle_error`
+        def do_connect(dialect, connection_record, cargs, cparams):
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except CONNECTION_ERRORS:
+                self.eject(index)
+                raise
+
+        return do_connect
+
+    def _error_handler(self, index: int):
+        def handle_error(context: ExceptionContext) -> None:
+            if context.is_disconnect:
+                self.eject(index)
+
+        return handle_error
+
+    def eject(self, index: int) -> None:
+        url = self.engines[index].url.render_as_string(hide_password=True)
+        logger.error(f"Read replica {url} ejected for {self.ejection_time}s")
+        self._ejected_until[index] = time.monotonic() + self.ejection_time
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """
+        Returns the next healthy replica, or None when all are ejected
+        """
+        if not self.engines:
+            return None
+
+        now = time.monotonic()
+        start = next(self._next)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self._ejected_until[index] <= now:
+                return self.engines[index]
+        return None
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "url": engine.url.render_as_string(hide_password=True),
+                "healthy": self._ejected_until[index] <= now,
+                "pool": get_pool_status(engine.pool, self.metrics[index]),
+            }
+            for index, engine in enumerate(self.engines)
+        ]
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
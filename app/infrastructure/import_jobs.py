@@ -0,0 +1,196 @@
+"""
+Background CSV imports. The uploads are spooled to disk and loaded by at
+most `concurrency` jobs at a time, each one holding a single connection
+while it copies a batch, so imports can't take over the connection pool
+that serves the reads. Jobs are only known to the worker that accepted
+them, which forgets the oldest finished ones past `history`.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime as dt
+from typing import Any, Awaitable, BinaryIO, Callable, Optional, Union
+from uuid import uuid4
+
+from app.core import get_logger
+from app.core.config import get_app_settings
+from app.schemas import ImportJobStatus
+from app.utils.errors import AppError, ErrorType
+
+logger = get_logger(__name__)
+app_settings = get_app_settings()
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class ImportJob:
+    """
+    Progress of the import of a spooled file, updated after each batch
+    """
+
+    def __init__(self, path: str):
+        self.id = str(uuid4())
+        self.path = path
+        self.status = ImportJobStatus.queued
+        self.rows_loaded = 0
+        self.rows_rejected = 0
+        self.error: Optional[str] = None
+        self.created_at = dt.utcnow()
+        self.started_at: Optional[dt] = None
+        self.finished_at: Optional[dt] = None
+        # Monotonic clock of the throughput, immune to clock changes
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    @property
+    def rows_processed(self) -> int:
+        return self.rows_loaded + self.rows_rejected
+
+    @property
+    def done(self) -> bool:
+        return self.status in (ImportJobStatus.succeeded, ImportJobStatus.failed)
+
+    def record(self, rows_loaded: int, rows_rejected: int) -> None:
+        self.rows_loaded = rows_loaded
+        self.rows_rejected = rows_rejected
+
+    def start(self) -> None:
+        self.status = ImportJobStatus.running
+        self.started_at = dt.utcnow()
+        self._started = time.monotonic()
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.status = ImportJobStatus.failed if error else ImportJobStatus.succeeded
+        self.error = error
+        self.finished_at = dt.utcnow()
+        self._finished = time.monotonic()
+
+    def throughput(self) -> float:
+        """
+        Rows processed per second since the job started
+        """
+        if self._started is None:
+            return 0.0
+        elapsed = (self._finished or time.monotonic()) - self._started
+        return self.rows_processed / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "rows_processed": self.rows_processed,
+            "rows_loaded": self.rows_loaded,
+            "rows_rejected": self.rows_rejected,
+            "rows_per_second": round(self.throughput(), 2),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+ImportRunner = Callable[[ImportJob], Awaitable[Union[Any, AppError]]]
+
+
+class ImportJobRegistry:
+    """
+    Runs the import jobs of this worker, `concurrency` at a time in the
+    order they were submitted, and keeps their progress
+    """
+
+    def __init__(self, concurrency: int, history: int, spool_dir: Optional[str] = None):
+        self.concurrency = concurrency
+        self.history = history
+        self.spool_dir = spool_dir
+
+        # Created by the first job, inside the running loop, Python 3.9 binds
+        # it to the loop current at its creation
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: OrderedDict[str, ImportJob] = OrderedDict()
+        # Referenced until done, the event loop only keeps weak references
+        self._tasks: set[asyncio.Task] = set()
+
+    def spool(self, file: BinaryIO) -> str:
+        """
+        Copies an upload to a file of the spool directory, blocking, and
+        returns its path
+        """
+        with tempfile.NamedTemporaryFile(
+            "wb", suffix=".csv", prefix="import-", dir=self.spool_dir, delete=False
+        ) as spooled:
+            try:
+                shutil.copyfileobj(file, spooled, SPOOL_CHUNK_SIZE)
+            except Exception:
+                spooled.close()
+                os.remove(spooled.name)
+                raise
+        return spooled.name
+
+    def submit(self, path: str, run: ImportRunner) -> ImportJob:
+        """
+        Queues the import of a spooled file, which is removed once the job
+        is done
+        """
+        job = ImportJob(path)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, run))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, id: str) -> Union[ImportJob, AppError]:
+        job = self._jobs.get(id)
+        if job is None:
+            return AppError(
+                error_type=ErrorType.NOT_FOUND, message="Import job not found"
+            )
+        return job
+
+    async def _run(self, job: ImportJob, run: ImportRunner) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self._semaphore:
+                job.start()
+                result = await run(job)
+            job.finish(result.message if isinstance(result, AppError) else None)
+        except asyncio.CancelledError:
+            job.finish("Import interrupted by shutdown")
+            raise
+        except Exception as err:
+            error_msg = f"Error while running import job with id: {job.id}"
+            logger.error(f"{error_msg}, error: {err}")
+            job.finish("Error while importing csv file")
+        finally:
+            try:
+                os.remove(job.path)
+            except OSError as err:
+                logger.error(f"Error while removing spooled file, error: {err}")
+            self._forget_finished()
+
+    def _forget_finished(self) -> None:
+        finished = [id for id, job in self._jobs.items() if job.done]
+        for id in finished[: max(len(finished) - self.history, 0)]:
+            del self._jobs[id]
+
+    async def shutdown(self) -> None:
+        """
+        Cancels the queued and running jobs, which keep the rows they had
+        already committed
+        """
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # The next startup may run another loop
+        self._semaphore = None
+
+
+import_jobs = ImportJobRegistry(
+    app_settings.IMPORT_JOB_CONCURRENCY,
+    app_settings.IMPORT_JOB_HISTORY,
+    app_settings.IMPORT_SPOOL_DIR,
+)
@@ -0,0 +1,145 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, ExceptionContext
+
+from app.utils.metrics import LoopHistogram, format_histogram, format_labels
+
+# Requests with another method share one label value
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+# Requests matching no route share one label value, so only route templates
+# are ever used as labels
+UNMATCHED_ROUTE = "unmatched"
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class QueryStats:
+    """
+    Queries run on behalf of a request and the time spent on them
+    """
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Statistics of the request being served, see `MetricsMiddleware`
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = LoopHistogram()
+        self.db_time = LoopHistogram()
+        self.db_queries = LoopHistogram(QUERY_COUNT_BUCKETS)
+        self.responses: dict[int, int] = {}
+
+
+class RequestMetrics:
+    """
+    Latency, response status and database usage of the requests served by
+    this worker, by method and route template. Only updated from the event
+    loop.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+
+    def observe(
+        self,
+        method: str,
+        route: Optional[str],
+        status: int,
+        seconds: float,
+        stats: QueryStats,
+    ) -> None:
+        key = (
+            method if method in METHODS else "OTHER",
+            route or UNMATCHED_ROUTE,
+        )
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+
+        metrics.latency.observe(seconds)
+        metrics.db_time.observe(stats.seconds)
+        metrics.db_queries.observe(stats.count)
+        metrics.responses[status] = metrics.responses.get(status, 0) + 1
+
+    def render(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format
+        """
+        lines = [
+            "# HELP http_requests_in_flight Requests being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        routes = [
+            ({"method": method, "route": route}, metrics)
+            for (method, route), metrics in sorted(self.routes.items())
+        ]
+
+        lines += [
+            "# HELP http_responses_total Responses sent, by status code.",
+            "# TYPE http_responses_total counter",
+        ]
+        for labels, metrics in routes:
+            for status, count in sorted(metrics.responses.items()):
+                labels_with_status = format_labels(labels | {"status": str(status)})
+                lines.append(f"http_responses_total{labels_with_status} {count}")
+
+        histograms = (
+            ("http_request_duration_seconds", "latency", "Request latency."),
+            ("http_request_db_seconds", "db_time", "Database time per request."),
+            ("http_request_db_queries", "db_queries", "Queries per request."),
+        )
+        for name, attribute, description in histograms:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+            for labels, metrics in routes:
+                lines += format_histogram(name, labels, getattr(metrics, attribute))
+
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(context)
+
+
+def handle_error(context: ExceptionContext) -> None:
+    record_query(context.execution_context)
+
+
+def record_query(context: Any) -> None:
+    stats = query_stats.get()
+    start = getattr(context, "_query_start", None)
+    if stats is None or start is None:
+        return
+    stats.count += 1
+    stats.seconds += time.perf_counter() - start
+    # A query failing after its cursor returned is only counted once
+    context._query_start = None
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Attributes the queries run by the engine, and their time, to the
+    request being served
+    """
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
@@ -0,0 +1,246 @@
+import math
+import threading
+from itertools import chain
+from typing import Iterable
+
+import numpy as np
+
+from app.core.config import get_app_settings
+from app.utils.geo import EARTH_RADIUS_M, circle_bounds, grid_shape
+
+app_settings = get_app_settings()
+
+# Above this many grid cells per query it's cheaper to scan the arrays
+MAX_WINDOW_CELLS = 4096
+
+RestaurantPoint = tuple[str, float, float, int]
+
+
+class RestaurantSpatialIndex:
+    """
+    In-process, read-optimized copy of the restaurants coordinates and
+    ratings, used to answer radius statistics without a database round trip.
+
+    Coordinates and ratings live in contiguous NumPy arrays, kept dense by
+    moving the last row into the slot of a removed one. A uniform grid of
+    `cell_size` degrees maps every cell to the slots it holds, so a query only
+    computes distances for the rows around the requested circle.
+
+    The index belongs to the worker process that built it, writes made by
+    other workers are not seen until it is rebuilt.
+    """
+
+    def __init__(self, cell_size: float = 0.05, capacity: int = 1024):
+        self.cell_size = cell_size
+        self.ready = False
+        self._lock = threading.RLock()
+        self._reset(capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reset(self, capacity: int) -> None:
+        self._size = 0
+        self._lat = np.empty(capacity, dtype=np.float64)
+        self._lng = np.empty(capacity, dtype=np.float64)
+        self._rating = np.empty(capacity, dtype=np.float64)
+        self._ids: list[str] = []
+        self._slots: dict[str, int] = {}
+        self._cells: dict[tuple[int, int], set[int]] = {}
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return (
+            math.floor(lat / self.cell_size),
+            math.floor(lng / self.cell_size),
+        )
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._lat)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_lat", "_lng", "_rating"):
+            array = np.empty(capacity, dtype=np.float64)
+            array[: self._size] = getattr(self, name)[: self._size]
+            setattr(self, name, array)
+
+    def _insert(self, id: str, lat: float, lng: float, rating: int) -> None:
+        slot = self._slots.get(id)
+        if slot is not None:
+            self._cells[self._cell(self._lat[slot], self._lng[slot])].discard(slot)
+        else:
+            self._grow(self._size + 1)
+            slot = self._size
+            self._size += 1
+            self._ids.append(id)
+            self._slots[id] = slot
+
+        self._lat[slot] = lat
+        self._lng[slot] = lng
+        self._rating[slot] = rating
+        self._cells.setdefault(self._cell(lat, lng), set()).add(slot)
+
+    def build(self, restaurants: Iterable[RestaurantPoint]) -> None:
+        """
+        Replaces the whole content of the index
+
+        Parameters
+        ----------
+        `restaurants` : Iterable[tuple[str, float, float, int]]
+            `(id, lat, lng, rating)` of every restaurant
+        """
+        with self._lock:
+            self._reset(1024)
+            for restaurant in restaurants:
+                self._insert(*restaurant)
+            self.ready = True
+
+    def upsert(self, id: str, lat: float, lng: float, rating: int) -> None:
+        with self._lock:
+            self._insert(id, lat, lng, rating)
+
+    def upsert_many(self, restaurants: Iterable[RestaurantPoint]) -> None:
+        with self._lock:
+            for restaurant in restaurants:
+                self._insert(*restaurant)
+
+    def remove(self, id: str) -> None:
+        with self._lock:
+            slot = self._slots.pop(id, None)
+            if slot is None:
+                return
+            self._cells[self._cell(self._lat[slot], self._lng[slot])].discard(slot)
+
+            last = self._size - 1
+            if slot != last:
+                # Keep the arrays dense by moving the last row into the hole
+                last_cell = self._cells[self._cell(self._lat[last], self._lng[last])]
+                last_cell.discard(last)
+                last_cell.add(slot)
+                self._lat[slot] = self._lat[last]
+                self._lng[slot] = self._lng[last]
+                self._rating[slot] = self._rating[last]
+                self._ids[slot] = self._ids[last]
+                self._slots[self._ids[slot]] = slot
+
+            self._ids.pop()
+            self._size = last
+
+    def _candidates(self, lat: float, lng: float, radius: float) -> np.ndarray:
+        """
+        Returns the slots of the cells overlapping the bounding box of the
+        circle, or all slots when the box is too large for the grid to help.
+        """
+        bounds = circle_bounds(lat, lng, radius)
+        if bounds is None:
+            return np.arange(self._size)
+
+        min_lat, min_lng, max_lat, max_lng = bounds
+        min_y, min_x = self._cell(min_lat, min_lng)
+        max_y, max_x = self._cell(max_lat, max_lng)
+        if (max_y - min_y + 1) * (max_x - min_x + 1) > MAX_WINDOW_CELLS:
+            return np.arange(self._size)
+
+        cells = (
+            self._cells.get((y, x), ())
+            for y in range(min_y, max_y + 1)
+            for x in range(min_x, max_x + 1)
+        )
+        return np.fromiter(chain.from_iterable(cells), dtype=np.intp)
+
+    def radius_statistics(self, lat: float, lng: float, radius: float) -> dict:
+        """
+        Count, average and standard deviation of the ratings of the
+        restaurants within `radius` meters of the given point.
+
+        Returns
+        -------
+        `result`: dict
+            { "count": int, "avg": float, "std": float }
+        """
+        with self._lock:
+            slots = self._candidates(lat, lng, radius)
+            lat_rad = np.radians(self._lat[slots])
+            lng_rad = np.radians(self._lng[slots])
+            ratings = self._rating[slots]
+
+        center_lat = math.radians(lat)
+        center_lng = math.radians(lng)
+        # Haversine formula, vectorized over the candidates
+        a = (
+            np.sin((lat_rad - center_lat) / 2) ** 2
+            + math.cos(center_lat)
+            * np.cos(lat_rad)
+            * np.sin((lng_rad - center_lng) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        ratings = ratings[distances <= radius]
+
+        count = int(ratings.size)
+        return {
+            "count": count,
+            "avg": float(ratings.mean()) if count else 0,
+            # Sample standard deviation, like PostgreSQL's `stddev`
+            "std": float(ratings.std(ddof=1)) if count > 1 else 0,
+        }
+
+    def grid_statistics(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        cell_size: float,
+    ) -> dict:
+        """
+        Count, average and standard deviation of the ratings in every cell
+        of a grid of `cell_size` degrees anchored at the south-west corner
+        of the box, binned with a single `bincount` pass per column.
+
+        Returns
+        -------
+        `result`: dict
+            { "row": list, "col": list, "count": list, "avg": list,
+            "std": list }, for the non-empty cells in row-major order
+        """
+        rows, cols = grid_shape(min_lat, min_lng, max_lat, max_lng, cell_size)
+
+        with self._lock:
+            lat = self._lat[: self._size]
+            lng = self._lng[: self._size]
+            inside = (lat >= min_lat) & (lat <= max_lat)
+            inside &= (lng >= min_lng) & (lng <= max_lng)
+            lat, lng = lat[inside], lng[inside]
+            ratings = self._rating[: self._size][inside]
+
+        # The north and east edges belong to the last row and column
+        row = np.minimum(np.floor((lat - min_lat) / cell_size), rows - 1)
+        col = np.minimum(np.floor((lng - min_lng) / cell_size), cols - 1)
+        cell = row.astype(np.int64) * cols + col.astype(np.int64)
+
+        counts = np.bincount(cell, minlength=rows * cols)
+        sums = np.bincount(cell, weights=ratings, minlength=rows * cols)
+        squares = np.bincount(cell, weights=ratings**2, minlength=rows * cols)
+
+        cells = np.flatnonzero(counts)
+        n, total, sq = counts[cells], sums[cells], squares[cells]
+        # Integer ratings keep the sums exact, like PostgreSQL's `stddev`
+        variance = np.divide(
+            n * sq - total * total,
+            n * (n - 1),
+            out=np.zeros(cells.size),
+            where=n > 1,
+        )
+        return {
+            "row": (cells // cols).tolist(),
+            "col": (cells % cols).tolist(),
+            "count": n.tolist(),
+            "avg": (total / n).tolist(),
+            "std": np.sqrt(np.maximum(variance, 0)).tolist(),
+        }
+
+
+restaurant_index = RestaurantSpatialIndex(
+    cell_size=app_settings.STATISTICS_INDEX_CELL_SIZE
+)
@@ -0,0 +1,307 @@
+"""
+SQLite storage backend: the SQL functions and the schema the repository
+expects, in place of the PostGIS ones.
+
+The schema is created at startup, there are no migrations to run. The
+coordinates of every restaurant are mirrored by triggers into an R*Tree
+virtual table, which narrows radius and box queries to the candidates of a
+bounding box before the exact distances are computed. Their `search_text`
+is mirrored the same way into an FTS5 trigram index, which narrows the
+searches to the restaurants sharing a trigram with the query.
+"""
+import math
+import re
+import sqlite3
+from datetime import datetime as dt
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import GenericFunction, now
+
+from app.utils.geo import haversine_distance
+
+# Default `pg_trgm.word_similarity_threshold` of PostgreSQL
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+# Kept out of the models metadata, alembic only manages PostgreSQL
+sqlite_metadata = MetaData()
+restaurant_rtree = Table(
+    "restaurant_rtree",
+    sqlite_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float),
+    Column("max_lat", Float),
+    Column("min_lng", Float),
+    Column("max_lng", Float),
+)
+restaurant_search = Table(
+    "restaurant_search", sqlite_metadata, Column("search_text", Text)
+)
+
+# Geometry shim: `Restaurant.location` is a PostGIS geography, SQLite has no
+# such type and the backend never reads it, the radius and box queries use
+# `lat` and `lng`. It exists because the models are shared: the ORM still
+# selects every mapped column, so the SQLite table keeps a `location` column
+# that stays NULL, and GeoAlchemy2 wraps its reads in the SpatiaLite
+# `AsBinary`, registered below to return the NULL as is. Without it, loading a
+# `Restaurant` fails with "no such column" or "no such function".
+LOCATION_COLUMN = "location BLOB"
+
+
+def as_binary(value: Optional[bytes]) -> Optional[bytes]:
+    return value
+
+
+# `rtree_id` aliases the rowid, so the R*Tree and FTS5 entries keep pointing
+# at their restaurant across a `VACUUM` and an update of `id`
+SCHEMA = (
+    f"""
+    CREATE TABLE IF NOT EXISTS restaurant (
+        rtree_id INTEGER PRIMARY KEY,
+        id VARCHAR NOT NULL UNIQUE,
+        rating INTEGER NOT NULL,
+        name VARCHAR NOT NULL,
+        site VARCHAR NOT NULL,
+        email VARCHAR NOT NULL,
+        phone VARCHAR NOT NULL,
+        street VARCHAR NOT NULL,
+        city VARCHAR NOT NULL,
+        state VARCHAR NOT NULL,
+        lat FLOAT NOT NULL,
+        lng FLOAT NOT NULL,
+        {LOCATION_COLUMN},
+        search_text TEXT GENERATED ALWAYS AS (
+            name || ' ' || street || ' ' || city || ' ' || state
+        ) VIRTUAL,
+        created_at DATETIME NOT NULL DEFAULT (utc_now()),
+        updated_at DATETIME NOT NULL DEFAULT (utc_now()),
+        CONSTRAINT valid_email CHECK (email LIKE '%_@_%._%')
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_restaurant_created_at_id "
+    "ON restaurant (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_restaurant_city_created_at_id "
+    "ON restaurant (city, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_restaurant_state_created_at_id "
+    "ON restaurant (state, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_restaurant_rating_created_at_id "
+    "ON restaurant (rating, created_at, id)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS restaurant_rtree "
+    "USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurant_rtree_insert
+    AFTER INSERT ON restaurant
+    BEGIN
+        INSERT INTO restaurant_rtree
+        VALUES (new.rtree_id, new.lat, new.lat, new.lng, new.lng);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurant_rtree_update
+    AFTER UPDATE OF lat, lng ON restaurant
+    BEGIN
+        UPDATE restaurant_rtree
+        SET min_lat = new.lat, max_lat = new.lat, min_lng = new.lng, max_lng = new.lng
+        WHERE id = new.rtree_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurant_rtree_delete
+    AFTER DELETE ON restaurant
+    BEGIN
+        DELETE FROM restaurant_rtree WHERE id = old.rtree_id;
+    END
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS restaurant_search USING fts5("
+    "search_text, content='restaurant', content_rowid='rtree_id', "
+    "tokenize='trigram')",
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurant_search_insert
+    AFTER INSERT ON restaurant
+    BEGIN
+        INSERT INTO restaurant_search (rowid, search_text)
+        VALUES (new.rtree_id, new.search_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurant_search_update
+    AFTER UPDATE OF name, street, city, state ON restaurant
+    BEGIN
+        INSERT INTO restaurant_search (restaurant_search, rowid, search_text)
+        VALUES ('delete', old.rtree_id, old.search_text);
+        INSERT INTO restaurant_search (rowid, search_text)
+        VALUES (new.rtree_id, new.search_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurant_search_delete
+    AFTER DELETE ON restaurant
+    BEGIN
+        INSERT INTO restaurant_search (restaurant_search, rowid, search_text)
+        VALUES ('delete', old.rtree_id, old.search_text);
+    END
+    """,
+)
+
+
+class least(GenericFunction):
+    inherit_cache = True
+
+
+@compiles(least, "sqlite")
+def compile_least(element, compiler, **kw) -> str:
+    # The scalar `min` of SQLite takes several arguments
+    return f"min({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(now, "sqlite")
+def compile_now(element, compiler, **kw) -> str:
+    # `CURRENT_TIMESTAMP` only has a precision of a second, too coarse for
+    # the row versions
+    return "utc_now()"
+
+
+def utc_now() -> str:
+    """
+    Current UTC time, in the storage format of the SQLAlchemy `DateTime`
+    """
+    return dt.utcnow().isoformat(" ", "microseconds")
+
+
+# What pg_trgm splits words on, anything but letters and digits
+WORD_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def words(text: str) -> list[str]:
+    return WORD_SEPARATORS.sub(" ", text.lower()).split()
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Trigrams of the words of the text, padded like pg_trgm, two spaces
+    before each word and one after
+    """
+    result = set()
+    for word in words(text):
+        padded = f"  {word} "
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+# A search scores every candidate against the same query
+query_trigrams = lru_cache(maxsize=256)(trigrams)
+
+
+def word_similarity(query: str, text: Optional[str]) -> float:
+    """
+    Share of the trigrams of the query found in the text. It ranks like the
+    `word_similarity` of pg_trgm, without restricting the match to a single
+    stretch of the text.
+    """
+    searched = query_trigrams(query)
+    if not searched or text is None:
+        return 0.0
+    # The words padded and apart, a trigram of the query only occurs in it
+    # where the text has the same trigram, without building the set
+    padded = f"  {WORD_SEPARATORS.sub('   ', text.lower()).strip()} "
+    return sum(trigram in padded for trigram in searched) / len(searched)
+
+
+def match_expression(query: str) -> Optional[str]:
+    """
+    FTS5 query of the rows sharing an unpadded trigram with the words of
+    the query, the candidates of a search. None when every word is shorter
+    than a trigram.
+    """
+    found = {word[i : i + 3] for word in words(query) for i in range(len(word) - 2)}
+    if not found:
+        return None
+    # The words only hold letters and digits, nothing to escape in quotes
+    return " OR ".join(f'"{trigram}"' for trigram in sorted(found))
+
+
+class stddev(GenericFunction):
+    inherit_cache = True
+
+
+@compiles(stddev, "sqlite")
+def compile_stddev(element, compiler, **kw) -> str:
+    # Sample standard deviation, like PostgreSQL's `stddev`, from the count,
+    # sum and sum of squares. The sums of the integer ratings are exact, and
+    # the division by zero of fewer than two values is NULL. The argument is
+    # compiled at each use, for the positional parameters it may bind.
+    def value() -> str:
+        return compiler.process(element.clauses, **kw)
+
+    def count() -> str:
+        return f"count({value()})"
+
+    def total() -> str:
+        return f"sum({value()})"
+
+    return (
+        f"sqrt(({count()} * sum(({value()}) * ({value()})) - {total()} * {total()})"
+        f" * 1.0 / ({count()} * ({count()} - 1)))"
+    )
+
+
+def sqrt(value: Optional[float]) -> Optional[float]:
+    return None if value is None else math.sqrt(value)
+
+
+# Name, number of arguments, implementation and whether it is deterministic
+FUNCTIONS = (
+    ("utc_now", 0, utc_now, False),
+    ("haversine", 4, haversine_distance, True),
+    ("word_similarity", 2, word_similarity, True),
+    ("AsBinary", 1, as_binary, True),
+)
+
+# Registered when SQLite is built without the math functions
+MATH_FUNCTIONS = (("floor", 1, math.floor, True), ("sqrt", 1, sqrt, True))
+
+
+def configure_connection(dbapi_connection) -> None:
+    """
+    Registers the functions of the backend and enables write-ahead logging,
+    so readers don't block the writer. Takes a `sqlite3` connection or the
+    SQLAlchemy adapter of an aiosqlite one, which has the same methods.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+
+    for name, arguments, function, deterministic in FUNCTIONS:
+        dbapi_connection.create_function(
+            name, arguments, function, deterministic=deterministic
+        )
+    for name, arguments, function, deterministic in MATH_FUNCTIONS:
+        try:
+            cursor.execute(f"SELECT {name}(0.5)")
+        except sqlite3.OperationalError:
+            dbapi_connection.create_function(
+                name, arguments, function, deterministic=deterministic
+            )
+    cursor.close()
+
+
+def on_connect(dbapi_connection, connection_record) -> None:
+    """
+    `connect` event handler of the SQLite engines. Transactions are begun
+    explicitly by `on_begin`, instead of by the driver before the first
+    write, so a read and the write depending on it share a snapshot.
+    """
+    dbapi_connection.isolation_level = None
+    configure_connection(dbapi_connection)
+
+
+def on_begin(connection: Connection) -> None:
+    connection.exec_driver_sql("BEGIN")
+
+
+def create_schema(connection: Connection) -> None:
+    for statement in SCHEMA:
+        connection.exec_driver_sql(statement)
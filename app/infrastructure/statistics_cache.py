@@ -0,0 +1,180 @@
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+from app.core.config import get_app_settings
+from app.utils.geo import circle_bounds
+
+app_settings = get_app_settings()
+
+# Circles overlapping more regions than this depend on every write instead
+MAX_REGIONS_PER_ENTRY = 64
+
+# Above this many points a write invalidates the whole cache at once
+MAX_POINTS_PER_INVALIDATION = 1000
+
+StatisticsKey = tuple[float, float, int]
+Regions = Optional[list[tuple[int, int]]]
+# Regions of a key and their data version when its value was computed
+Token = tuple[Regions, Hashable]
+
+
+class StatisticsCache:
+    """
+    Bounded LRU cache of radius statistics with a TTL.
+
+    Keys are quantized to `precision` decimals, so nearby requests share an
+    entry. Entries remember the data version of the regions (square cells of
+    `region_size` degrees) their circle overlaps, and any write inside one of
+    those regions makes them stale immediately on this worker. Other workers
+    only see the write once their entries expire.
+
+    Only the regions of the cached entries keep a version of their own, and
+    they are dropped along with the last entry overlapping them. The other
+    regions share the `_floor` version, raised by their writes and by the
+    versions dropped, so a value computed across such a write is stale too.
+    """
+
+    def __init__(self, max_size: int, ttl: float, precision: int, region_size: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.precision = precision
+        self.region_size = region_size
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[
+            StatisticsKey, tuple[float, Token, Any]
+        ] = OrderedDict()
+        self._global_version = 0
+        # Bumped on every write, for the circles too wide to track regions
+        self._any_write_version = 0
+        # Region versions are the `_any_write_version` of their last write
+        self._region_versions: dict[tuple[int, int], int] = {}
+        self._region_entries: Counter[tuple[int, int]] = Counter()
+        self._floor = 0
+
+    def _region(self, lat: float, lng: float) -> tuple[int, int]:
+        return (
+            math.floor(lat / self.region_size),
+            math.floor(lng / self.region_size),
+        )
+
+    def _regions(self, key: StatisticsKey) -> Regions:
+        bounds = circle_bounds(*key)
+        if bounds is None:
+            return None
+
+        min_lat, min_lng, max_lat, max_lng = bounds
+        min_y, min_x = self._region(min_lat, min_lng)
+        max_y, max_x = self._region(max_lat, max_lng)
+        if (max_y - min_y + 1) * (max_x - min_x + 1) > MAX_REGIONS_PER_ENTRY:
+            return None
+
+        return [(y, x) for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1)]
+
+    def _version(self, regions: Regions) -> Hashable:
+        if regions is None:
+            return (self._global_version, self._any_write_version)
+        return (
+            self._global_version,
+            *(self._region_versions.get(region, self._floor) for region in regions),
+        )
+
+    def _pin(self, regions: Regions) -> None:
+        for region in regions or ():
+            self._region_versions.setdefault(region, self._floor)
+            self._region_entries[region] += 1
+
+    def _unpin(self, regions: Regions) -> None:
+        for region in regions or ():
+            self._region_entries[region] -= 1
+            if not self._region_entries[region]:
+                del self._region_entries[region]
+                self._floor = max(self._floor, self._region_versions.pop(region))
+
+    def _remove(self, key: StatisticsKey) -> None:
+        _, (regions, _), _ = self._entries.pop(key)
+        self._unpin(regions)
+
+    def make_key(self, lat: float, lng: float, radius: int) -> StatisticsKey:
+        return (round(lat, self.precision), round(lng, self.precision), radius)
+
+    def get(self, key: StatisticsKey) -> tuple[Optional[Any], Token]:
+        """
+        Returns the cached value, or None, and a token with the current data
+        version of the key, to hand back to `put` with the computed value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, (regions, version), value = entry
+                if expires_at > time.monotonic() and version == self._version(regions):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, (regions, version)
+                self._remove(key)
+
+            self.misses += 1
+            regions = self._regions(key)
+            return None, (regions, self._version(regions))
+
+    def put(self, key: StatisticsKey, value: Any, token: Token) -> None:
+        """
+        Stores a value computed after `get` returned `token`. A write that
+        happened in between makes the entry stale right away.
+        """
+        with self._lock:
+            # Pinned first, an entry replacing another one keeps its regions
+            self._pin(token[0])
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, token, value)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, points: Iterable[tuple[float, float]]) -> None:
+        """
+        Marks the regions containing the given `(lat, lng)` points as changed
+        """
+        points = list(points)
+        with self._lock:
+            self._any_write_version += 1
+            if len(points) > MAX_POINTS_PER_INVALIDATION:
+                self._global_version += 1
+                return
+            for lat, lng in points:
+                region = self._region(lat, lng)
+                if region in self._region_versions:
+                    self._region_versions[region] = self._any_write_version
+                else:
+                    # No entry overlaps it, only the values being computed may
+                    self._floor = self._any_write_version
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._global_version += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+statistics_cache = StatisticsCache(
+    max_size=app_settings.STATISTICS_CACHE_SIZE,
+    ttl=app_settings.STATISTICS_CACHE_TTL,
+    precision=app_settings.STATISTICS_CACHE_PRECISION,
+    region_size=app_settings.STATISTICS_CACHE_REGION_SIZE,
+)
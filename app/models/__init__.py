@@ -1 +1,2 @@
 from .restaurant import Restaurant
+from .restaurant_cell_rollup import RestaurantCellRollup
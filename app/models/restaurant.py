@@ -1,9 +1,10 @@
 from datetime import datetime as dt
-from typing import Optional
+from typing import Any, Optional
 from uuid import uuid4
 
-from sqlalchemy import func
-from sqlmodel import CheckConstraint, Column, DateTime, Field, SQLModel
+from geoalchemy2 import Geography
+from sqlalchemy import Computed, Index, func
+from sqlmodel import CheckConstraint, Column, DateTime, Field, SQLModel, Text
 
 
 class Restaurant(SQLModel, table=True):
@@ -20,16 +21,55 @@ class Restaurant(SQLModel, table=True):
     lat: float
     lng: float
 
+    # Stored point derived from `lat`/`lng` by the database itself, so every
+    # write path (ORM, Core inserts, COPY) keeps it in sync. It backs the
+    # GiST index used by the radius queries.
+    location: Optional[Any] = Field(
+        sa_column=Column(
+            Geography(geometry_type="POINT", srid=4326),
+            Computed("ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography"),
+            nullable=True,
+        )
+    )
+
+    # Text matched by the search, derived by the database like `location`.
+    # It backs the trigram index of the search queries.
+    search_text: Optional[str] = Field(
+        sa_column=Column(
+            Text,
+            Computed("name || ' ' || street || ' ' || city || ' ' || state"),
+            nullable=True,
+        )
+    )
+
     created_at: Optional[dt] = Field(
         sa_column=Column(
-            DateTime(timezone=True), nullable=True, server_default=func.now()
+            DateTime(timezone=True), nullable=False, server_default=func.now()
         )
     )
+    # Set on insert too, it versions the row for the conditional requests
     updated_at: Optional[dt] = Field(
-        sa_column=Column(DateTime(timezone=True), nullable=True, onupdate=func.now())
+        sa_column=Column(
+            DateTime(timezone=True),
+            nullable=False,
+            server_default=func.now(),
+            onupdate=func.now(),
+        )
     )
 
     __table_args__ = (
+        # Keyset pagination of the listings, optionally filtered
+        Index("ix_restaurant_created_at_id", "created_at", "id"),
+        Index("ix_restaurant_city_created_at_id", "city", "created_at", "id"),
+        Index("ix_restaurant_state_created_at_id", "state", "created_at", "id"),
+        Index("ix_restaurant_rating_created_at_id", "rating", "created_at", "id"),
+        # Word similarity and substring matches of the search
+        Index(
+            "ix_restaurant_search_text_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
         CheckConstraint(
             "email ~* '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Z|a-z]{2,}$'",
             name="valid_email",
@@ -0,0 +1,25 @@
+from sqlmodel import BigInteger, Column, Field, SQLModel
+
+# Cell sizes in degrees of the rollup levels, level 0 is the coarsest
+ROLLUP_CELL_SIZES = (1.0, 0.1, 0.01)
+
+
+class RestaurantCellRollup(SQLModel, table=True):
+    """
+    Count, sum and sum of squares of the ratings of the restaurants in each
+    grid cell, for every level of `ROLLUP_CELL_SIZES`. A restaurant belongs
+    to the cell `(floor(lat / size), floor(lng / size))`.
+
+    Rows are maintained by statement-level triggers on `restaurant`, in the
+    same transaction as the write, see the migration that creates the table.
+    """
+
+    __tablename__ = "restaurant_cell_rollup"
+
+    level: int = Field(primary_key=True)
+    cell_y: int = Field(primary_key=True)
+    cell_x: int = Field(primary_key=True)
+
+    count: int = Field(sa_column=Column(BigInteger, nullable=False))
+    rating_sum: int = Field(sa_column=Column(BigInteger, nullable=False))
+    rating_sq_sum: int = Field(sa_column=Column(BigInteger, nullable=False))
@@ -0,0 +1,15 @@
+# isort: skip_file
+from app.core import get_app_settings
+from app.core.settings.app_settings import DatabaseBackendTypes
+from app.repositories.restaurant_repository import RestaurantRepository
+from app.repositories.sqlite_restaurant_repository import SQLiteRestaurantRepository
+
+app_settings = get_app_settings()
+
+RESTAURANT_REPOSITORIES = {
+    DatabaseBackendTypes.postgresql: RestaurantRepository,
+    DatabaseBackendTypes.sqlite: SQLiteRestaurantRepository,
+}
+
+# Repository of the storage backend selected by `DATABASE_URI`
+restaurant_repository_class = RESTAURANT_REPOSITORIES[app_settings.database_backend]
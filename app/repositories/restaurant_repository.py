@@ -1,25 +1,158 @@
+# isort: skip_file
 # Python Imports
-from typing import Union
+import math
+from collections import defaultdict
+from datetime import datetime as dt
+from fractions import Fraction
+from typing import AsyncIterator, Optional, Sequence, Union
 
 # Third Party Imports
 from fastapi import Depends
-from sqlalchemy import func
-from sqlmodel import Session, select
+from geoalchemy2 import Geography
+from sqlalchemy import (
+    Float,
+    Integer,
+    and_,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    or_,
+    true,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncResult
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # Local Imports
-from app.core import get_logger
-from app.infrastructure import get_db_session
-from app.models import Restaurant
+from app.core import get_app_settings, get_logger
+from app.infrastructure import get_db_read_session, get_db_session
+from app.models import Restaurant, RestaurantCellRollup
+from app.models.restaurant_cell_rollup import ROLLUP_CELL_SIZES
+from app.schemas import Restaurant as RestaurantSchema
+from app.schemas import RestaurantFilter
 from app.utils.errors import AppError, ErrorType
+from app.utils.geo import cover_circle, grid_shape, parallel_bulge
 
 logger = get_logger(__name__)
+app_settings = get_app_settings()
+
+# Bound parameters of a statement, asyncpg takes up to 32767 and SQLite up
+# to 32766
+MAX_BIND_PARAMETERS = 32766
+
+# Columns exposed by the API, in the order of the response schema, so rows
+# can be encoded as they are. `location` only backs the spatial queries.
+restaurant_columns = [
+    Restaurant.__table__.c[name] for name in RestaurantSchema.__fields__
+]
+
+
+def rows_per_statement(batch_size: int, parameters: int) -> int:
+    """
+    Rows of a multi-row statement, at most `batch_size` and no more than fit
+    the bound parameters when each row binds `parameters` of them
+    """
+    return max(min(batch_size, MAX_BIND_PARAMETERS // max(parameters, 1)), 1)
+
+
+def select_columns(fields: Optional[Sequence[str]] = None) -> list:
+    """
+    Columns of a sparse fieldset, every exposed column when no `fields` are
+    given. The names must have been validated against the response schema.
+    """
+    if fields is None:
+        return restaurant_columns
+    return [Restaurant.__table__.c[name] for name in fields]
+
+
+# Columns provided on bulk loads, the rest come from server defaults
+copy_columns = [
+    "id",
+    "rating",
+    "name",
+    "site",
+    "email",
+    "phone",
+    "street",
+    "city",
+    "state",
+    "lat",
+    "lng",
+]
+
+
+def geography_point(lat: float, lng: float):
+    """
+    Builds a `geography(Point, 4326)` expression from the given coordinates,
+    comparable with the stored `Restaurant.location` column.
+    """
+    return cast(
+        func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326),
+        Geography(geometry_type="POINT", srid=4326),
+    )
+
+
+def escape_like(text: str) -> str:
+    """
+    Escapes the `LIKE` wildcards of the text, with a backslash
+    """
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def rating_statistics(count: int, total: int, squares: int) -> dict:
+    """
+    Count, average and sample standard deviation of ratings from their
+    count, sum and sum of squares. The sums are integers, so the variance is
+    computed exactly before the final rounding, like `avg` and `stddev` on
+    PostgreSQL numerics.
+    """
+    if not count:
+        return {"count": 0, "avg": 0, "std": 0}
+
+    std = 0
+    if count > 1:
+        variance = Fraction(count * squares - total * total, count * (count - 1))
+        std = math.sqrt(variance)
+    return {"count": count, "avg": total / count, "std": std}
+
+
+def apply_filters(statement, filters: Optional[RestaurantFilter]):
+    """
+    Adds the `WHERE` clauses matching the given filters to the statement.
+    """
+    if filters is None:
+        return statement
+    if filters.city is not None:
+        statement = statement.where(Restaurant.city == filters.city)
+    if filters.state is not None:
+        statement = statement.where(Restaurant.state == filters.state)
+    if filters.min_rating is not None:
+        statement = statement.where(Restaurant.rating >= filters.min_rating)
+    if filters.max_rating is not None:
+        statement = statement.where(Restaurant.rating <= filters.max_rating)
+    return statement
 
 
 class RestaurantRepository:
-    def __init__(self, session: Session = Depends(get_db_session)):
+    def __init__(
+        self,
+        session: AsyncSession = Depends(get_db_session),
+        read_session: AsyncSession = Depends(get_db_read_session),
+    ):
+        # Writes, and reads of the rows about to be written, use the primary
         self.session = session
+        # Other reads may be served by a read replica
+        self.read_session = read_session
 
-    def get(self, id: str) -> Union[Restaurant, None, AppError]:
+    async def get(
+        self, id: str, primary: bool = False
+    ) -> Union[Restaurant, None, AppError]:
         """
         Get a restaurant by id
 
@@ -27,6 +160,9 @@ class RestaurantRepository:
         ----------
         `id` : str
             The id of the restaurant to get
+        `primary` : bool
+            Whether to read from the primary, as the write session, which is
+            required to update or delete the returned instance
 
         Returns
         -------
@@ -35,7 +171,8 @@ class RestaurantRepository:
         """
         try:
             statement = select(Restaurant).where(Restaurant.id == id)
-            return self.session.exec(statement).first()
+            session = self.session if primary else self.read_session
+            return (await session.exec(statement)).first()
         except Exception as err:
             error_msg = "Error when fetching restaurant with id: {id}"
             logger.error(f"{error_msg}, error: {err}")
@@ -44,7 +181,69 @@ class RestaurantRepository:
                 message="Error when fetching restaurant",
             )
 
-    def get_all(self) -> Union[list[Restaurant], AppError]:
+    async def get_row(
+        self, id: str, fields: Optional[Sequence[str]] = None
+    ) -> Union[dict, None, AppError]:
+        """
+        Get the columns of a restaurant by id, as a dict matching the
+        response schema, without building an ORM instance
+
+        Parameters
+        ----------
+        `id` : str
+            The id of the restaurant to get
+        `fields` : Optional[Sequence[str]]
+            The columns to select, all of them by default
+
+        Returns
+        -------
+        `Union[dict, None, AppError]`
+            The restaurant if found, None if not found, otherwise an AppError
+        """
+        try:
+            statement = select(*select_columns(fields)).where(Restaurant.id == id)
+            row = (await self.read_session.execute(statement)).mappings().first()
+            return dict(row) if row is not None else None
+        except Exception as err:
+            error_msg = f"Error when fetching restaurant with id: {id}"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error when fetching restaurant",
+            )
+
+    async def get_version(
+        self, id: str, primary: bool = False
+    ) -> Union[dt, None, AppError]:
+        """
+        Get the `updated_at` of a restaurant, without loading the row
+
+        Parameters
+        ----------
+        `id` : str
+            The id of the restaurant
+        `primary` : bool
+            Whether to read from the primary, to see the latest writes
+
+        Returns
+        -------
+        `Union[datetime, None, AppError]`
+            The last modification time if found, None if not found,
+            otherwise an AppError
+        """
+        try:
+            statement = select(Restaurant.updated_at).where(Restaurant.id == id)
+            session = self.session if primary else self.read_session
+            return (await session.exec(statement)).first()
+        except Exception as err:
+            error_msg = f"Error when fetching version of restaurant with id: {id}"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error when fetching restaurant",
+            )
+
+    async def get_all(self) -> Union[list[Restaurant], AppError]:
         """
         Get all restaurants
 
@@ -55,7 +254,7 @@ class RestaurantRepository:
         """
         statement = select(Restaurant)
         try:
-            return self.session.exec(statement).fetchall()
+            return (await self.read_session.exec(statement)).fetchall()
         except Exception as err:
             error_msg = "Error while fetching all restaurants"
             logger.error(f"{error_msg}, error: {err}")
@@ -64,7 +263,111 @@ class RestaurantRepository:
                 message="Error while fetching all restaurants",
             )
 
-    def create(self, restaurant: Restaurant) -> Union[Restaurant, AppError]:
+    async def get_page(
+        self,
+        limit: int,
+        after: Optional[tuple[dt, str]] = None,
+        descending: bool = False,
+        filters: Optional[RestaurantFilter] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Union[list[dict], AppError]:
+        """
+        Get a page of restaurants ordered by `(created_at, id)`, using keyset
+        pagination so the cost doesn't depend on how deep the page is. Rows
+        are returned as dicts matching the response schema.
+
+        Parameters
+        ----------
+        `limit` : int
+            The maximum number of restaurants to return
+        `after` : Optional[tuple[datetime, str]]
+            The `(created_at, id)` of the last restaurant of the previous page
+        `descending` : bool
+            Whether to return the newest restaurants first
+        `filters` : Optional[RestaurantFilter]
+            Filters on city, state and rating
+        `fields` : Optional[Sequence[str]]
+            The columns to select, all of them by default
+
+        Returns
+        -------
+        `Union[list[dict], AppError]`
+            The restaurants of the page, otherwise an AppError
+        """
+        sort_key = tuple_(Restaurant.created_at, Restaurant.id)
+        statement = apply_filters(select(*select_columns(fields)), filters)
+
+        if after is not None:
+            after_key = tuple_(*after)
+            statement = statement.where(
+                sort_key < after_key if descending else sort_key > after_key
+            )
+
+        if descending:
+            statement = statement.order_by(
+                Restaurant.created_at.desc(), Restaurant.id.desc()
+            )
+        else:
+            statement = statement.order_by(Restaurant.created_at, Restaurant.id)
+
+        try:
+            result = await self.read_session.execute(statement.limit(limit))
+            keys = result.keys()
+            return [dict(zip(keys, row)) for row in result]
+        except Exception as err:
+            error_msg = "Error while fetching restaurants page"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching restaurants",
+            )
+
+    async def stream_all(
+        self, batch_size: int, fields: Optional[Sequence[str]] = None
+    ) -> Union[AsyncIterator[list[RowMapping]], AppError]:
+        """
+        Stream all restaurants through a server-side cursor, without
+        building ORM entities nor the full result list
+
+        Parameters
+        ----------
+        `batch_size` : int
+            The number of rows fetched from the cursor at a time
+        `fields` : Optional[Sequence[str]]
+            The columns to select, all of them by default
+
+        Returns
+        -------
+        `Union[AsyncIterator[list[RowMapping]], AppError]`
+            An iterator over batches of rows, otherwise an AppError
+        """
+        statement = select(*select_columns(fields))
+        try:
+            result = await self.read_session.stream(statement)
+        except Exception as err:
+            error_msg = "Error while streaming all restaurants"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while fetching all restaurants",
+            )
+        return self._iter_partitions(result, batch_size)
+
+    @staticmethod
+    async def _iter_partitions(
+        result: AsyncResult, batch_size: int
+    ) -> AsyncIterator[list[RowMapping]]:
+        try:
+            async for partition in result.mappings().partitions(batch_size):
+                yield partition
+        except Exception as err:
+            # The response has already started, it can only be cut short
+            logger.error(f"Error while streaming restaurants, error: {err}")
+            raise
+        finally:
+            await result.close()
+
+    async def create(self, restaurant: Restaurant) -> Union[Restaurant, AppError]:
         """
         Create a restaurant
 
@@ -81,84 +384,454 @@ class RestaurantRepository:
 
         try:
             self.session.add(restaurant)
-            self.session.commit()
-            self.session.refresh(restaurant)
+            await self.session.commit()
+            await self.session.refresh(restaurant)
             return restaurant
         except Exception as err:
             error_msg = "Error while creating restaurant"
             logger.error(f"{error_msg}, error: {err}")
-            self.session.rollback()
+            await self.session.rollback()
             return AppError(
                 error_type=ErrorType.DATASOURCE_ERROR,
                 message="Error while creating restaurant",
             )
 
-    def bulk_create(self, restaurants: list[Restaurant]) -> Union[bool, AppError]:
+    async def bulk_create(
+        self, rows: list[dict], batch_size: int
+    ) -> Union[list[str], AppError]:
         """
-        Create multiple restaurants
+        Create multiple restaurants with multi-row `INSERT ... RETURNING id`
+        statements, skipping the ORM unit of work. All batches share a
+        single transaction.
 
         Parameters
         ----------
-        `restaurants` : list[Restaurant]
-            The restaurants to create
+        `rows` : list[dict]
+            The restaurants to create, keyed by column name, ids included
+        `batch_size` : int
+            The number of rows per `INSERT` statement, lowered to fit the
+            bound parameters of a statement
 
         Returns
         -------
-        `Union[bool, AppError]`
-            True if successful, otherwise an AppError
+        `Union[list[str], AppError]`
+            The ids of the created restaurants, otherwise an AppError
         """
-
+        table = Restaurant.__table__
+        ids = []
+        if rows:
+            batch_size = rows_per_statement(batch_size, len(rows[0]))
         try:
-            self.session.add_all(restaurants)
-            self.session.commit()
-            return True
+            connection = await self.session.connection()
+            returning = connection.dialect.full_returning
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start : start + batch_size]
+                statement = insert(table).values(batch)
+                if returning:
+                    result = await self.session.execute(statement.returning(table.c.id))
+                    ids.extend(result.scalars().all())
+                else:
+                    await self.session.execute(statement)
+                    ids.extend(row["id"] for row in batch)
+            await self.session.commit()
+            return ids
         except Exception as err:
             error_msg = "Error while creating restaurants"
             logger.error(f"{error_msg}, error: {err}")
-            self.session.rollback()
+            await self.session.rollback()
             return AppError(
                 error_type=ErrorType.DATASOURCE_ERROR,
                 message="Error while creating restaurants",
             )
 
-    def update(self, restaurant: Restaurant) -> Union[Restaurant, AppError]:
+    async def copy_rows(self, rows: list[dict]) -> Union[int, AppError]:
+        """
+        Load a batch of validated rows and commit it, through `COPY ... FROM
+        STDIN` on PostgreSQL and through a batched `INSERT` elsewhere
+
+        Parameters
+        ----------
+        `rows` : list[dict]
+            The rows to load, keyed by column name, ids included
+
+        Returns
+        -------
+        `Union[int, AppError]`
+            The number of rows loaded, otherwise an AppError
+        """
         try:
-            self.session.add(restaurant)
-            self.session.commit()
-            self.session.refresh(restaurant)
+            connection = await self.session.connection()
+            if connection.dialect.driver == "asyncpg":
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    Restaurant.__tablename__,
+                    records=[tuple(row[c] for c in copy_columns) for row in rows],
+                    columns=copy_columns,
+                )
+            else:
+                await self.session.execute(insert(Restaurant.__table__), rows)
+            await self.session.commit()
+            return len(rows)
         except Exception as err:
-            error_msg = "Error while updating restaurant"
+            error_msg = "Error while copying restaurants"
             logger.error(f"{error_msg}, error: {err}")
-            self.session.rollback()
+            await self.session.rollback()
             return AppError(
                 error_type=ErrorType.DATASOURCE_ERROR,
-                message="Error while updating restaurant",
+                message="Error while creating restaurants",
+            )
+
+    async def update(
+        self, id: str, values: dict, versions: Optional[list[dt]] = None
+    ) -> Union[dict, None, AppError]:
+        """
+        Update the given columns of a restaurant with a single `UPDATE ...
+        RETURNING`, without loading it first. The table is joined to itself
+        to also return the previous coordinates.
+
+        Parameters
+        ----------
+        `id` : str
+            The id of the restaurant to update
+        `values` : dict
+            The new column values, keyed by column name
+        `versions` : Optional[list[datetime]]
+            The `updated_at` the restaurant must still have, any by default
+
+        Returns
+        -------
+        `Union[dict, None, AppError]`
+            The updated restaurant, matching the response schema, plus its
+            previous `old_lat` and `old_lng`. None if no restaurant matched,
+            otherwise an AppError
+        """
+        table = Restaurant.__table__
+        previous = table.alias("previous")
+        statement = (
+            update(table)
+            .where(table.c.id == id, previous.c.id == table.c.id)
+            # Set explicitly, so an empty update still bumps the version
+            .values(**values, updated_at=func.now())
+            .returning(
+                *restaurant_columns,
+                previous.c.lat.label("old_lat"),
+                previous.c.lng.label("old_lng"),
             )
-        return restaurant
+        )
+        if versions is not None:
+            statement = statement.where(table.c.updated_at.in_(versions))
 
-    def delete(self, restaurant: Restaurant) -> Union[bool, AppError]:
-        if not restaurant:
+        try:
+            row = (await self.session.execute(statement)).mappings().first()
+            await self.session.commit()
+            return dict(row) if row is not None else None
+        except Exception as err:
+            error_msg = f"Error while updating restaurant with id: {id}"
+            logger.error(f"{error_msg}, error: {err}")
+            await self.session.rollback()
             return AppError(
-                error_type=ErrorType.NOT_FOUND, message="Restaurant not found"
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while updating restaurant",
             )
 
+    async def delete(
+        self, id: str, versions: Optional[list[dt]] = None
+    ) -> Union[dict, None, AppError]:
+        """
+        Delete a restaurant with a single `DELETE ... RETURNING`, without
+        loading it first
+
+        Parameters
+        ----------
+        `id` : str
+            The id of the restaurant to delete
+        `versions` : Optional[list[datetime]]
+            The `updated_at` the restaurant must still have, any by default
+
+        Returns
+        -------
+        `Union[dict, None, AppError]`
+            The `id`, `lat` and `lng` of the deleted restaurant, None if no
+            restaurant matched, otherwise an AppError
+        """
+        table = Restaurant.__table__
+        statement = (
+            delete(table)
+            .where(table.c.id == id)
+            .returning(table.c.id, table.c.lat, table.c.lng)
+        )
+        if versions is not None:
+            statement = statement.where(table.c.updated_at.in_(versions))
+
         try:
-            self.session.delete(restaurant)
-            self.session.commit()
-            return True
+            row = (await self.session.execute(statement)).mappings().first()
+            await self.session.commit()
+            return dict(row) if row is not None else None
         except Exception as err:
-            error_msg = "Error while deleting restaurant"
+            error_msg = f"Error while deleting restaurant with id: {id}"
             logger.error(f"{error_msg}, error: {err}")
-            self.session.rollback()
+            await self.session.rollback()
             return AppError(
                 error_type=ErrorType.DATASOURCE_ERROR,
                 message="Error while deleting restaurant",
             )
 
+    async def bulk_update(
+        self, rows: list[dict], batch_size: int
+    ) -> Union[list[dict], AppError]:
+        """
+        Update many restaurants in a single transaction. Rows setting the
+        same columns are grouped, and each batch of a group is written by one
+        `UPDATE ... FROM (VALUES ...)` statement.
+
+        Parameters
+        ----------
+        `rows` : list[dict]
+            The new column values of each restaurant, keyed by column name,
+            `id` selects the restaurant and is not updated
+        `batch_size` : int
+            The number of rows per `UPDATE` statement, lowered to fit the
+            bound parameters of a statement
+
+        Returns
+        -------
+        `Union[list[dict], AppError]`
+            The `id`, `lat`, `lng` and `rating` of the updated restaurants,
+            plus their previous `old_lat` and `old_lng`, otherwise an AppError
+        """
+        table = Restaurant.__table__
+        previous = table.alias("previous")
+        groups = defaultdict(list)
+        for row in rows:
+            groups[tuple(sorted(row))].append(row)
+
+        updated = []
+        try:
+            for names, group in groups.items():
+                size = rows_per_statement(batch_size, len(names))
+                for start in range(0, len(group), size):
+                    batch = group[start : start + size]
+                    new = values(
+                        *(column(name, table.c[name].type) for name in names),
+                        name="new",
+                    ).data([tuple(row[name] for name in names) for row in batch])
+                    statement = (
+                        update(table)
+                        .where(table.c.id == new.c.id, previous.c.id == table.c.id)
+                        .values(
+                            {name: new.c[name] for name in names if name != "id"}
+                            | {"updated_at": func.now()}
+                        )
+                        .returning(
+                            table.c.id,
+                            table.c.lat,
+                            table.c.lng,
+                            table.c.rating,
+                            previous.c.lat.label("old_lat"),
+                            previous.c.lng.label("old_lng"),
+                        )
+                    )
+                    result = await self.session.execute(statement)
+                    updated.extend(dict(row) for row in result.mappings())
+            await self.session.commit()
+            return updated
+        except Exception as err:
+            error_msg = "Error while updating restaurants"
+            logger.error(f"{error_msg}, error: {err}")
+            await self.session.rollback()
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while updating restaurants",
+            )
+
+    async def bulk_delete(
+        self,
+        batch_size: int,
+        ids: Optional[list[str]] = None,
+        filters: Optional[RestaurantFilter] = None,
+    ) -> Union[list[dict], AppError]:
+        """
+        Delete many restaurants in a single transaction, selected by id or
+        by filters, at most `batch_size` rows per `DELETE ... RETURNING`
+        statement
+
+        Parameters
+        ----------
+        `batch_size` : int
+            The number of rows per `DELETE` statement, lowered to fit the
+            bound parameters of a statement
+        `ids` : Optional[list[str]]
+            The ids of the restaurants to delete
+        `filters` : Optional[RestaurantFilter]
+            Filters on city, state and rating matching the restaurants to
+            delete, used when no `ids` are given
+
+        Returns
+        -------
+        `Union[list[dict], AppError]`
+            The `id`, `lat` and `lng` of the deleted restaurants, otherwise an
+            AppError
+        """
+        table = Restaurant.__table__
+        returning = (table.c.id, table.c.lat, table.c.lng)
+        batch_size = rows_per_statement(batch_size, 1)
+
+        deleted = []
+        try:
+            if ids is not None:
+                for start in range(0, len(ids), batch_size):
+                    batch = ids[start : start + batch_size]
+                    statement = (
+                        delete(table).where(table.c.id.in_(batch)).returning(*returning)
+                    )
+                    result = await self.session.execute(statement)
+                    deleted.extend(dict(row) for row in result.mappings())
+            else:
+                # Bounded batches of the matching rows, until none is left
+                matching = apply_filters(select(table.c.id), filters)
+                while True:
+                    statement = (
+                        delete(table)
+                        .where(table.c.id.in_(matching.limit(batch_size)))
+                        .returning(*returning)
+                    )
+                    result = await self.session.execute(statement)
+                    batch = [dict(row) for row in result.mappings()]
+                    deleted.extend(batch)
+                    if len(batch) < batch_size:
+                        break
+            await self.session.commit()
+            return deleted
+        except Exception as err:
+            error_msg = "Error while deleting restaurants"
+            logger.error(f"{error_msg}, error: {err}")
+            await self.session.rollback()
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while deleting restaurants",
+            )
+
+    def within_radius(self, lat: float, lng: float, radius: float):
+        """
+        Condition of the restaurants within `radius` meters of the point, on
+        the sphere. Filtering on the stored `location` geography lets the
+        GiST index answer `ST_DWithin`.
+        """
+        return func.ST_DWithin(
+            Restaurant.location, geography_point(lat, lng), radius, False
+        )
+
+    def distance_to(self, lat: float, lng: float):
+        """
+        Sphere distance in meters of the restaurants to the point, like
+        `ST_DWithin` with `use_spheroid` off. The `<->` operator lets the GiST
+        index of `location` return the rows in distance order.
+        """
+        return Restaurant.location.op("<->", return_type=Float)(
+            geography_point(lat, lng)
+        )
+
+    def within_box(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+        """
+        Index condition narrowing a scan to the restaurants of a lat/lng box,
+        None when the box can't be narrowed
+
+        The GiST index is searched with a geography envelope, padded to
+        contain the whole lat/lng box. Boxes too wide to pad are scanned.
+        """
+        padding = parallel_bulge(max_lng - min_lng) + 1e-6
+        if max_lng - min_lng >= 180 or not (
+            -90 < min_lat - padding < max_lat + padding < 90
+        ):
+            return None
+
+        envelope = cast(
+            func.ST_MakeEnvelope(
+                min_lng, min_lat - padding, max_lng, max_lat + padding, 4326
+            ),
+            Geography(geometry_type="POLYGON", srid=4326),
+        )
+        return Restaurant.location.op("&&")(envelope)
+
+    def matches_text(self, query: str):
+        """
+        Condition of the restaurants whose `search_text` contains the query,
+        or has a word similar to it, both answered by its trigram GIN index
+        """
+        return or_(
+            Restaurant.search_text.op("%>")(query),
+            Restaurant.search_text.ilike(f"%{escape_like(query)}%", escape="\\"),
+        )
+
+    def text_score(self, query: str):
+        """
+        Relevance of the restaurants to the query, from 0 to 1, the greatest
+        trigram similarity between the query and a stretch of `search_text`
+        """
+        return func.word_similarity(query, Restaurant.search_text)
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        after: Optional[tuple[float, str]] = None,
+        filters: Optional[RestaurantFilter] = None,
+        circle: Optional[tuple[float, float, float]] = None,
+    ) -> Union[list[RowMapping], AppError]:
+        """
+        Search restaurants by name, street, city and state, ordered by
+        `(score, id)`, the most relevant first
+
+        Parameters
+        ----------
+        `query` : str
+            The text to search for, matched by `matches_text`
+        `limit` : int
+            The maximum number of restaurants to return
+        `after` : Optional[tuple[float, str]]
+            The `(score, id)` of the last restaurant of the previous page
+        `filters` : Optional[RestaurantFilter]
+            Filters on city, state and rating
+        `circle` : Optional[tuple[float, float, float]]
+            The `(lat, lng, radius)` the restaurants must lie in, with the
+            radius in meters
+
+        Returns
+        -------
+        `Union[list[RowMapping], AppError]`
+            The restaurant columns and their `score`, otherwise an AppError
+        """
+        score = self.text_score(query)
+        statement = apply_filters(
+            select(*restaurant_columns, score.label("score")), filters
+        ).where(self.matches_text(query))
+        if circle is not None:
+            statement = statement.where(self.within_radius(*circle))
+        if after is not None:
+            last_score, last_id = after
+            statement = statement.where(
+                or_(
+                    score < last_score,
+                    and_(score == last_score, Restaurant.id > last_id),
+                )
+            )
+        statement = statement.order_by(score.desc(), Restaurant.id).limit(limit)
+
+        try:
+            return (await self.read_session.execute(statement)).mappings().all()
+        except Exception as err:
+            error_msg = "Error while searching restaurants"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(error_type=ErrorType.DATASOURCE_ERROR, message=error_msg)
+
     # Specific Use Case Method
-    def get_near_restaurants_by_radius(
-        self, incoming_lat: float, incoming_lng: float, incoming_radius: float
-    ) -> list[Restaurant]:
+    async def get_near_restaurants_by_radius(
+        self,
+        incoming_lat: float,
+        incoming_lng: float,
+        incoming_radius: float,
+        primary: bool = False,
+    ) -> Union[dict, AppError]:
         """
         Retrieves a restaurant object from the `Restaurant`
         table whose coordinates are within the specified distance
@@ -171,7 +844,9 @@ class RestaurantRepository:
         `incoming_lng` : float
             The longitude of the incoming request.
         `incoming_radius` : float
-            The radius of the incoming request.
+            The radius of the incoming request, in meters.
+        `primary` : bool
+            Whether to read from the primary, to see the latest writes
 
         Returns
         -------
@@ -180,33 +855,15 @@ class RestaurantRepository:
 
         """
 
-        # The query is basically a SQL query that uses the
-        # PostGIS extension to calculate the distance between two points
-        # and then filters the results based on the distance.
-
         statement = select(
             func.count(Restaurant.id).label("count"),
             func.avg(Restaurant.rating).label("avg"),
             func.stddev(Restaurant.rating).label("std"),
-        ).where(
-            func.ST_DWithin(
-                func.ST_Transform(
-                    func.ST_SetSRID(
-                        func.ST_MakePoint(Restaurant.lng, Restaurant.lat),
-                        4326,
-                    ),
-                    3857,
-                ),
-                func.ST_Transform(
-                    func.ST_SetSRID(func.ST_MakePoint(incoming_lng, incoming_lat), 4326),
-                    3857,
-                ),
-                incoming_radius,
-            )
-        )
+        ).where(self.within_radius(incoming_lat, incoming_lng, incoming_radius))
 
         try:
-            result = self.session.exec(statement).fetchone()
+            session = self.session if primary else self.read_session
+            result = (await session.exec(statement)).fetchone()
         except Exception as err:
             error_msg = "Error while fetching all restaurants withing a radius"
             logger.error(f"{error_msg}, error: {err}")
@@ -224,3 +881,319 @@ class RestaurantRepository:
             "avg": result["avg"] if result["avg"] else 0,
             "std": result["std"] if result["std"] else 0,
         }
+
+    async def get_nearest(
+        self,
+        lat: float,
+        lng: float,
+        limit: int,
+        max_distance: Optional[float] = None,
+        after: Optional[tuple[float, str]] = None,
+        filters: Optional[RestaurantFilter] = None,
+    ) -> Union[list[RowMapping], AppError]:
+        """
+        Get the restaurants closest to a point, ordered by `(distance, id)`,
+        the distance being measured by `distance_to`
+
+        Parameters
+        ----------
+        `lat`, `lng` : float
+            The point to search from
+        `limit` : int
+            The maximum number of restaurants to return
+        `max_distance` : Optional[float]
+            Only restaurants within this many meters are returned
+        `after` : Optional[tuple[float, str]]
+            The `(distance, id)` of the last restaurant of the previous page
+        `filters` : Optional[RestaurantFilter]
+            Filters on city, state and rating
+
+        Returns
+        -------
+        `Union[list[RowMapping], AppError]`
+            The restaurant columns and their `distance` in meters, otherwise
+            an AppError
+        """
+        distance = self.distance_to(lat, lng)
+        statement = apply_filters(
+            select(*restaurant_columns, distance.label("distance")), filters
+        )
+        if max_distance is not None:
+            statement = statement.where(self.within_radius(lat, lng, max_distance))
+        if after is not None:
+            statement = statement.where(tuple_(distance, Restaurant.id) > tuple_(*after))
+        statement = statement.order_by(distance, Restaurant.id).limit(limit)
+
+        try:
+            return (await self.read_session.execute(statement)).mappings().all()
+        except Exception as err:
+            error_msg = "Error while fetching the nearest restaurants"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(error_type=ErrorType.DATASOURCE_ERROR, message=error_msg)
+
+    async def get_near_restaurants_by_radius_batch(
+        self, circles: list[tuple[float, float, int]], primary: bool = False
+    ) -> Union[list[dict], AppError]:
+        """
+        Radius statistics of many circles at once, with a single query
+        joining a `VALUES` list of the circles to the restaurants, each circle
+        answered by the GiST index of `location`
+
+        Parameters
+        ----------
+        `circles` : list[tuple[float, float, int]]
+            The latitude, longitude and radius, in meters, of the circles
+        `primary` : bool
+            Whether to read from the primary, to see the latest writes
+
+        Returns
+        -------
+        `Union[list[dict], AppError]`
+            { "count": int, "avg": float, "std": float } of every circle, in
+            input order, otherwise an AppError
+        """
+        if not circles:
+            return []
+
+        circle_values = values(
+            column("position", Integer),
+            column("lat", Float),
+            column("lng", Float),
+            column("radius", Float),
+            name="circles",
+        ).data([(position, *circle) for position, circle in enumerate(circles)])
+        statement = (
+            select(
+                circle_values.c.position,
+                func.count(Restaurant.id).label("count"),
+                func.avg(Restaurant.rating).label("avg"),
+                func.stddev(Restaurant.rating).label("std"),
+            )
+            .select_from(circle_values)
+            .outerjoin(
+                Restaurant,
+                func.ST_DWithin(
+                    Restaurant.location,
+                    geography_point(circle_values.c.lat, circle_values.c.lng),
+                    circle_values.c.radius,
+                    False,
+                ),
+            )
+            .group_by(circle_values.c.position)
+            .order_by(circle_values.c.position)
+        )
+
+        try:
+            session = self.session if primary else self.read_session
+            rows = (await session.execute(statement)).all()
+        except Exception as err:
+            error_msg = "Error while fetching all restaurants withing a radius"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(error_type=ErrorType.DATASOURCE_ERROR, message=error_msg)
+
+        return [
+            {"count": row.count or 0, "avg": row.avg or 0, "std": row.std or 0}
+            for row in rows
+        ]
+
+    async def get_grid_statistics(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        cell_size: float,
+    ) -> Union[dict, AppError]:
+        """
+        Rating statistics of every cell of a grid of `cell_size` degrees
+        anchored at the south-west corner of the box, in one aggregate pass
+        over the restaurants of the box
+
+        Returns
+        -------
+        `Union[dict, AppError]`
+            { "row": list, "col": list, "count": list, "avg": list,
+            "std": list }, for the non-empty cells in row-major order,
+            otherwise an AppError
+        """
+        rows, cols = grid_shape(min_lat, min_lng, max_lat, max_lng, cell_size)
+        # The north and east edges belong to the last row and column
+        row = func.least(func.floor((Restaurant.lat - min_lat) / cell_size), rows - 1)
+        col = func.least(func.floor((Restaurant.lng - min_lng) / cell_size), cols - 1)
+
+        cells = (
+            select(
+                cast(row, Integer).label("row"),
+                cast(col, Integer).label("col"),
+                Restaurant.rating,
+            )
+            .where(Restaurant.lat.between(min_lat, max_lat))
+            .where(Restaurant.lng.between(min_lng, max_lng))
+        )
+        candidates = self.within_box(min_lat, min_lng, max_lat, max_lng)
+        if candidates is not None:
+            cells = cells.where(candidates)
+        # Grouped by the columns of the subquery, each copy of the cell
+        # expressions would get parameters of its own, which PostgreSQL
+        # doesn't match with the selected ones
+        cells = cells.subquery("cells")
+
+        statement = (
+            select(
+                cells.c.row,
+                cells.c.col,
+                func.count().label("count"),
+                func.avg(cells.c.rating).label("avg"),
+                func.stddev(cells.c.rating).label("std"),
+            )
+            .group_by(cells.c.row, cells.c.col)
+            .order_by(cells.c.row, cells.c.col)
+        )
+
+        try:
+            rows = (await self.read_session.execute(statement)).all()
+        except Exception as err:
+            error_msg = "Error while computing the restaurants grid"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(error_type=ErrorType.DATASOURCE_ERROR, message=error_msg)
+
+        return {
+            "row": [r.row for r in rows],
+            "col": [r.col for r in rows],
+            "count": [r.count for r in rows],
+            "avg": [float(r.avg) for r in rows],
+            "std": [float(r.std or 0) for r in rows],
+        }
+
+    async def get_near_restaurants_by_radius_from_rollups(
+        self,
+        incoming_lat: float,
+        incoming_lng: float,
+        incoming_radius: float,
+        primary: bool = False,
+    ) -> Union[dict, AppError]:
+        """
+        Same statistics as `get_near_restaurants_by_radius`, adding up the
+        rollups of the grid cells lying fully inside the circle and only
+        reading the restaurants of the cells crossed by its boundary.
+
+        The finest rollup level whose grid covers the circle with at most
+        `STATISTICS_ROLLUP_MAX_CELLS` cells is used. Circles too small to
+        contain a whole cell, or too large for every level, fall back to the
+        plain radius query. `primary` reads from the primary, to see the
+        latest writes. The count is the same, the average and deviation are
+        divided in floats and may differ from the numerics of the radius
+        query in the last bits.
+
+        Returns
+        -------
+        `result`: dict
+            { "count": int, "avg": float, "std": float }
+        """
+        for level in reversed(range(len(ROLLUP_CELL_SIZES))):
+            cell_size = ROLLUP_CELL_SIZES[level]
+            cover = cover_circle(
+                incoming_lat,
+                incoming_lng,
+                incoming_radius,
+                cell_size,
+                app_settings.STATISTICS_ROLLUP_MAX_CELLS,
+            )
+            if cover is not None:
+                break
+
+        if cover is None or not cover[0]:
+            return await self.get_near_restaurants_by_radius(
+                incoming_lat, incoming_lng, incoming_radius, primary
+            )
+
+        runs, boundary = cover
+        rollup = RestaurantCellRollup
+        inside_cells = values(
+            column("y", Integer),
+            column("min_x", Integer),
+            column("max_x", Integer),
+            name="inside_cells",
+        ).data(runs)
+        inside = (
+            select(
+                func.coalesce(func.sum(rollup.count), 0).label("count"),
+                func.coalesce(func.sum(rollup.rating_sum), 0).label("total"),
+                func.coalesce(func.sum(rollup.rating_sq_sum), 0).label("squares"),
+            )
+            .join_from(
+                rollup,
+                inside_cells,
+                and_(
+                    rollup.level == level,
+                    rollup.cell_y == inside_cells.c.y,
+                    rollup.cell_x.between(inside_cells.c.min_x, inside_cells.c.max_x),
+                ),
+            )
+            .subquery()
+        )
+
+        boundary_cells = values(
+            column("y", Integer), column("x", Integer), name="boundary_cells"
+        ).data(boundary)
+        # Each cell is looked up through the GiST index with its envelope,
+        # padded since geography edges bend away from the parallels, within
+        # the valid coordinates
+        padding = cell_size / 10
+        envelope = cast(
+            func.ST_MakeEnvelope(
+                func.greatest(boundary_cells.c.x * cell_size - padding, -180),
+                func.greatest(boundary_cells.c.y * cell_size - padding, -90),
+                func.least((boundary_cells.c.x + 1) * cell_size + padding, 180),
+                func.least((boundary_cells.c.y + 1) * cell_size + padding, 90),
+                4326,
+            ),
+            Geography(geometry_type="POLYGON", srid=4326),
+        )
+        on_boundary = (
+            select(
+                func.count(Restaurant.id).label("count"),
+                func.coalesce(func.sum(Restaurant.rating), 0).label("total"),
+                func.coalesce(func.sum(Restaurant.rating * Restaurant.rating), 0).label(
+                    "squares"
+                ),
+            )
+            .join_from(
+                Restaurant,
+                boundary_cells,
+                and_(
+                    Restaurant.location.op("&&")(envelope),
+                    # The same cell assignment as the rollup triggers
+                    func.floor(Restaurant.lat / cell_size) == boundary_cells.c.y,
+                    func.floor(Restaurant.lng / cell_size) == boundary_cells.c.x,
+                ),
+            )
+            .where(
+                func.ST_DWithin(
+                    Restaurant.location,
+                    geography_point(incoming_lat, incoming_lng),
+                    incoming_radius,
+                    False,
+                )
+            )
+            .subquery()
+        )
+
+        # A single statement, so both parts read the same snapshot
+        statement = select(
+            (inside.c.count + on_boundary.c.count).label("count"),
+            (inside.c.total + on_boundary.c.total).label("total"),
+            (inside.c.squares + on_boundary.c.squares).label("squares"),
+        ).select_from(inside.join(on_boundary, true()))
+
+        try:
+            session = self.session if primary else self.read_session
+            result = (await session.execute(statement)).one()
+        except Exception as err:
+            error_msg = "Error while fetching all restaurants withing a radius"
+            logger.error(f"{error_msg}, error: {err}")
+            return AppError(error_type=ErrorType.DATASOURCE_ERROR, message=error_msg)
+
+        return rating_statistics(
+            int(result.count), int(result.total), int(result.squares)
+        )
@@ -0,0 +1,312 @@
+# isort: skip_file
+# Python Imports
+from collections import defaultdict
+from datetime import datetime as dt
+from typing import Optional, Union
+
+# Third Party Imports
+from sqlalchemy import and_, bindparam, delete, func, literal_column, or_, update
+from sqlmodel import select
+
+# Local Imports
+from app.core import get_logger
+from app.infrastructure.sqlite import (
+    WORD_SIMILARITY_THRESHOLD,
+    match_expression,
+    restaurant_rtree,
+    restaurant_search,
+)
+from app.models import Restaurant
+from app.repositories.restaurant_repository import (
+    RestaurantRepository,
+    apply_filters,
+    escape_like,
+    restaurant_columns,
+    rows_per_statement,
+)
+from app.schemas import RestaurantFilter
+from app.utils.errors import AppError, ErrorType
+from app.utils.geo import circle_bounds
+
+logger = get_logger(__name__)
+
+# Aliases `rtree_id`, the key of the R*Tree entries
+restaurant_rowid = literal_column("restaurant.rowid")
+
+
+def rtree_candidates(min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+    """
+    Condition of the restaurants inside a lat/lng box, answered by the R*Tree
+    """
+    rtree = restaurant_rtree.c
+    return restaurant_rowid.in_(
+        select(rtree.id).where(
+            rtree.max_lat >= min_lat,
+            rtree.min_lat <= max_lat,
+            rtree.max_lng >= min_lng,
+            rtree.min_lng <= max_lng,
+        )
+    )
+
+
+class SQLiteRestaurantRepository(RestaurantRepository):
+    """
+    Restaurant repository of the SQLite backend. Spatial conditions go
+    through the R*Tree of `app.infrastructure.sqlite` and the registered
+    `haversine` function, and writes read the rows they return themselves,
+    since the SQLite dialect can't compile `RETURNING`. Searches go
+    through the FTS5 trigram index and the registered `word_similarity`.
+    """
+
+    def within_radius(self, lat: float, lng: float, radius: float):
+        """
+        Condition of the restaurants within `radius` meters of the point, on
+        the same sphere as PostGIS. The R*Tree narrows the candidates to the
+        bounding box of the circle, only their distance is computed.
+        """
+        distance = func.haversine(Restaurant.lat, Restaurant.lng, lat, lng) <= radius
+        bounds = circle_bounds(lat, lng, radius)
+        if bounds is None:
+            return distance
+        return and_(rtree_candidates(*bounds), distance)
+
+    def distance_to(self, lat: float, lng: float):
+        return func.haversine(Restaurant.lat, Restaurant.lng, lat, lng)
+
+    def within_box(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+        return rtree_candidates(min_lat, min_lng, max_lat, max_lng)
+
+    def matches_text(self, query: str):
+        """
+        Condition of the restaurants whose `search_text` contains the query,
+        or has a word similar to it. The FTS5 index narrows the candidates to
+        the rows sharing a trigram with the query, only they are scored.
+        """
+        # The native `LIKE` first, the score is only computed when it fails
+        matches = or_(
+            Restaurant.search_text.ilike(f"%{escape_like(query)}%", escape="\\"),
+            self.text_score(query) >= WORD_SIMILARITY_THRESHOLD,
+        )
+        expression = match_expression(query)
+        if expression is None:
+            return matches
+
+        candidates = select(literal_column("restaurant_search.rowid")).where(
+            restaurant_search.c.search_text.match(expression)
+        )
+        return and_(restaurant_rowid.in_(candidates), matches)
+
+    async def get_near_restaurants_by_radius_batch(
+        self, circles: list[tuple[float, float, int]], primary: bool = False
+    ) -> Union[list[dict], AppError]:
+        """
+        Radius statistics of many circles, one query per circle within a
+        single transaction, as the R*Tree needs the bounding box of each
+        circle up front
+        """
+        results = []
+        for circle in circles:
+            result = await self.get_near_restaurants_by_radius(*circle, primary)
+            if isinstance(result, AppError):
+                return result
+            results.append(result)
+        return results
+
+    async def get_near_restaurants_by_radius_from_rollups(
+        self,
+        incoming_lat: float,
+        incoming_lng: float,
+        incoming_radius: float,
+        primary: bool = False,
+    ) -> Union[dict, AppError]:
+        # The rollups are maintained by PostgreSQL triggers only
+        return await self.get_near_restaurants_by_radius(
+            incoming_lat, incoming_lng, incoming_radius, primary
+        )
+
+    async def update(
+        self, id: str, values: dict, versions: Optional[list[dt]] = None
+    ) -> Union[dict, None, AppError]:
+        """
+        Same as `RestaurantRepository.update`, the previous coordinates and
+        the updated row are read around the `UPDATE`, in its transaction
+        """
+        table = Restaurant.__table__
+        matching = [table.c.id == id]
+        if versions is not None:
+            matching.append(table.c.updated_at.in_(versions))
+
+        try:
+            statement = select(table.c.lat, table.c.lng).where(*matching)
+            previous = (await self.session.execute(statement)).first()
+            if previous is None:
+                await self.session.rollback()
+                return None
+
+            await self.session.execute(
+                update(table).where(*matching).values(**values, updated_at=func.now())
+            )
+            statement = select(*restaurant_columns).where(
+                table.c.id == values.get("id", id)
+            )
+            row = (await self.session.execute(statement)).mappings().one()
+            await self.session.commit()
+            return dict(row) | {"old_lat": previous.lat, "old_lng": previous.lng}
+        except Exception as err:
+            error_msg = f"Error while updating restaurant with id: {id}"
+            logger.error(f"{error_msg}, error: {err}")
+            await self.session.rollback()
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while updating restaurant",
+            )
+
+    async def delete(
+        self, id: str, versions: Optional[list[dt]] = None
+    ) -> Union[dict, None, AppError]:
+        """
+        Same as `RestaurantRepository.delete`, the deleted row is read before
+        the `DELETE`, in its transaction
+        """
+        table = Restaurant.__table__
+        matching = [table.c.id == id]
+        if versions is not None:
+            matching.append(table.c.updated_at.in_(versions))
+
+        try:
+            statement = select(table.c.id, table.c.lat, table.c.lng).where(*matching)
+            row = (await self.session.execute(statement)).mappings().first()
+            if row is not None:
+                await self.session.execute(delete(table).where(*matching))
+            await self.session.commit()
+            return dict(row) if row is not None else None
+        except Exception as err:
+            error_msg = f"Error while deleting restaurant with id: {id}"
+            logger.error(f"{error_msg}, error: {err}")
+            await self.session.rollback()
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while deleting restaurant",
+            )
+
+    async def bulk_update(
+        self, rows: list[dict], batch_size: int
+    ) -> Union[list[dict], AppError]:
+        """
+        Same as `RestaurantRepository.bulk_update`, each batch is read before
+        and after an executemany `UPDATE`, in a single transaction
+        """
+        table = Restaurant.__table__
+        # The ids of a batch are read with one bound parameter each
+        batch_size = rows_per_statement(batch_size, 1)
+        groups = defaultdict(list)
+        for row in rows:
+            groups[tuple(sorted(row))].append(row)
+
+        updated = []
+        try:
+            for names, group in groups.items():
+                # The bound parameters can't be named after the columns set
+                statement = (
+                    update(table)
+                    .where(table.c.id == bindparam("new_id"))
+                    .values(
+                        {
+                            name: bindparam(f"new_{name}")
+                            for name in names
+                            if name != "id"
+                        }
+                        | {"updated_at": func.now()}
+                    )
+                )
+                for start in range(0, len(group), batch_size):
+                    batch = group[start : start + batch_size]
+                    ids = [row["id"] for row in batch]
+                    previous = await self.session.execute(
+                        select(table.c.id, table.c.lat, table.c.lng).where(
+                            table.c.id.in_(ids)
+                        )
+                    )
+                    old_points = {row.id: (row.lat, row.lng) for row in previous}
+                    if not old_points:
+                        continue
+
+                    await self.session.execute(
+                        statement,
+                        [
+                            {f"new_{name}": row[name] for name in names}
+                            for row in batch
+                            if row["id"] in old_points
+                        ],
+                    )
+                    result = await self.session.execute(
+                        select(
+                            table.c.id, table.c.lat, table.c.lng, table.c.rating
+                        ).where(table.c.id.in_(list(old_points)))
+                    )
+                    updated.extend(
+                        dict(row)
+                        | dict(zip(("old_lat", "old_lng"), old_points[row["id"]]))
+                        for row in result.mappings()
+                    )
+            await self.session.commit()
+            return updated
+        except Exception as err:
+            error_msg = "Error while updating restaurants"
+            logger.error(f"{error_msg}, error: {err}")
+            await self.session.rollback()
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while updating restaurants",
+            )
+
+    async def bulk_delete(
+        self,
+        batch_size: int,
+        ids: Optional[list[str]] = None,
+        filters: Optional[RestaurantFilter] = None,
+    ) -> Union[list[dict], AppError]:
+        """
+        Same as `RestaurantRepository.bulk_delete`, each batch is read before
+        its `DELETE`, in a single transaction
+        """
+        table = Restaurant.__table__
+        returning = select(table.c.id, table.c.lat, table.c.lng)
+        batch_size = rows_per_statement(batch_size, 1)
+
+        deleted = []
+        try:
+            if ids is not None:
+                for start in range(0, len(ids), batch_size):
+                    batch = ids[start : start + batch_size]
+                    statement = returning.where(table.c.id.in_(batch))
+                    deleted.extend(await self._delete_rows(statement))
+            else:
+                # Bounded batches of the matching rows, until none is left
+                statement = apply_filters(returning, filters).limit(batch_size)
+                while True:
+                    batch = await self._delete_rows(statement)
+                    deleted.extend(batch)
+                    if len(batch) < batch_size:
+                        break
+            await self.session.commit()
+            return deleted
+        except Exception as err:
+            error_msg = "Error while deleting restaurants"
+            logger.error(f"{error_msg}, error: {err}")
+            await self.session.rollback()
+            return AppError(
+                error_type=ErrorType.DATASOURCE_ERROR,
+                message="Error while deleting restaurants",
+            )
+
+    async def _delete_rows(self, statement) -> list[dict]:
+        """
+        Deletes the restaurants selected by the statement, returning its rows
+        """
+        table = Restaurant.__table__
+        rows = [dict(row) for row in (await self.session.execute(statement)).mappings()]
+        if rows:
+            ids = [row["id"] for row in rows]
+            await self.session.execute(delete(table).where(table.c.id.in_(ids)))
+        return rows
@@ -1,7 +1,22 @@
 # isort: skip_file
 from .restaurant_schema import (
+    ExportFormat,
+    ImportJobStatus,
     Restaurant,
+    RestaurantBulkDelete,
+    RestaurantBulkResult,
+    RestaurantBulkUpdate,
     RestaurantCountResponse,
     RestaurantCreate,
+    RestaurantFilter,
+    RestaurantGrid,
+    RestaurantImportJob,
+    RestaurantImportResult,
+    RestaurantNearestPage,
+    RestaurantPage,
+    RestaurantSearchPage,
+    RestaurantSearchResult,
     RestaurantUpdate,
+    RestaurantWithDistance,
+    StatisticsCircle,
 )
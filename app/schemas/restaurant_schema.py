@@ -1,7 +1,8 @@
 from datetime import datetime as dt
+from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, EmailStr, Field, root_validator, validator
 
 
 class RestaurantBase(BaseModel):
@@ -45,6 +46,11 @@ class RestaurantUpdate(RestaurantBase):
     pass
 
 
+# Partial update of a bulk request, `id` selects the restaurant to update
+class RestaurantBulkUpdate(RestaurantUpdate):
+    id: str
+
+
 # Class to return the response of restaurant in a radius
 class RestaurantCountResponse(BaseModel):
     count: int
@@ -52,6 +58,87 @@ class RestaurantCountResponse(BaseModel):
     std: float
 
 
+# Statistics of the cells of a grid over a bounding box, in columns. Only
+# the cells holding restaurants are listed, `row` and `col` count from the
+# south-west corner of the box.
+class RestaurantGrid(BaseModel):
+    min_lat: float
+    min_lng: float
+    cell_size: float
+    rows: int
+    cols: int
+    row: list[int]
+    col: list[int]
+    count: list[int]
+    avg: list[float]
+    std: list[float]
+
+
+# Circle of a batch statistics request
+class StatisticsCircle(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    radius: int = Field(..., ge=0)
+
+
+# Filters accepted by the restaurant listings
+class RestaurantFilter(BaseModel):
+    city: Optional[str]
+    state: Optional[str]
+    min_rating: Optional[int] = Field(None, ge=0, le=4)
+    max_rating: Optional[int] = Field(None, ge=0, le=4)
+
+
+# Restaurants to remove in a bulk delete, either by id or by filters
+class RestaurantBulkDelete(BaseModel):
+    ids: Optional[list[str]]
+    filters: Optional[RestaurantFilter]
+
+    @root_validator
+    def ids_or_filters(cls, values):
+        ids, filters = values.get("ids"), values.get("filters")
+        if (ids is None) == (filters is None):
+            raise ValueError("Either ids or filters must be given")
+        # An empty filter would match the whole table
+        if filters is not None and not filters.dict(exclude_none=True):
+            raise ValueError("Filters must set at least one condition")
+        return values
+
+
+# Outcome of a bulk update or delete, by restaurant id
+class RestaurantBulkResult(BaseModel):
+    succeeded: list[str]
+    not_found: list[str]
+
+
+# Outcome of a CSV import
+class RestaurantImportResult(BaseModel):
+    rows_loaded: int
+    rows_rejected: int
+
+
+# States of a background CSV import
+class ImportJobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+# Progress of a background CSV import, `rows_per_second` since it started
+class RestaurantImportJob(BaseModel):
+    id: str
+    status: ImportJobStatus
+    rows_processed: int
+    rows_loaded: int
+    rows_rejected: int
+    rows_per_second: float
+    error: Optional[str]
+    created_at: dt
+    started_at: Optional[dt]
+    finished_at: Optional[dt]
+
+
 class RestaurantInDBBase(RestaurantBase):
     id: Optional[str]
     created_at: Optional[dt]
@@ -63,3 +150,37 @@ class RestaurantInDBBase(RestaurantBase):
 
 class Restaurant(RestaurantInDBBase):
     pass
+
+
+# Page of restaurants, `next_cursor` is null on the last page
+class RestaurantPage(BaseModel):
+    data: list[Restaurant]
+    next_cursor: Optional[str]
+
+
+# Restaurant returned by the nearest search, `distance` is in meters
+class RestaurantWithDistance(Restaurant):
+    distance: float
+
+
+# Restaurants sorted by distance, `next_cursor` is null on the last page
+class RestaurantNearestPage(BaseModel):
+    data: list[RestaurantWithDistance]
+    next_cursor: Optional[str]
+
+
+# Restaurant returned by the search, `score` ranks it from 0 to 1
+class RestaurantSearchResult(Restaurant):
+    score: float
+
+
+# Restaurants sorted by relevance, `next_cursor` is null on the last page
+class RestaurantSearchPage(BaseModel):
+    data: list[RestaurantSearchResult]
+    next_cursor: Optional[str]
+
+
+# Formats of the full table export
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    json = "json"
@@ -1,17 +1,101 @@
 # isort:skip_file
-from typing import Union
+from datetime import datetime as dt
+from typing import AsyncIterator, BinaryIO, Callable, Iterable, Optional, Union
+from uuid import uuid4
 
 import pandas as pd
 from fastapi import Depends, UploadFile
-from fastapi.encoders import jsonable_encoder
+from pandas.io.parsers import TextFileReader
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
-from app.core import get_logger
+from app.core import get_app_settings, get_logger
+from app.core.settings.app_settings import StatisticsEngineTypes
+from app.infrastructure.db import async_session_factory
+from app.infrastructure.import_jobs import ImportJob, import_jobs
+from app.infrastructure.spatial_index import restaurant_index
+from app.infrastructure.statistics_cache import statistics_cache
 from app.models.restaurant import Restaurant
+from app.repositories.backends import restaurant_repository_class
 from app.repositories.restaurant_repository import RestaurantRepository
-from app.schemas import RestaurantCountResponse, RestaurantCreate, RestaurantUpdate
+from app.schemas import (
+    ExportFormat,
+    RestaurantBulkDelete,
+    RestaurantBulkResult,
+    RestaurantBulkUpdate,
+    RestaurantCountResponse,
+    RestaurantCreate,
+    RestaurantFilter,
+    RestaurantGrid,
+    RestaurantImportResult,
+    RestaurantNearestPage,
+    RestaurantPage,
+    RestaurantSearchPage,
+    RestaurantSearchResult,
+    RestaurantUpdate,
+    RestaurantWithDistance,
+    StatisticsCircle,
+)
+from app.utils import decode_cursor, encode_cursor
+from app.utils.serialization import iter_json_array, iter_ndjson
 from app.utils.errors import AppError, ErrorType
+from app.utils.geo import grid_shape, parse_bbox
 
 logger = get_logger(__name__)
+app_settings = get_app_settings()
+
+# Latitude, longitude and radius, in meters, of a statistics circle
+Circle = tuple[float, float, int]
+
+# Columns read along a sparse fieldset, the cursor and validators need them
+ROW_VERSION_FIELDS = ("updated_at",)
+PAGE_KEY_FIELDS = ("id", "created_at", "updated_at")
+
+
+def with_fields(
+    fields: Optional[list[str]], required: Iterable[str]
+) -> Optional[list[str]]:
+    """
+    Extends a sparse fieldset with the columns required to answer it
+    """
+    if fields is None:
+        return None
+    return fields + [name for name in required if name not in fields]
+
+
+def restaurant_row(restaurant: RestaurantCreate) -> dict:
+    """
+    Column values of a restaurant to insert, with a generated id if missing
+    """
+    row = restaurant.dict()
+    row["id"] = row["id"] or str(uuid4())
+    return row
+
+
+def read_csv_batch(reader: TextFileReader) -> Optional[tuple[list[dict], int]]:
+    """
+    Parses and validates the next chunk of a CSV reader
+
+    Returns
+    -------
+    `Optional[tuple[list[dict], int]]`
+        The valid rows, ready to be inserted, and the number of rejected
+        rows, or None once the file is exhausted
+    """
+    chunk = next(reader, None)
+    if chunk is None:
+        return None
+
+    records = chunk.astype(object).where(chunk.notna(), None).to_dict(orient="records")
+    rows, rejected = [], 0
+    for record in records:
+        try:
+            rows.append(restaurant_row(RestaurantCreate(**record)))
+        except ValidationError:
+            rejected += 1
+
+    return rows, rejected
+
 
 # This is the service layer, it is responsible for business logic
 # and it is the only layer that can communicate with the repository layer
@@ -19,91 +103,605 @@ logger = get_logger(__name__)
 
 
 class RestaurantService:
-    def __init__(self, restaurant_repository: RestaurantRepository = Depends()):
+    def __init__(
+        self,
+        restaurant_repository: RestaurantRepository = Depends(
+            restaurant_repository_class
+        ),
+    ):
         self.restaurant_repository = restaurant_repository
+        self.spatial_index = (
+            restaurant_index
+            if app_settings.STATISTICS_ENGINE == StatisticsEngineTypes.memory
+            else None
+        )
+        self.statistics_cache = (
+            statistics_cache if app_settings.STATISTICS_CACHE_ENABLED else None
+        )
 
-    def get(self, id: int) -> Union[Restaurant, AppError]:
-        restaurant = self.restaurant_repository.get(id)
+    def invalidate_statistics(self, points: Iterable[tuple[float, float]]) -> None:
+        """
+        Drops the cached radius statistics around the written `(lat, lng)`
+        points
+        """
+        if self.statistics_cache is not None:
+            self.statistics_cache.invalidate(points)
+
+    async def build_spatial_index(self) -> None:
+        """
+        Loads every restaurant into the in-process spatial index,
+        only used when the `memory` statistics engine is enabled.
+        """
+        if self.spatial_index is None:
+            return
+
+        restaurants = await self.restaurant_repository.get_all()
+        if isinstance(restaurants, AppError):
+            logger.error("Spatial index not built, statistics will use the database")
+            return
+
+        self.spatial_index.build((r.id, r.lat, r.lng, r.rating) for r in restaurants)
+        logger.info(f"Spatial index built with {len(self.spatial_index)} restaurants")
+
+    async def get(
+        self, id: str, fields: Optional[list[str]] = None
+    ) -> Union[dict, None, AppError]:
+        """
+        Returns the restaurant columns in `fields`, and always its
+        `updated_at`
+        """
+        restaurant = await self.restaurant_repository.get_row(
+            id, with_fields(fields, ROW_VERSION_FIELDS)
+        )
         if not restaurant:
             logger.error(f"Restaurant not found with id: {id}")
             return None
         return restaurant
 
-    def get_all(self) -> list[Restaurant]:
-        return self.restaurant_repository.get_all()
+    async def get_version(self, id: str) -> Union[dt, None, AppError]:
+        return await self.restaurant_repository.get_version(id)
+
+    async def get_all(self) -> list[Restaurant]:
+        return await self.restaurant_repository.get_all()
+
+    async def get_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        descending: bool = False,
+        filters: Optional[RestaurantFilter] = None,
+        fields: Optional[list[str]] = None,
+    ) -> Union[RestaurantPage, AppError]:
+        """
+        Returns a page of restaurant columns in `fields`, and always their
+        `id`, `created_at` and `updated_at`
+        """
+        after = None
+        if cursor:
+            try:
+                created_at, last_id = decode_cursor(cursor)
+                after = (dt.fromisoformat(created_at), str(last_id))
+            except (TypeError, ValueError):
+                return AppError(
+                    error_type=ErrorType.BAD_REQUEST, message="Invalid cursor"
+                )
+
+        # One extra row tells whether there is a next page
+        restaurants = await self.restaurant_repository.get_page(
+            limit + 1,
+            after=after,
+            descending=descending,
+            filters=filters,
+            fields=with_fields(fields, PAGE_KEY_FIELDS),
+        )
+        if isinstance(restaurants, AppError):
+            return restaurants
+
+        next_cursor = None
+        if len(restaurants) > limit:
+            restaurants = restaurants[:limit]
+            last = restaurants[-1]
+            next_cursor = encode_cursor([last["created_at"].isoformat(), last["id"]])
+
+        # The rows come straight from the typed columns of the schema, they
+        # are not validated again
+        return RestaurantPage.construct(data=restaurants, next_cursor=next_cursor)
+
+    async def get_nearest(
+        self,
+        lat: float,
+        lng: float,
+        limit: int,
+        max_distance: Optional[float] = None,
+        cursor: Optional[str] = None,
+        filters: Optional[RestaurantFilter] = None,
+    ) -> Union[RestaurantNearestPage, AppError]:
+        after = None
+        if cursor:
+            try:
+                distance, last_id = decode_cursor(cursor)
+                after = (float(distance), str(last_id))
+            except (TypeError, ValueError):
+                return AppError(
+                    error_type=ErrorType.BAD_REQUEST, message="Invalid cursor"
+                )
+
+        # One extra row tells whether there is a next page
+        rows = await self.restaurant_repository.get_nearest(
+            lat, lng, limit + 1, max_distance=max_distance, after=after, filters=filters
+        )
+        if isinstance(rows, AppError):
+            return rows
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]["distance"], rows[-1]["id"]])
 
-    def create(self, restaurant: RestaurantCreate) -> Union[Restaurant, AppError]:
+        return RestaurantNearestPage(
+            data=[RestaurantWithDistance(**row) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        filters: Optional[RestaurantFilter] = None,
+        circle: Optional[tuple[float, float, float]] = None,
+    ) -> Union[RestaurantSearchPage, AppError]:
+        after = None
+        if cursor:
+            try:
+                score, last_id = decode_cursor(cursor)
+                after = (float(score), str(last_id))
+            except (TypeError, ValueError):
+                return AppError(
+                    error_type=ErrorType.BAD_REQUEST, message="Invalid cursor"
+                )
+
+        # One extra row tells whether there is a next page
+        rows = await self.restaurant_repository.search(
+            query, limit + 1, after=after, filters=filters, circle=circle
+        )
+        if isinstance(rows, AppError):
+            return rows
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]["score"], rows[-1]["id"]])
+
+        return RestaurantSearchPage(
+            data=[RestaurantSearchResult(**row) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    async def export(
+        self, format: ExportFormat, fields: Optional[list[str]] = None
+    ) -> Union[AsyncIterator[bytes], AppError]:
+        batches = await self.restaurant_repository.stream_all(
+            app_settings.EXPORT_BATCH_SIZE, fields
+        )
+        if isinstance(batches, AppError):
+            return batches
+
+        if format == ExportFormat.json:
+            return iter_json_array(batches)
+        return iter_ndjson(batches)
+
+    async def create(self, restaurant: RestaurantCreate) -> Union[Restaurant, AppError]:
         restaurant = Restaurant(**restaurant.dict())
-        return self.restaurant_repository.create(restaurant)
+        result = await self.restaurant_repository.create(restaurant)
+        if isinstance(result, AppError):
+            return result
+
+        if self.spatial_index is not None:
+            self.spatial_index.upsert(result.id, result.lat, result.lng, result.rating)
+        self.invalidate_statistics([(result.lat, result.lng)])
+        return result
 
-    def bulk_create(self, restaurants: list[RestaurantCreate]) -> bool:
-        restaurants = [Restaurant(**restaurant.dict()) for restaurant in restaurants]
-        return self.restaurant_repository.bulk_create(restaurants)
+    async def bulk_create(
+        self, restaurants: list[RestaurantCreate]
+    ) -> Union[list[str], AppError]:
+        rows = [restaurant_row(restaurant) for restaurant in restaurants]
+        ids = await self.restaurant_repository.bulk_create(
+            rows, app_settings.BULK_INSERT_BATCH_SIZE
+        )
+        if isinstance(ids, AppError):
+            return ids
 
-    def bulk_create_from_csv(self, csv_file: UploadFile) -> Union[bool, AppError]:
+        if self.spatial_index is not None:
+            self.spatial_index.upsert_many(
+                (r["id"], r["lat"], r["lng"], r["rating"]) for r in rows
+            )
+        self.invalidate_statistics((r["lat"], r["lng"]) for r in rows)
+        return ids
+
+    async def bulk_create_from_csv(
+        self, csv_file: UploadFile
+    ) -> Union[RestaurantImportResult, AppError]:
+        return await self.import_csv(csv_file.file)
+
+    async def start_csv_import(self, csv_file: UploadFile) -> Union[ImportJob, AppError]:
+        """
+        Spools the upload to disk and queues its import in the background
+        """
         try:
-            df = pd.read_csv(csv_file.file)
-            restaurants = df.to_dict(orient="records")
+            path = await run_in_threadpool(import_jobs.spool, csv_file.file)
         except Exception as err:
-            logger.error(f"Error while reading csv file, error: {err}")
+            logger.error(f"Error while spooling csv file, error: {err}")
             return AppError(
                 error_type=ErrorType.INTERNAL_SERVER_ERROR,
-                message="Error while reading csv file",
+                message="Error while spooling csv file",
             )
+
+        return import_jobs.submit(path, run_import_job)
+
+    def get_import_job(self, id: str) -> Union[ImportJob, AppError]:
+        return import_jobs.get(id)
+
+    async def import_csv(
+        self,
+        file: BinaryIO,
+        on_progress: Optional[Callable[[RestaurantImportResult], None]] = None,
+    ) -> Union[RestaurantImportResult, AppError]:
+        """
+        Loads a CSV file in bounded batches, each one validated, copied and
+        committed on its own, so memory depends on the batch size only.
+        Malformed lines, invalid rows and rows rejected by the database are
+        counted instead of failing the whole import. `on_progress` is called
+        with the counts so far after each batch.
+        """
+        result = RestaurantImportResult(rows_loaded=0, rows_rejected=0)
+
+        def skip_bad_line(line: list[str]) -> None:
+            result.rows_rejected += 1
+
         try:
-            restaurants = [Restaurant(**restaurant) for restaurant in restaurants]
+            # Parsing is CPU bound, keep it off the event loop. Only the python
+            # engine tells which lines it skips.
+            reader = await run_in_threadpool(
+                pd.read_csv,
+                file,
+                chunksize=app_settings.CSV_BATCH_SIZE,
+                dtype={"id": str, "phone": str},
+                engine="python",
+                on_bad_lines=skip_bad_line,
+            )
         except Exception as err:
-            logger.error(f"Error while parsing csv file, error: {err}")
+            logger.error(f"Error while reading csv file, error: {err}")
             return AppError(
-                error_type=ErrorType.BAD_REQUEST,
-                message="Error while parsing csv file, please check all fields",
+                error_type=ErrorType.INTERNAL_SERVER_ERROR,
+                message="Error while reading csv file",
             )
-        return self.restaurant_repository.bulk_create(restaurants)
 
-    def update(self, id: int, restaurant: RestaurantUpdate) -> Restaurant:
-        restaurant_in_db = self.restaurant_repository.get(id)
+        with reader:
+            while True:
+                try:
+                    batch = await run_in_threadpool(read_csv_batch, reader)
+                except Exception as err:
+                    logger.error(
+                        f"Error while parsing csv file after {result.rows_loaded} "
+                        f"rows, error: {err}"
+                    )
+                    return AppError(
+                        error_type=ErrorType.BAD_REQUEST,
+                        message="Error while parsing csv file, please check all fields",
+                    )
+                if batch is None:
+                    break
 
-        if not restaurant_in_db:
-            return AppError(
-                error_type=ErrorType.NOT_FOUND, message="Restaurant not found"
+                rows, rejected = batch
+                result.rows_rejected += rejected
+                if rows:
+                    await self.copy_batch(rows, result)
+                if on_progress is not None:
+                    on_progress(result)
+
+        return result
+
+    async def copy_batch(self, rows: list[dict], result: RestaurantImportResult) -> None:
+        """
+        Copies a batch of an import. A batch the database refuses is copied
+        again in halves, so only the rows it refuses are rejected.
+        """
+        loaded = await self.restaurant_repository.copy_rows(rows)
+        if isinstance(loaded, AppError):
+            if len(rows) == 1:
+                result.rows_rejected += 1
+                return
+            middle = len(rows) // 2
+            await self.copy_batch(rows[:middle], result)
+            await self.copy_batch(rows[middle:], result)
+            return
+
+        result.rows_loaded += loaded
+        if self.spatial_index is not None:
+            self.spatial_index.upsert_many(
+                (r["id"], r["lat"], r["lng"], r["rating"]) for r in rows
             )
+        self.invalidate_statistics((r["lat"], r["lng"]) for r in rows)
+
+    async def missed_write(self, id: str, versions: Optional[list[dt]]) -> AppError:
+        """
+        Tells why a conditional write matched no restaurant, only looking up
+        the version when there was a condition
+        """
+        if versions is not None:
+            updated_at = await self.restaurant_repository.get_version(id, primary=True)
+            if isinstance(updated_at, AppError):
+                return updated_at
+            if updated_at is not None:
+                return AppError(
+                    error_type=ErrorType.PRECONDITION_FAILED,
+                    message="Restaurant was modified, If-Match doesn't match",
+                )
 
-        obj_data = jsonable_encoder(restaurant_in_db)
+        return AppError(error_type=ErrorType.NOT_FOUND, message="Restaurant not found")
+
+    async def update(
+        self,
+        id: str,
+        restaurant: Union[RestaurantUpdate, dict],
+        versions: Optional[list[dt]] = None,
+    ) -> Union[dict, AppError]:
+        """
+        Updates the given fields of a restaurant in one statement, only if it
+        still has one of the `versions` when they are given
+        """
         if isinstance(restaurant, dict):
             update_data = restaurant
         else:
             update_data = restaurant.dict(exclude_unset=True)
 
-        # This is an iterator over the fields of the model to be updated
-        for field in obj_data:
-            if field in update_data:
-                setattr(restaurant_in_db, field, update_data[field])
+        # `location` is derived from `lat`/`lng` by the database
+        values = {
+            field: update_data[field]
+            for field in RestaurantUpdate.__fields__
+            if field in update_data
+        }
+        result = await self.restaurant_repository.update(id, values, versions)
+        if isinstance(result, AppError):
+            return result
+        if result is None:
+            return await self.missed_write(id, versions)
 
-        return self.restaurant_repository.update(restaurant_in_db)
+        old_point = (result.pop("old_lat"), result.pop("old_lng"))
+        if self.spatial_index is not None:
+            if result["id"] != id:
+                self.spatial_index.remove(id)
+            self.spatial_index.upsert(
+                result["id"], result["lat"], result["lng"], result["rating"]
+            )
+        self.invalidate_statistics([old_point, (result["lat"], result["lng"])])
+        return result
 
-    def delete(self, id: str) -> Restaurant:
-        restaurant_in_db = self.restaurant_repository.get(id)
+    async def delete(
+        self, id: str, versions: Optional[list[dt]] = None
+    ) -> Union[bool, AppError]:
+        """
+        Deletes a restaurant in one statement, only if it still has one of
+        the `versions` when they are given
+        """
+        result = await self.restaurant_repository.delete(id, versions)
+        if isinstance(result, AppError):
+            return result
+        if result is None:
+            return await self.missed_write(id, versions)
 
-        if isinstance(restaurant_in_db, AppError):
-            return restaurant_in_db
+        if self.spatial_index is not None:
+            self.spatial_index.remove(id)
+        self.invalidate_statistics([(result["lat"], result["lng"])])
+        return True
 
-        if not restaurant_in_db:
-            return AppError(
-                error_type=ErrorType.NOT_FOUND, message="Restaurant not found"
+    async def bulk_update(
+        self, restaurants: list[RestaurantBulkUpdate]
+    ) -> Union[RestaurantBulkResult, AppError]:
+        """
+        Applies many partial updates in one transaction, the updates of a
+        repeated id are merged in order
+        """
+        rows = {}
+        for restaurant in restaurants:
+            rows.setdefault(restaurant.id, {}).update(
+                restaurant.dict(exclude_unset=True)
+            )
+
+        updated = await self.restaurant_repository.bulk_update(
+            list(rows.values()), app_settings.BULK_WRITE_BATCH_SIZE
+        )
+        if isinstance(updated, AppError):
+            return updated
+
+        if self.spatial_index is not None:
+            self.spatial_index.upsert_many(
+                (r["id"], r["lat"], r["lng"], r["rating"]) for r in updated
+            )
+        self.invalidate_statistics(
+            point
+            for r in updated
+            for point in ((r["old_lat"], r["old_lng"]), (r["lat"], r["lng"]))
+        )
+
+        found = {r["id"] for r in updated}
+        return RestaurantBulkResult(
+            succeeded=[id for id in rows if id in found],
+            not_found=[id for id in rows if id not in found],
+        )
+
+    async def bulk_delete(
+        self, request: RestaurantBulkDelete
+    ) -> Union[RestaurantBulkResult, AppError]:
+        """
+        Deletes the restaurants selected by id or by filters in one
+        transaction
+        """
+        ids = None
+        if request.ids is not None:
+            ids = list(dict.fromkeys(request.ids))
+
+        deleted = await self.restaurant_repository.bulk_delete(
+            app_settings.BULK_WRITE_BATCH_SIZE, ids=ids, filters=request.filters
+        )
+        if isinstance(deleted, AppError):
+            return deleted
+
+        if self.spatial_index is not None:
+            for r in deleted:
+                self.spatial_index.remove(r["id"])
+        self.invalidate_statistics((r["lat"], r["lng"]) for r in deleted)
+
+        if ids is None:
+            return RestaurantBulkResult(
+                succeeded=[r["id"] for r in deleted], not_found=[]
+            )
+        found = {r["id"] for r in deleted}
+        return RestaurantBulkResult(
+            succeeded=[id for id in ids if id in found],
+            not_found=[id for id in ids if id not in found],
+        )
+
+    async def compute_radius_statistics(
+        self, circles: list[Circle], primary: bool
+    ) -> Union[list[dict], AppError]:
+        """
+        Radius statistics of the circles from the `STATISTICS_ENGINE`, the
+        database engines reading from the primary if `primary`
+        """
+        if self.spatial_index is not None and self.spatial_index.ready:
+            return [self.spatial_index.radius_statistics(*circle) for circle in circles]
+
+        repository = self.restaurant_repository
+        if app_settings.STATISTICS_ENGINE == StatisticsEngineTypes.rollup:
+            results = []
+            for circle in circles:
+                result = await repository.get_near_restaurants_by_radius_from_rollups(
+                    *circle, primary
+                )
+                if isinstance(result, AppError):
+                    return result
+                results.append(result)
+            return results
+
+        if len(circles) == 1:
+            result = await repository.get_near_restaurants_by_radius(
+                *circles[0], primary
             )
+            return result if isinstance(result, AppError) else [result]
+        return await repository.get_near_restaurants_by_radius_batch(circles, primary)
+
+    async def radius_statistics(
+        self, circles: list[Circle]
+    ) -> Union[list[RestaurantCountResponse], AppError]:
+        """
+        Radius statistics of the circles, the ones missing from the cache
+        computed together
+        """
+        cache = self.statistics_cache
+        responses: list[Optional[RestaurantCountResponse]] = [None] * len(circles)
+        missing = []
+        for position, circle in enumerate(circles):
+            key = token = None
+            if cache is not None:
+                key = cache.make_key(*circle)
+                cached, token = cache.get(key)
+                if cached is not None:
+                    responses[position] = cached
+                    continue
+            missing.append((position, key, token))
+        if not missing:
+            return responses
+
+        # A cached answer outlives the replication lag, it is read from the
+        # primary so the writes of this worker are in it
+        results = await self.compute_radius_statistics(
+            [circles[position] for position, _, _ in missing], cache is not None
+        )
+        if isinstance(results, AppError):
+            return results
 
-        return self.restaurant_repository.delete(restaurant_in_db)
+        for (position, key, token), result in zip(missing, results):
+            responses[position] = RestaurantCountResponse(**result)
+            if cache is not None:
+                cache.put(key, responses[position], token)
+        return responses
 
-    def count_restaurants_by_radius(
+    async def count_restaurants_by_radius(
         self, lat: float, lng: float, radius: int
-    ) -> RestaurantCountResponse:
-        result = self.restaurant_repository.get_near_restaurants_by_radius(
-            lat, lng, radius
+    ) -> Union[RestaurantCountResponse, AppError]:
+        result = await self.radius_statistics([(lat, lng, radius)])
+        return result if isinstance(result, AppError) else result[0]
+
+    async def count_restaurants_by_radius_batch(
+        self, circles: list[StatisticsCircle]
+    ) -> Union[list[RestaurantCountResponse], AppError]:
+        if len(circles) > app_settings.STATISTICS_BATCH_MAX_SIZE:
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST,
+                message="Too many circles, the maximum is "
+                f"{app_settings.STATISTICS_BATCH_MAX_SIZE}",
+            )
+
+        return await self.radius_statistics(
+            [(circle.latitude, circle.longitude, circle.radius) for circle in circles]
         )
+
+    async def grid_statistics(
+        self, bbox: str, cell_size: float
+    ) -> Union[RestaurantGrid, AppError]:
+        try:
+            min_lat, min_lng, max_lat, max_lng = parse_bbox(bbox)
+        except ValueError:
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST,
+                message="Invalid bbox, expected min_lng,min_lat,max_lng,max_lat",
+            )
+
+        try:
+            rows, cols = grid_shape(min_lat, min_lng, max_lat, max_lng, cell_size)
+        except (OverflowError, ValueError):
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST,
+                message="Invalid cell_size, too small for the bbox",
+            )
+        if rows * cols > app_settings.STATISTICS_GRID_MAX_CELLS:
+            return AppError(
+                error_type=ErrorType.BAD_REQUEST,
+                message="Too many cells, the maximum is "
+                f"{app_settings.STATISTICS_GRID_MAX_CELLS}",
+            )
+
+        box = (min_lat, min_lng, max_lat, max_lng, cell_size)
+        if self.spatial_index is not None and self.spatial_index.ready:
+            result = self.spatial_index.grid_statistics(*box)
+        else:
+            result = await self.restaurant_repository.get_grid_statistics(*box)
         if isinstance(result, AppError):
             return result
 
-        count = result["count"]
-        avg = result["avg"]
-        std = result["std"]
-        return RestaurantCountResponse(count=count, avg=avg, std=std)
+        return RestaurantGrid(
+            min_lat=min_lat,
+            min_lng=min_lng,
+            cell_size=cell_size,
+            rows=rows,
+            cols=cols,
+            **result,
+        )
+
+
+async def run_import_job(job: ImportJob) -> Union[RestaurantImportResult, AppError]:
+    """
+    Imports the spooled file of a job with a session of its own, the one of
+    the request that queued it is closed by then
+    """
+    async with async_session_factory() as session:
+        service = RestaurantService(restaurant_repository_class(session, session))
+        with open(job.path, "rb") as file:
+            return await service.import_csv(
+                file,
+                on_progress=lambda result: job.record(
+                    result.rows_loaded, result.rows_rejected
+                ),
+            )
@@ -1 +1,2 @@
 from .errors import AppError, ErrorType
+from .pagination import decode_cursor, encode_cursor
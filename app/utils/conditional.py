@@ -0,0 +1,154 @@
+import hashlib
+from datetime import datetime as dt
+from datetime import timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Sequence
+
+from fastapi import Response, status
+from pydantic import BaseModel
+
+EPOCH = dt(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def as_utc(value: dt) -> dt:
+    # Naive timestamps are stored in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def version_tag(updated_at: dt) -> str:
+    """
+    Microseconds since the epoch of `updated_at`, in hexadecimal
+    """
+    delta = as_utc(updated_at) - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return format(micros, "x")
+
+
+def tag_version(etag: str) -> Optional[dt]:
+    """
+    `updated_at` encoded in an entity ETag, the inverse of `entity_etag`,
+    None when the tag is weak or wasn't issued by `entity_etag`
+    """
+    if len(etag) < 2 or not (etag.startswith('"') and etag.endswith('"')):
+        return None
+    try:
+        micros = int(etag[1:-1].split("-", 1)[0], 16)
+        return EPOCH + timedelta(microseconds=micros)
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[list[dt]]:
+    """
+    Versions of a restaurant accepted by an `If-Match` header, None when any
+    version is, without the header or with `*`. The comparison is strong,
+    weak and unknown tags match no version.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    versions = (tag_version(tag.strip()) for tag in if_match.split(","))
+    return [version for version in versions if version is not None]
+
+
+def etag_digest():
+    """
+    Hash of the ETags, only to tell representations apart
+    """
+    return hashlib.sha1(usedforsecurity=False)
+
+
+def fields_tag(fields: Sequence[str]) -> str:
+    """
+    Short digest of a sparse fieldset, each one is a distinct representation
+    """
+    digest = etag_digest()
+    digest.update(",".join(fields).encode())
+    return digest.hexdigest()[:8]
+
+
+def entity_etag(updated_at: dt, fields: Optional[Sequence[str]] = None) -> str:
+    """
+    Strong ETag of a single restaurant, every write bumps its `updated_at`
+    """
+    if fields is None:
+        return f'"{version_tag(updated_at)}"'
+    return f'"{version_tag(updated_at)}-{fields_tag(fields)}"'
+
+
+def listing_etag(
+    versions: Iterable[tuple[str, dt]],
+    next_cursor: Optional[str],
+    fields: Optional[Sequence[str]] = None,
+) -> str:
+    """
+    Strong ETag of a page of restaurants, from the `(id, updated_at)` of its
+    rows, the cursor of the next page and the selected fields
+    """
+    digest = etag_digest()
+    for id, updated_at in versions:
+        digest.update(f"{id}:{version_tag(updated_at)}\n".encode())
+    digest.update((next_cursor or "").encode())
+    if fields is not None:
+        digest.update(f"\n{','.join(fields)}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def http_date(value: dt) -> str:
+    return format_datetime(as_utc(value), usegmt=True)
+
+
+class Preconditions(BaseModel):
+    """
+    Conditional request headers of a `GET`
+    """
+
+    if_none_match: Optional[str]
+    if_modified_since: Optional[str]
+
+    @property
+    def present(self) -> bool:
+        return bool(self.if_none_match or self.if_modified_since)
+
+    def not_modified(self, etag: str, last_modified: Optional[dt] = None) -> bool:
+        """
+        Whether the client copy is still current, `If-None-Match` takes
+        precedence over `If-Modified-Since` as in RFC 9110
+        """
+        if self.if_none_match:
+            if self.if_none_match.strip() == "*":
+                return True
+            # Weak comparison, `W/` prefixes are ignored
+            tags = (tag.strip() for tag in self.if_none_match.split(","))
+            return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+        if self.if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(self.if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            # HTTP dates have a one second resolution
+            return as_utc(last_modified).replace(microsecond=0) <= as_utc(since)
+
+        return False
+
+
+def set_validators(
+    response: Response, etag: str, last_modified: Optional[dt] = None
+) -> None:
+    """
+    Adds the `ETag` and `Last-Modified` headers, clients must revalidate
+    their copy before reusing it
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified_response(etag: str, last_modified: Optional[dt] = None) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
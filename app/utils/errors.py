@@ -8,6 +8,7 @@ from pydantic import BaseModel
 class ErrorType(Enum):
     BAD_REQUEST = status.HTTP_400_BAD_REQUEST
     NOT_FOUND = status.HTTP_404_NOT_FOUND
+    PRECONDITION_FAILED = status.HTTP_412_PRECONDITION_FAILED
     DATASOURCE_ERROR = status.HTTP_500_INTERNAL_SERVER_ERROR
     INTERNAL_SERVER_ERROR = status.HTTP_500_INTERNAL_SERVER_ERROR
 
@@ -0,0 +1,153 @@
+import math
+from typing import Optional
+
+# Mean earth radius in meters, the same sphere PostGIS uses when
+# `ST_DWithin` is called on geographies with `use_spheroid` disabled.
+EARTH_RADIUS_M = 6371008.7714
+
+
+def circle_bounds(
+    lat: float, lng: float, radius: float
+) -> Optional[tuple[float, float, float, float]]:
+    """
+    Bounding box of the circle of `radius` meters around the given point
+
+    Returns
+    -------
+    `Optional[tuple[float, float, float, float]]`
+        `(min_lat, min_lng, max_lat, max_lng)`, or None when the circle
+        contains a pole or crosses the antimeridian
+    """
+    angle = radius / EARTH_RADIUS_M
+    min_lat = lat - math.degrees(angle)
+    max_lat = lat + math.degrees(angle)
+    if max_lat >= 90 or min_lat <= -90:
+        return None
+
+    # Longitude half-width of a spherical cap centered at `lat`
+    lng_delta = math.degrees(
+        math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(lat))))
+    )
+    min_lng, max_lng = lng - lng_delta, lng + lng_delta
+    if min_lng < -180 or max_lng > 180:
+        return None
+
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Great-circle distance in meters between two points
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def cover_circle(
+    lat: float, lng: float, radius: float, cell_size: float, max_cells: int
+) -> Optional[tuple[list[tuple[int, int, int]], list[tuple[int, int]]]]:
+    """
+    Splits the cells of a grid of `cell_size` degrees overlapping the
+    bounding box of a circle into the cells lying fully inside the circle
+    and the boundary cells.
+
+    The farthest point of a cell from the center is one of its corners, so
+    a cell is inside when its four corners are, with a small margin that
+    absorbs the rounding differences with PostGIS.
+
+    Returns
+    -------
+    `Optional[tuple[list[tuple[int, int, int]], list[tuple[int, int]]]]`
+        The inside cells as `(y, min_x, max_x)` runs, one per row of the
+        grid, and the boundary cells as `(y, x)`, or None when the circle
+        has no bounding box or it overlaps more than `max_cells` cells.
+    """
+    bounds = circle_bounds(lat, lng, radius)
+    if bounds is None:
+        return None
+
+    min_lat, min_lng, max_lat, max_lng = bounds
+    min_y, max_y = math.floor(min_lat / cell_size), math.floor(max_lat / cell_size)
+    min_x, max_x = math.floor(min_lng / cell_size), math.floor(max_lng / cell_size)
+    if (max_y - min_y + 1) * (max_x - min_x + 1) > max_cells:
+        return None
+
+    limit = radius * (1 - 1e-9) - 1e-3
+    corner_inside = {
+        (y, x): haversine_distance(lat, lng, y * cell_size, x * cell_size) <= limit
+        for y in range(min_y, max_y + 2)
+        for x in range(min_x, max_x + 2)
+    }
+
+    runs, boundary = [], []
+    for y in range(min_y, max_y + 1):
+        inside = [
+            x
+            for x in range(min_x, max_x + 1)
+            if corner_inside[y, x]
+            and corner_inside[y, x + 1]
+            and corner_inside[y + 1, x]
+            and corner_inside[y + 1, x + 1]
+        ]
+        if not inside:
+            boundary.extend((y, x) for x in range(min_x, max_x + 1))
+            continue
+
+        # Distance grows with the longitude gap, inside cells are contiguous
+        runs.append((y, inside[0], inside[-1]))
+        boundary.extend((y, x) for x in range(min_x, inside[0]))
+        boundary.extend((y, x) for x in range(inside[-1] + 1, max_x + 1))
+
+    return runs, boundary
+
+
+def parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """
+    Parses a `min_lng,min_lat,max_lng,max_lat` bounding box
+
+    Returns
+    -------
+    `tuple[float, float, float, float]`
+        `(min_lat, min_lng, max_lat, max_lng)`
+
+    Raises
+    ------
+    `ValueError`
+        If the box is malformed, empty or out of range
+    """
+    parts = bbox.split(",")
+    if len(parts) != 4:
+        raise ValueError("Invalid bbox")
+
+    min_lng, min_lat, max_lng, max_lat = map(float, parts)
+    if not (-90 <= min_lat < max_lat <= 90 and -180 <= min_lng < max_lng <= 180):
+        raise ValueError("Invalid bbox")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def parallel_bulge(width: float) -> float:
+    """
+    Largest latitude gap, in degrees, between a parallel and the great
+    circle arc joining two of its points `width` degrees of longitude apart.
+    Envelopes cast to geography have such arcs as edges, padding them by
+    this much keeps every point of the lat/lng box inside.
+    """
+    # The gap is the widest on the parallel at `atan(sqrt(c))`
+    c = math.sqrt(math.cos(math.radians(width / 2)))
+    return math.degrees(math.atan(1 / c) - math.atan(c))
+
+
+def grid_shape(
+    min_lat: float, min_lng: float, max_lat: float, max_lng: float, cell_size: float
+) -> tuple[int, int]:
+    """
+    Rows and columns of a grid of `cell_size` degrees covering the box
+    """
+    # Rounded first, so a box of exactly n cells doesn't get a sliver more
+    rows = max(math.ceil(round((max_lat - min_lat) / cell_size, 9)), 1)
+    cols = max(math.ceil(round((max_lng - min_lng) / cell_size, 9)), 1)
+    return rows, cols
@@ -0,0 +1,32 @@
+import base64
+import json
+from typing import Any
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """
+    Encodes the sort key of the last returned row as an opaque,
+    url-safe cursor
+    """
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """
+    Decodes a cursor built by `encode_cursor`
+
+    Raises
+    ------
+    `ValueError`
+        If the cursor is malformed
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except Exception as err:
+        raise ValueError("Invalid cursor") from err
+
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
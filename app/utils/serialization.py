@@ -0,0 +1,69 @@
+# isort: skip_file
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Mapping, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def json_default(value: Any) -> Any:
+    """
+    `default` hook for the JSON encoders, handling the types read from the
+    database that they don't support natively
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    # orjson writes datetimes like `isoformat`, as pydantic does
+    return orjson.dumps(value, default=json_default)
+
+
+def project(row: Mapping, fields: Sequence[str]) -> dict:
+    """
+    Keeps the given fields of a row, in their order
+    """
+    return {name: row[name] for name in fields}
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson, for content built from database rows
+    that already match the response model, so FastAPI neither validates nor
+    runs `jsonable_encoder` on it again
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def iter_ndjson(
+    batches: AsyncIterable[Iterable[Mapping]],
+) -> AsyncIterator[bytes]:
+    """
+    Encodes batches of rows as newline delimited JSON, one chunk per batch
+    """
+    async for batch in batches:
+        yield b"".join(dumps(dict(row)) + b"\n" for row in batch)
+
+
+async def iter_json_array(
+    batches: AsyncIterable[Iterable[Mapping]],
+) -> AsyncIterator[bytes]:
+    """
+    Encodes batches of rows as the chunks of a single JSON array
+    """
+    yield b"["
+    first = True
+    async for batch in batches:
+        chunk = b",".join(dumps(dict(row)) for row in batch)
+        if not chunk:
+            continue
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
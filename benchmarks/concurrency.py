@@ -0,0 +1,181 @@
+"""
+Throughput of the API as the requests in flight grow, on its async sessions
+and on the blocking sync session the handlers used before.
+
+    python -m benchmarks.concurrency --concurrency 1 4 16 64 --delay 10
+
+Both paths are mounted on the app for the run and serve the same lookup of
+a restaurant by id, after a query holding the connection for `--delay`
+milliseconds, like a slow query would. On the async path the requests in
+flight wait on the database together, so the throughput grows with them.
+On the blocking path the event loop waits for each query in turn, and the
+throughput stays at one request at a time. The app runs in-process, like
+in `benchmarks.scenarios`, to mount the paths.
+"""
+import argparse
+import asyncio
+import random
+import time
+from itertools import islice
+from typing import Iterator
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, text
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks import report
+from benchmarks.dataset import generate
+from benchmarks.harness import configure_environment, postgis, truncate
+from benchmarks.scenarios import API, Request, in_process_client, run
+
+PATHS = ("async", "blocking")
+
+SLOW_QUERY = text("SELECT pg_sleep(:seconds)")
+
+
+def add_sleep_function(async_engine, sync_engine) -> None:
+    """
+    Registers `pg_sleep` on SQLite connections, it runs on the thread of the
+    connection like any query
+    """
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def on_async_connect(dbapi_connection, connection_record) -> None:
+        dbapi_connection.run_async(
+            lambda connection: connection.create_function("pg_sleep", 1, time.sleep)
+        )
+
+    @event.listens_for(sync_engine, "connect")
+    def on_sync_connect(dbapi_connection, connection_record) -> None:
+        dbapi_connection.create_function("pg_sleep", 1, time.sleep)
+
+
+def mount_paths(app: FastAPI, delay: float) -> None:
+    """
+    Lookups of a restaurant on an async session, and on a sync session
+    called from the event loop, as the handlers did before
+    """
+    from app.infrastructure.db import async_engine, engine, get_db_session
+    from app.models import Restaurant
+
+    if async_engine.dialect.name == "sqlite":
+        add_sleep_function(async_engine, engine)
+
+    @app.get("/benchmark/async/{id}")
+    async def async_lookup(id: str, session: AsyncSession = Depends(get_db_session)):
+        await session.execute(SLOW_QUERY, {"seconds": delay})
+        restaurant = await session.get(Restaurant, id)
+        return {"id": restaurant.id}
+
+    @app.get("/benchmark/blocking/{id}")
+    async def blocking_lookup(id: str):
+        # Opened here rather than as a dependency, which FastAPI would close
+        # on another thread
+        with Session(engine) as session:
+            session.execute(SLOW_QUERY, {"seconds": delay})
+            restaurant = session.get(Restaurant, id)
+            return {"id": restaurant.id}
+
+
+def create_requests(restaurants: Iterator[dict], batch_size: int) -> Iterator[Request]:
+    while batch := list(islice(restaurants, batch_size)):
+
+        def request(client, batch=batch):
+            return client.post(f"{API}/bulk_create", json=batch)
+
+        yield request
+
+
+def lookup_requests(
+    path: str, ids: list[str], count: int, seed: int
+) -> Iterator[Request]:
+    rng = random.Random(seed)
+    for _ in range(count):
+
+        def request(client, id=rng.choice(ids)):
+            return client.get(f"/benchmark/{path}/{id}")
+
+        yield request
+
+
+async def run_levels(client: httpx.AsyncClient, args) -> dict:
+    restaurants = list(generate(args.rows, args.seed))
+    await run(client, create_requests(iter(restaurants), args.batch_size), 4)
+    ids = [restaurant["id"] for restaurant in restaurants]
+
+    results = {}
+    for path in PATHS:
+        for concurrency in args.concurrency:
+            # Enough requests to keep every worker busy for a while
+            count = max(args.requests, concurrency * 10)
+            requests = lookup_requests(path, ids, count, args.seed)
+            results[f"{path} c={concurrency}"] = await run(client, requests, concurrency)
+    return results
+
+
+async def benchmark(args) -> dict:
+    from main import app
+
+    mount_paths(app, args.delay / 1000)
+    async with in_process_client() as client:
+        return await run_levels(client, args)
+
+
+def format_scaling(results: dict, levels: list[int]) -> str:
+    """
+    Throughput of each path at every level, relative to one request in
+    flight
+    """
+    lines = []
+    for path in PATHS:
+        first = results[f"{path} c={levels[0]}"]["requests_per_second"]
+        scaling = ", ".join(
+            f"c={level}: {results[f'{path} c={level}']['requests_per_second'] / first:.1f}x"
+            for level in levels
+        )
+        lines.append(f"{path}: {scaling}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16, 64])
+    parser.add_argument(
+        "--delay", type=float, default=10, help="of the slow query, in milliseconds"
+    )
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--database-uri", help="existing database to run against")
+    parser.add_argument(
+        "--reset", action="store_true", help="empty --database-uri before the run"
+    )
+    parser.add_argument("--port", type=int, default=55432, help="of the container")
+    parser.add_argument("--output", help="where to save the report, as JSON")
+    args = parser.parse_args()
+    args.concurrency.sort()
+
+    if args.database_uri:
+        configure_environment(args.database_uri)
+        if args.reset:
+            truncate(args.database_uri)
+        results = asyncio.run(benchmark(args))
+    else:
+        with postgis(args.port) as uri:
+            configure_environment(uri)
+            results = asyncio.run(benchmark(args))
+
+    print(report.format_report(results))
+    print(format_scaling(results, args.concurrency))
+    if args.output:
+        report.save(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Seeded generator of synthetic restaurants, clustered around Mexican cities,
+written as a CSV file for `POST /bulk_create_from_csv` or as a JSON list of
+`RestaurantCreate` for `POST /bulk_create`.
+
+    python -m benchmarks.dataset --size 100k --format csv --output restaurants.csv
+"""
+import argparse
+import csv
+import json
+import random
+from typing import Iterator, NamedTuple, TextIO
+from uuid import UUID
+
+# Row counts of the standard datasets
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+class City(NamedTuple):
+    name: str
+    state: str
+    lat: float
+    lng: float
+    # Share of the restaurants in the city
+    share: float
+    # Standard deviation, in degrees, of the restaurants around the center
+    spread: float
+
+
+CITIES = (
+    City("Mexico City", "CDMX", 19.4326, -99.1332, 0.35, 0.08),
+    City("Guadalajara", "Jalisco", 20.6597, -103.3496, 0.15, 0.06),
+    City("Monterrey", "Nuevo Leon", 25.6866, -100.3161, 0.13, 0.06),
+    City("Puebla", "Puebla", 19.0414, -98.2063, 0.08, 0.04),
+    City("Tijuana", "Baja California", 32.5149, -117.0382, 0.07, 0.05),
+    City("Merida", "Yucatan", 20.9674, -89.5926, 0.06, 0.04),
+    City("Cancun", "Quintana Roo", 21.1619, -86.8515, 0.06, 0.03),
+    City("Oaxaca", "Oaxaca", 17.0732, -96.7266, 0.05, 0.03),
+    City("Queretaro", "Queretaro", 20.5888, -100.3899, 0.05, 0.03),
+)
+
+# Share of each rating, from 0 to 4, most restaurants are rated 3
+RATING_WEIGHTS = (0.05, 0.1, 0.25, 0.35, 0.25)
+
+NAME_PREFIXES = ("El", "La", "Los", "Las", "Casa", "Cocina", "Taqueria", "Fonda")
+NAME_WORDS = (
+    "Jardin",
+    "Sol",
+    "Luna",
+    "Mar",
+    "Fuego",
+    "Maiz",
+    "Cazuela",
+    "Comal",
+    "Molcajete",
+    "Abuela",
+    "Patio",
+    "Puerto",
+)
+STREETS = ("Reforma", "Juarez", "Hidalgo", "Morelos", "Madero", "Insurgentes")
+
+FIELDS = (
+    "id",
+    "rating",
+    "name",
+    "site",
+    "email",
+    "phone",
+    "street",
+    "city",
+    "state",
+    "lat",
+    "lng",
+)
+
+
+def generate(rows: int, seed: int = 0) -> Iterator[dict]:
+    """
+    Yields `rows` restaurants, the same ones for the same seed
+    """
+    rng = random.Random(seed)
+    shares = [city.share for city in CITIES]
+
+    for index in range(rows):
+        city = rng.choices(CITIES, shares)[0]
+        name = f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_WORDS)} {index}"
+        slug = name.lower().replace(" ", "-")
+        yield {
+            "id": str(UUID(int=rng.getrandbits(128), version=4)),
+            "rating": rng.choices(range(5), RATING_WEIGHTS)[0],
+            "name": name,
+            "site": f"https://{slug}.example.com",
+            "email": f"contact@{slug}.example.com",
+            "phone": f"55 {rng.randrange(10**8):08d}",
+            "street": f"{rng.randrange(1, 2000)} {rng.choice(STREETS)}",
+            "city": city.name,
+            "state": city.state,
+            "lat": round(rng.gauss(city.lat, city.spread), 6),
+            "lng": round(rng.gauss(city.lng, city.spread), 6),
+        }
+
+
+def write_csv(restaurants: Iterator[dict], output: TextIO) -> None:
+    writer = csv.DictWriter(output, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(restaurants)
+
+
+def write_json(restaurants: Iterator[dict], output: TextIO) -> None:
+    """
+    Writes a JSON list one restaurant at a time, the list is never built
+    """
+    output.write("[")
+    for index, restaurant in enumerate(restaurants):
+        output.write(",\n" if index else "\n")
+        output.write(json.dumps(restaurant))
+    output.write("\n]\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", choices=SIZES, default="10k")
+    parser.add_argument("--rows", type=int, help="overrides --size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    restaurants = generate(args.rows or SIZES[args.size], args.seed)
+    with open(args.output, "w", newline="") as output:
+        if args.format == "csv":
+            write_csv(restaurants, output)
+        else:
+            write_json(restaurants, output)
+
+
+if __name__ == "__main__":
+    main()
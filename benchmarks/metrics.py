@@ -0,0 +1,87 @@
+# isort: skip_file
+"""
+Overhead of the request metrics: the `MetricsMiddleware` around a bare ASGI
+app, and the query hooks around a cursor execution, in microseconds.
+
+    python -m benchmarks.metrics --requests 100000
+"""
+import argparse
+import asyncio
+import time
+
+from app.api.middlewares import MetricsMiddleware
+from app.infrastructure.request_metrics import (
+    QueryStats,
+    RequestMetrics,
+    after_cursor_execute,
+    before_cursor_execute,
+    query_stats,
+)
+
+
+class Route:
+    path = "/api/v1/restaurants/{id}"
+
+
+class Context:
+    pass
+
+
+async def app(scope, receive, send) -> None:
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive() -> dict:
+    return {"type": "http.request"}
+
+
+async def send(message: dict) -> None:
+    pass
+
+
+async def serve(asgi_app, requests: int) -> float:
+    """
+    Seconds per request
+    """
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/restaurants/1"}
+        await asgi_app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def query_hooks(queries: int) -> float:
+    """
+    Seconds per query of the before and after cursor hooks
+    """
+    context = Context()
+    token = query_stats.set(QueryStats())
+    start = time.perf_counter()
+    for _ in range(queries):
+        before_cursor_execute(None, None, "", None, context, False)
+        after_cursor_execute(None, None, "", None, context, False)
+    elapsed = time.perf_counter() - start
+    query_stats.reset(token)
+    return elapsed / queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    bare = asyncio.run(serve(app, args.requests))
+    measured = asyncio.run(
+        serve(MetricsMiddleware(app, RequestMetrics()), args.requests)
+    )
+    hooks = query_hooks(args.requests)
+    print(f"bare app:          {bare * 1e6:6.2f} us / request")
+    print(f"with middleware:   {measured * 1e6:6.2f} us / request")
+    print(f"middleware cost:   {(measured - bare) * 1e6:6.2f} us / request")
+    print(f"query hooks cost:  {hooks * 1e6:6.2f} us / query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Latency of the radius statistics as the table grows, for several radiuses,
+and the plan PostgreSQL chooses for the radius filter.
+
+    python -m benchmarks.radius --sizes 10k 100k 1m --radii 500 2000 10000
+
+The circles are drawn around a probe city holding a fixed set of
+restaurants, away from the cities of the dataset. The table is filled up to
+each size in turn with the dataset, so the circles keep matching the same
+restaurants while the table grows. With the GiST index of `location` their
+latency stays flat, a sequential scan would grow with the table. The app
+runs like in `benchmarks.scenarios`.
+"""
+import argparse
+import asyncio
+import random
+from itertools import islice
+from typing import Iterator, Optional
+
+import httpx
+import psycopg2
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+from sqlalchemy.engine import make_url
+from sqlmodel import select
+
+from benchmarks import report
+from benchmarks.dataset import SIZES, City, generate
+from benchmarks.harness import configure_environment, postgis, truncate
+from benchmarks.scenarios import API, Request, in_process_client, run
+
+# Away from every city of the dataset
+PROBE_CITY = City("Hermosillo", "Sonora", 29.0729, -110.9559, 0, 0.05)
+PROBE_RESTAURANTS = 5000
+
+
+def probe_restaurants(seed: int) -> Iterator[dict]:
+    rng = random.Random(seed)
+    for restaurant in generate(PROBE_RESTAURANTS, seed):
+        yield restaurant | {
+            "city": PROBE_CITY.name,
+            "state": PROBE_CITY.state,
+            "lat": round(rng.gauss(PROBE_CITY.lat, PROBE_CITY.spread), 6),
+            "lng": round(rng.gauss(PROBE_CITY.lng, PROBE_CITY.spread), 6),
+        }
+
+
+def create_requests(restaurants: Iterator[dict], batch_size: int) -> Iterator[Request]:
+    while batch := list(islice(restaurants, batch_size)):
+
+        def request(client, batch=batch):
+            return client.post(f"{API}/bulk_create", json=batch)
+
+        yield request
+
+
+def probe_requests(count: int, seed: int, radius: int) -> Iterator[Request]:
+    """
+    Circles of the radius around the center of the probe city
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        params = {
+            "latitude": rng.gauss(PROBE_CITY.lat, PROBE_CITY.spread / 10),
+            "longitude": rng.gauss(PROBE_CITY.lng, PROBE_CITY.spread / 10),
+            "radius": radius,
+        }
+
+        def request(client, params=params):
+            return client.get(f"{API}/statistics", params=params)
+
+        yield request
+
+
+def is_postgresql(uri: Optional[str]) -> bool:
+    return uri is not None and make_url(uri).get_backend_name() == "postgresql"
+
+
+def radius_plan(uri: str, radius: int) -> str:
+    """
+    Access path of the radius filter on the restaurants, the first node of
+    the plan reading the table
+    """
+    from app.models import Restaurant
+    from app.repositories.restaurant_repository import RestaurantRepository
+
+    statement = select(func.count(Restaurant.id)).where(
+        RestaurantRepository(None, None).within_radius(
+            PROBE_CITY.lat, PROBE_CITY.lng, radius
+        )
+    )
+    sql = statement.compile(
+        dialect=PGDialect_psycopg2(), compile_kwargs={"literal_binds": True}
+    )
+    with psycopg2.connect(uri) as connection, connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}")
+        plan = [line for (line,) in cursor.fetchall()]
+    scans = [line.strip(" ->") for line in plan if "Scan" in line]
+    return scans[-1] if scans else plan[0]
+
+
+async def run_sizes(
+    client: httpx.AsyncClient, args, database_uri: Optional[str]
+) -> dict:
+    requests = create_requests(probe_restaurants(args.seed + 1), args.batch_size)
+    await run(client, requests, args.concurrency)
+
+    results = {}
+    filled = 0
+    for size in sorted(args.sizes, key=SIZES.get):
+        rows = SIZES[size]
+        restaurants = islice(generate(rows, args.seed), filled, None)
+        requests = create_requests(restaurants, args.batch_size)
+        await run(client, requests, args.concurrency, rows - filled)
+        filled = rows
+
+        for radius in args.radii:
+            requests = probe_requests(args.requests, args.seed, radius)
+            results[f"{size} r={radius}m"] = await run(
+                client, requests, args.concurrency
+            )
+            if is_postgresql(database_uri):
+                print(f"{size} r={radius}m: {radius_plan(database_uri, radius)}")
+    return results
+
+
+async def benchmark(args, database_uri: Optional[str]) -> dict:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            return await run_sizes(client, args, database_uri)
+
+    async with in_process_client() as client:
+        return await run_sizes(client, args, database_uri)
+
+
+def format_growth(results: dict, sizes: list[str], radii: list[int]) -> str:
+    """
+    Median latency of each radius at the largest size, relative to the
+    smallest one
+    """
+    smallest, largest = min(sizes, key=SIZES.get), max(sizes, key=SIZES.get)
+    lines = []
+    for radius in radii:
+        first = results[f"{smallest} r={radius}m"]["p50_ms"]
+        last = results[f"{largest} r={radius}m"]["p50_ms"]
+        growth = last / first if first else 0.0
+        lines.append(
+            f"r={radius}m: p50 {first:.2f} ms at {smallest}, {last:.2f} ms at "
+            f"{largest} ({growth:.1f}x)"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["10k", "100k"])
+    parser.add_argument("--radii", nargs="+", type=int, default=[500, 2000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--url", help="base URL of a running server")
+    parser.add_argument("--database-uri", help="existing database to run against")
+    parser.add_argument(
+        "--reset", action="store_true", help="empty --database-uri before the run"
+    )
+    parser.add_argument("--port", type=int, default=55432, help="of the container")
+    parser.add_argument("--output", help="where to save the report, as JSON")
+    args = parser.parse_args()
+
+    if args.url:
+        # The plans need the database, pass --database-uri along with --url
+        uri = args.database_uri
+        results = asyncio.run(benchmark(args, uri))
+    elif args.database_uri:
+        configure_environment(args.database_uri)
+        if args.reset:
+            truncate(args.database_uri)
+        uri = args.database_uri
+        results = asyncio.run(benchmark(args, uri))
+    else:
+        with postgis(args.port) as uri:
+            configure_environment(uri)
+            results = asyncio.run(benchmark(args, uri))
+
+    print(report.format_report(results))
+    print(format_growth(results, args.sizes, args.radii))
+    if args.output:
+        report.save(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Latency percentiles, throughput and peak memory of a benchmark run, and
+their comparison with a stored baseline.
+"""
+import json
+import math
+import resource
+import sys
+from typing import Optional
+
+# Metrics where a higher value is a regression
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+
+
+def percentile(sorted_values: list[float], share: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(share * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident memory of the process so far
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def summarize(
+    latencies: list[float], elapsed: float, errors: int, items: int = 0
+) -> dict:
+    """
+    Report of a scenario from the latency of each request, in seconds, and
+    the wall time of the whole run. `items` counts the rows written by bulk
+    scenarios.
+    """
+    latencies = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if items:
+        summary["rows_per_second"] = items / elapsed if elapsed else 0.0
+    return summary
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def save(report: dict, path: str) -> None:
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Regressions of the report against the baseline, beyond `tolerance`
+    (a share, 0.1 allows 10% worse) on any metric of a common scenario
+    """
+    regressions = []
+    for scenario, summary in report.items():
+        reference: Optional[dict] = baseline.get(scenario)
+        if reference is None:
+            continue
+        for metric, value in summary.items():
+            base = reference.get(metric)
+            if not isinstance(base, (int, float)) or not base:
+                continue
+            if metric in LOWER_IS_BETTER:
+                change = value / base - 1
+            elif metric.endswith("_per_second"):
+                change = base / value - 1 if value else float("inf")
+            else:
+                continue
+            if change > tolerance:
+                regressions.append(
+                    f"{scenario} {metric}: {value:.2f} vs {base:.2f} "
+                    f"({change:+.0%} worse)"
+                )
+    return regressions
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{'scenario':<24}{'requests':>9}{'errors':>8}{'p50 ms':>10}"
+        f"{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'rows/s':>11}{'rss MB':>9}"
+    ]
+    for scenario, s in report.items():
+        lines.append(
+            f"{scenario:<24}{s['requests']:>9}{s['errors']:>8}{s['p50_ms']:>10.2f}"
+            f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+            f"{s['requests_per_second']:>10.1f}{s.get('rows_per_second', 0):>11.0f}"
+            f"{s['peak_rss_mb']:>9.0f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,218 @@
+"""
+Load scenarios of the API on a synthetic dataset, reported as p50/p95/p99
+latency, throughput and peak RSS, and compared with a stored baseline.
+
+    python -m benchmarks.scenarios --size 10k --output report.json
+    python -m benchmarks.scenarios --size 100k --baseline benchmarks/baseline.json
+
+By default the app runs in-process, with the `test` settings, against a
+throwaway PostGIS container. `--database-uri` uses an existing database
+instead, and `--url` drives a running server.
+"""
+import argparse
+import asyncio
+import csv
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+import httpx
+
+from benchmarks import report
+from benchmarks.dataset import CITIES, FIELDS, SIZES, generate
+from benchmarks.harness import configure_environment, postgis, truncate
+
+API = "/api/v1/restaurants"
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+async def run(
+    client: httpx.AsyncClient,
+    requests: Iterator[Request],
+    concurrency: int,
+    items: int = 0,
+) -> dict:
+    """
+    Sends the requests from `concurrency` workers, timing each one
+    """
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for request in requests:
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append(time.perf_counter() - start)
+            if response.is_error:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return report.summarize(latencies, time.perf_counter() - start, errors, items)
+
+
+def bulk_create_requests(rows: int, seed: int, batch_size: int) -> Iterator[Request]:
+    restaurants = generate(rows, seed)
+    while batch := list(islice(restaurants, batch_size)):
+
+        def request(client, batch=batch):
+            return client.post(f"{API}/bulk_create", json=batch)
+
+        yield request
+
+
+def csv_import_requests(path: str) -> Iterator[Request]:
+    async def request(client):
+        with open(path, "rb") as file:
+            files = {"csv_file": ("restaurants.csv", file, "text/csv")}
+            return await client.post(f"{API}/bulk_create_from_csv", files=files)
+
+    yield request
+
+
+def listing_requests(count: int, limit: int) -> Iterator[Request]:
+    """
+    Walks the pages of the listing, from the start again once exhausted
+    """
+    cursor: Optional[str] = None
+
+    async def request(client):
+        nonlocal cursor
+        params = {"limit": limit} | ({"cursor": cursor} if cursor else {})
+        response = await client.get(f"{API}/", params=params)
+        if response.is_success:
+            cursor = response.json()["next_cursor"]
+        return response
+
+    for _ in range(count):
+        yield request
+
+
+def statistics_requests(count: int, seed: int) -> Iterator[Request]:
+    """
+    Circles around the cities of the dataset, from the block to the district
+    """
+    rng = random.Random(seed)
+    shares = [city.share for city in CITIES]
+    for _ in range(count):
+        city = rng.choices(CITIES, shares)[0]
+        params = {
+            "latitude": rng.gauss(city.lat, city.spread),
+            "longitude": rng.gauss(city.lng, city.spread),
+            "radius": rng.randrange(500, 5000),
+        }
+
+        def request(client, params=params):
+            return client.get(f"{API}/statistics", params=params)
+
+        yield request
+
+
+async def run_scenarios(client: httpx.AsyncClient, args) -> dict:
+    rows = args.rows or SIZES[args.size]
+    results = {}
+
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(generate(rows, args.seed))
+        file.flush()
+        results["bulk_create_from_csv"] = await run(
+            client, csv_import_requests(file.name), 1, rows
+        )
+
+    # Other restaurants than the CSV, so the ids don't collide
+    requests = bulk_create_requests(rows, args.seed + 1, args.batch_size)
+    results["bulk_create"] = await run(client, requests, args.concurrency, rows)
+
+    requests = listing_requests(args.requests, args.page_size)
+    # A single walker, each page needs the cursor of the previous one
+    results["listing"] = await run(client, requests, 1)
+
+    requests = statistics_requests(args.requests, args.seed)
+    results["statistics"] = await run(client, requests, args.concurrency)
+    return results
+
+
+@asynccontextmanager
+async def in_process_client() -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Client of the ASGI app, run with its startup and shutdown handlers. The
+    app is imported here, once the environment is configured.
+    """
+    from main import app
+
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(
+            app=app, base_url="http://benchmark", timeout=None
+        ) as client:
+            yield client
+    finally:
+        await app.router.shutdown()
+
+
+async def benchmark(args) -> dict:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            return await run_scenarios(client, args)
+
+    async with in_process_client() as client:
+        return await run_scenarios(client, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--size", choices=SIZES, default="10k")
+    parser.add_argument("--rows", type=int, help="overrides --size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--url", help="base URL of a running server")
+    parser.add_argument("--database-uri", help="existing database to run against")
+    parser.add_argument(
+        "--reset", action="store_true", help="empty --database-uri before the run"
+    )
+    parser.add_argument("--port", type=int, default=55432, help="of the container")
+    parser.add_argument("--output", help="where to save the report, as JSON")
+    parser.add_argument("--baseline", help="report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(benchmark(args))
+    elif args.database_uri:
+        configure_environment(args.database_uri)
+        if args.reset:
+            truncate(args.database_uri)
+        results = asyncio.run(benchmark(args))
+    else:
+        with postgis(args.port) as uri:
+            configure_environment(uri)
+            results = asyncio.run(benchmark(args))
+
+    print(report.format_report(results))
+    if args.output:
+        report.save(results, args.output)
+
+    if args.baseline:
+        regressions = report.compare(results, report.load(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
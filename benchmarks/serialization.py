@@ -0,0 +1,109 @@
+"""
+Serialization cost of a page of restaurants, through the response model
+path FastAPI takes by default and through the fast path of the listing
+endpoints, reported per 10k rows.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import Restaurant
+from app.schemas import Restaurant as RestaurantSchema
+from app.schemas import RestaurantPage
+from app.utils.serialization import FastJSONResponse
+
+page_field = create_response_field(name="response", type_=RestaurantPage)
+
+
+def make_rows(count: int) -> list[tuple]:
+    """
+    Result tuples in the column order of the response schema
+    """
+    now = datetime.now(timezone.utc)
+    return [
+        (
+            str(uuid4()),
+            i % 5,
+            f"Restaurant {i}",
+            f"https://restaurant{i}.example.com",
+            f"contact{i}@example.com",
+            f"534 {i:03d} 0000",
+            f"{i} Main Street",
+            "Mexico City",
+            "CDMX",
+            19.4 + i * 1e-5,
+            -99.1 - i * 1e-5,
+            now - timedelta(seconds=i),
+            now,
+        )
+        for i in range(count)
+    ]
+
+
+def make_instances(rows: list[tuple]) -> list[Restaurant]:
+    keys = list(RestaurantSchema.__fields__)
+    return [Restaurant(**dict(zip(keys, row))) for row in rows]
+
+
+def response_model_path(restaurants: list[Restaurant]) -> bytes:
+    """
+    ORM instances, validated into the page by the service, then validated
+    again against `response_model`, run through `jsonable_encoder` and
+    encoded with the stdlib `json`. Loading the instances isn't measured.
+    """
+    page = RestaurantPage(data=restaurants, next_cursor=None)
+    content = asyncio.run(serialize_response(field=page_field, response_content=page))
+    return JSONResponse(content).body
+
+
+def fast_path(rows: list[tuple]) -> bytes:
+    """
+    Dicts projected from the result tuples, encoded with orjson as they are
+    """
+    keys = list(RestaurantSchema.__fields__)
+    data = [dict(zip(keys, row)) for row in rows]
+    page = RestaurantPage.construct(data=data, next_cursor=None)
+    return FastJSONResponse({"data": page.data, "next_cursor": page.next_cursor}).body
+
+
+def measure(path, rows: list, repeat: int) -> float:
+    """
+    Best time of `repeat` runs, in seconds per 10k rows
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        path(rows)
+        best = min(best, time.perf_counter() - start)
+    return best * 10_000 / len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    restaurants = make_instances(rows)
+    if response_model_path(restaurants) != fast_path(rows):
+        sys.exit("The fast path output differs from the response model path")
+
+    baseline = measure(response_model_path, restaurants, args.repeat)
+    fast = measure(fast_path, rows, args.repeat)
+    print(f"response model path: {baseline * 1000:8.1f} ms / 10k rows")
+    print(f"fast path:           {fast * 1000:8.1f} ms / 10k rows")
+    print(f"speedup:             {baseline / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
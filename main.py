@@ -1,9 +1,26 @@
+# isort: skip_file
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api import api_router
-from app.core import get_app_settings, get_logger
+from app.api.middlewares import MetricsMiddleware, RequestContextMiddleware
+from app.core import (
+    get_app_settings,
+    get_logger,
+    start_log_listener,
+    stop_log_listener,
+)
+from app.infrastructure.db import (
+    async_session_factory,
+    create_database_schema,
+    dispose_engines,
+)
+from app.infrastructure.import_jobs import import_jobs
+from app.infrastructure.request_metrics import request_metrics
+from app.repositories.backends import restaurant_repository_class
+from app.services import RestaurantService
 
 load_dotenv()
 
@@ -23,17 +40,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+app.add_middleware(RequestContextMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
+@app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Request metrics of this worker, in the Prometheus text format
+    """
+    return PlainTextResponse(
+        request_metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.on_event("startup")
 async def startup_event():
+    start_log_listener()
     logger.info("Starting up the application")
+    await create_database_schema()
+    async with async_session_factory() as session:
+        repository = restaurant_repository_class(session, session)
+        await RestaurantService(repository).build_spatial_index()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down the application")
+    await import_jobs.shutdown()
+    await dispose_engines()
+    stop_log_listener()
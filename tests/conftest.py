@@ -0,0 +1,122 @@
+# isort: skip_file
+"""
+Fixtures of the test suite. The app runs with the `test` settings on a
+SQLite database of a temporary directory, and the repository tests get a
+database of their own. The PostgreSQL tests run against the PostGIS
+database of `TEST_POSTGRES_URI`, migrated to the latest revision and
+emptied by each test, and are skipped without it.
+"""
+import os
+import shutil
+import tempfile
+
+# isort: off
+# The logging config loads `.env` over the environment when imported, the
+# test settings must be set after it
+import app.core.settings.loggin_config  # noqa: F401
+from app.core.settings.app_settings import make_async_uri
+
+# isort: on
+
+TEST_DIRECTORY = tempfile.mkdtemp(prefix="melp-tests-")
+DATABASE_URI = f"sqlite:///{os.path.join(TEST_DIRECTORY, 'app.db')}"
+POSTGRES_URI = os.getenv("TEST_POSTGRES_URI")
+
+os.environ.update(
+    ENVIRONMENT="test",
+    SECRET_KEY="test",
+    DATABASE_URI=DATABASE_URI,
+    ASYNC_DATABASE_URI=make_async_uri(DATABASE_URI),
+    READ_REPLICA_URIS="[]",
+    STATISTICS_ENGINE="database",
+    STATISTICS_CACHE_ENABLED="false",
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from app.core import get_app_settings  # noqa: E402
+from app.infrastructure.db import configure_backend  # noqa: E402
+from app.infrastructure.sqlite import create_schema  # noqa: E402
+from app.repositories.restaurant_repository import RestaurantRepository  # noqa: E402
+from app.repositories.sqlite_restaurant_repository import (  # noqa: E402
+    SQLiteRestaurantRepository,
+)
+
+if get_app_settings().DATABASE_URI != DATABASE_URI:
+    raise pytest.UsageError("The test settings were overridden, check `.env`")
+
+
+def pytest_unconfigure(config) -> None:
+    shutil.rmtree(TEST_DIRECTORY, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    Client of the app, run with its startup and shutdown handlers
+    """
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def empty_database(client) -> None:
+    """
+    Empties the restaurant table of the app database
+    """
+    from app.infrastructure.db import engine
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM restaurant")
+
+
+@pytest.fixture
+async def sqlite_engine(tmp_path):
+    engine = create_async_engine(make_async_uri(f"sqlite:///{tmp_path / 'test.db'}"))
+    configure_backend(engine.sync_engine)
+    async with engine.begin() as connection:
+        await connection.run_sync(create_schema)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def postgres_engine():
+    if POSTGRES_URI is None:
+        pytest.skip("TEST_POSTGRES_URI is not set")
+
+    engine = create_async_engine(make_async_uri(POSTGRES_URI))
+    async with engine.begin() as connection:
+        await connection.exec_driver_sql("TRUNCATE restaurant, restaurant_cell_rollup")
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def sqlite_repository(sqlite_engine):
+    async with AsyncSession(sqlite_engine, expire_on_commit=False) as session:
+        yield SQLiteRestaurantRepository(session, session)
+
+
+@pytest.fixture
+async def postgres_repository(postgres_engine):
+    async with AsyncSession(postgres_engine, expire_on_commit=False) as session:
+        yield RestaurantRepository(session, session)
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def repository(request):
+    """
+    Repository of each storage backend, on an empty database
+    """
+    return request.getfixturevalue(f"{request.param}_repository")
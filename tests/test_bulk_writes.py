@@ -0,0 +1,118 @@
+# isort: skip_file
+import pytest
+from sqlalchemy import insert
+
+from app.models import Restaurant
+from app.repositories.restaurant_repository import (
+    MAX_BIND_PARAMETERS,
+    rows_per_statement,
+)
+from benchmarks.dataset import generate
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1/restaurants"
+
+# Rows per statement binding more parameters than a statement takes
+BATCH_SIZE = 5000
+
+
+def test_rows_per_statement_fit_the_bound_parameters():
+    assert rows_per_statement(1000, 11) == 1000
+    assert rows_per_statement(5000, 11) == MAX_BIND_PARAMETERS // 11
+    assert rows_per_statement(5000, 11) * 11 <= MAX_BIND_PARAMETERS
+    assert rows_per_statement(0, 11) == 1
+    assert rows_per_statement(100_000, 0) == MAX_BIND_PARAMETERS
+
+
+async def test_bulk_writes_beyond_the_bound_parameters(repository):
+    rows = list(generate(BATCH_SIZE + 10, seed=6))
+    assert len(rows[0]) * BATCH_SIZE > MAX_BIND_PARAMETERS
+
+    ids = await repository.bulk_create(rows, BATCH_SIZE)
+    assert sorted(ids) == sorted(row["id"] for row in rows)
+
+    changes = [
+        {"id": row["id"], "name": f"{row['name']} II", "rating": 4} for row in rows
+    ]
+    updated = await repository.bulk_update(changes, BATCH_SIZE)
+    assert len(updated) == len(rows)
+
+    deleted = await repository.bulk_delete(BATCH_SIZE, ids=ids)
+    assert len(deleted) == len(rows)
+
+
+@pytest.fixture
+def restaurants(empty_database) -> list[dict]:
+    from app.infrastructure.db import engine
+
+    rows = list(generate(10, seed=15))
+    for index, row in enumerate(rows):
+        row["city"] = "Puebla" if index < 4 else "Toluca"
+    with engine.begin() as connection:
+        connection.execute(insert(Restaurant.__table__), rows)
+    return rows
+
+
+def test_bulk_update_splits_the_missing_ids(client, restaurants):
+    changes = [
+        {"id": restaurants[0]["id"], "rating": 4},
+        {"id": "missing", "rating": 1},
+        {"id": restaurants[1]["id"], "name": "Renamed"},
+    ]
+
+    response = client.patch(f"{API}/bulk", json=changes)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "succeeded": [restaurants[0]["id"], restaurants[1]["id"]],
+        "not_found": ["missing"],
+    }
+    assert client.get(f"{API}/{restaurants[0]['id']}").json()["rating"] == 4
+    assert client.get(f"{API}/{restaurants[1]['id']}").json()["name"] == "Renamed"
+    untouched = client.get(f"{API}/{restaurants[2]['id']}").json()
+    assert (untouched["name"], untouched["rating"]) == (
+        restaurants[2]["name"],
+        restaurants[2]["rating"],
+    )
+
+
+def test_bulk_delete_by_ids_splits_the_missing_ones(client, restaurants):
+    ids = [restaurants[0]["id"], "missing", restaurants[5]["id"]]
+
+    response = client.post(f"{API}/bulk_delete", json={"ids": ids})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "succeeded": [restaurants[0]["id"], restaurants[5]["id"]],
+        "not_found": ["missing"],
+    }
+    assert client.get(f"{API}/{restaurants[0]['id']}").status_code == 404
+    assert client.get(f"{API}/{restaurants[1]['id']}").status_code == 200
+
+
+def test_bulk_delete_by_filters(client, restaurants):
+    response = client.post(f"{API}/bulk_delete", json={"filters": {"city": "Puebla"}})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert sorted(result["succeeded"]) == sorted(r["id"] for r in restaurants[:4])
+    assert result["not_found"] == []
+    remaining = client.get(f"{API}/", params={"limit": 20}).json()["data"]
+    assert sorted(r["id"] for r in remaining) == sorted(r["id"] for r in restaurants[4:])
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"filters": {}},
+        {"filters": {"city": None}},
+        {},
+        {"ids": ["a"], "filters": {"city": "Puebla"}},
+    ],
+)
+def test_bulk_delete_needs_ids_or_a_filter(client, restaurants, body):
+    response = client.post(f"{API}/bulk_delete", json=body)
+
+    assert response.status_code == 422
+    assert len(client.get(f"{API}/", params={"limit": 20}).json()["data"]) == 10
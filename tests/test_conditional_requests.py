@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import insert
+
+from app.models import Restaurant
+from benchmarks.dataset import generate
+
+API = "/api/v1/restaurants"
+
+
+@pytest.fixture
+def restaurants(empty_database) -> list[dict]:
+    from app.infrastructure.db import engine
+
+    rows = list(generate(5, seed=13))
+    with engine.begin() as connection:
+        connection.execute(insert(Restaurant.__table__), rows)
+    return rows
+
+
+def test_restaurant_is_not_modified_for_its_validators(client, restaurants):
+    url = f"{API}/{restaurants[0]['id']}"
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    by_etag = client.get(url, headers={"If-None-Match": etag})
+    by_date = client.get(url, headers={"If-Modified-Since": last_modified})
+    stale = client.get(url, headers={"If-None-Match": '"0"'})
+    older = client.get(
+        url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    )
+
+    assert response.status_code == 200
+    assert (by_etag.status_code, by_etag.headers["ETag"]) == (304, etag)
+    assert by_etag.content == b""
+    assert by_date.status_code == 304
+    assert stale.status_code == 200
+    assert older.status_code == 200
+
+
+def test_each_fieldset_has_its_own_etag(client, restaurants):
+    url = f"{API}/{restaurants[0]['id']}"
+    full = client.get(url).headers["ETag"]
+    names = client.get(url, params={"fields": "id,name"}).headers["ETag"]
+    ids = client.get(url, params={"fields": "id"}).headers["ETag"]
+
+    assert len({full, names, ids}) == 3
+    # Listed in another order, the same fieldset
+    assert client.get(url, params={"fields": "name,id"}).headers["ETag"] == names
+    response = client.get(url, params={"fields": "id"}, headers={"If-None-Match": full})
+    assert response.status_code == 200
+    assert response.json() == {"id": restaurants[0]["id"]}
+
+
+def test_listing_is_not_modified_until_a_row_changes(client, restaurants):
+    etag = client.get(f"{API}/").headers["ETag"]
+    fields_etag = client.get(f"{API}/", params={"fields": "id"}).headers["ETag"]
+
+    assert client.get(f"{API}/", headers={"If-None-Match": etag}).status_code == 304
+    assert fields_etag != etag
+
+    client.put(f"{API}/{restaurants[0]['id']}", json={"name": "Renamed"})
+    response = client.get(f"{API}/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_update_needs_a_matching_if_match(client, restaurants):
+    url = f"{API}/{restaurants[0]['id']}"
+    etag = client.get(url).headers["ETag"]
+
+    updated = client.put(url, json={"name": "First"}, headers={"If-Match": etag})
+    stale = client.put(url, json={"name": "Second"}, headers={"If-Match": etag})
+
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] != etag
+    assert stale.status_code == 412
+    assert client.get(url).json()["name"] == "First"
+    response = client.put(
+        url, json={"name": "Third"}, headers={"If-Match": updated.headers["ETag"]}
+    )
+    assert response.status_code == 200
+
+
+def test_delete_needs_a_matching_if_match(client, restaurants):
+    url = f"{API}/{restaurants[0]['id']}"
+    etag = client.get(url).headers["ETag"]
+    client.put(url, json={"name": "Renamed"})
+
+    stale = client.delete(url, headers={"If-Match": etag})
+    deleted = client.delete(url, headers={"If-Match": client.get(url).headers["ETag"]})
+
+    assert stale.status_code == 412
+    assert deleted.status_code == 200
+    assert client.get(url).status_code == 404
+
+
+@pytest.mark.parametrize("if_match", [None, '"5f3a"'])
+def test_writes_of_a_missing_restaurant_are_not_found(client, restaurants, if_match):
+    url = f"{API}/missing"
+    headers = {} if if_match is None else {"If-Match": if_match}
+
+    assert client.put(url, json={"name": "Ghost"}, headers=headers).status_code == 404
+    assert client.delete(url, headers=headers).status_code == 404
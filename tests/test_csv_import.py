@@ -0,0 +1,75 @@
+import csv
+import io
+import time
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.models import Restaurant
+from app.services import restaurant_services
+from app.services.restaurant_services import RestaurantService
+from benchmarks.dataset import FIELDS, generate
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1/restaurants"
+
+# Several batches, the duplicate and its original in different ones
+BATCH_SIZE = 8
+
+
+def csv_file(rows: list[dict], malformed: int) -> io.BytesIO:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    # Lines with one field too many
+    output.write(f"{','.join(['x'] * (len(FIELDS) + 1))}\r\n" * malformed)
+    return io.BytesIO(output.getvalue().encode())
+
+
+async def test_csv_import_counts_the_rejected_rows(repository, monkeypatch):
+    monkeypatch.setattr(restaurant_services.app_settings, "CSV_BATCH_SIZE", BATCH_SIZE)
+    rows = list(generate(30, seed=9))
+    invalid = [rows[1] | {"id": None, "rating": 9}, rows[2] | {"id": None, "email": "-"}]
+    duplicate = rows[3] | {"name": "Duplicate"}
+
+    file = csv_file(rows[:20] + invalid + [duplicate] + rows[20:], malformed=2)
+    result = await RestaurantService(repository).import_csv(file)
+
+    assert (result.rows_loaded, result.rows_rejected) == (30, 5)
+    statement = select(func.count(Restaurant.id))
+    assert (await repository.session.execute(statement)).scalar_one() == 30
+    names = select(Restaurant.name).where(Restaurant.id == rows[3]["id"])
+    assert (await repository.session.execute(names)).scalar_one() == rows[3]["name"]
+
+
+def test_background_import_is_tracked_until_it_succeeds(client, empty_database):
+    rows = list(generate(20, seed=10))
+    invalid = rows[1] | {"id": None, "rating": 9}
+
+    response = client.post(
+        f"{API}/bulk_create_from_csv",
+        params={"background": True},
+        files={"csv_file": ("restaurants.csv", csv_file(rows + [invalid], malformed=1))},
+    )
+
+    assert response.status_code == 202
+    location = response.headers["Location"]
+    assert location == f"{API}/imports/{response.json()['id']}"
+    for _ in range(100):
+        job = client.get(location).json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "succeeded"
+    assert (job["rows_loaded"], job["rows_rejected"]) == (20, 2)
+    assert job["rows_processed"] == 22
+
+
+def test_unknown_import_job_is_not_found(client):
+    response = client.get(f"{API}/imports/{uuid4()}")
+
+    assert response.status_code == 404
@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import sys
+from itertools import islice
+
+import pytest
+from sqlalchemy import create_engine, insert
+
+from app.core.settings.app_settings import make_async_uri
+from app.infrastructure.db import configure_backend
+from app.infrastructure.sqlite import create_schema
+from app.models import Restaurant
+from benchmarks.dataset import generate
+
+ROWS = 500_000
+# A buffered export of this many rows takes well over a gigabyte
+MAX_RSS_GROWTH_MB = 100
+
+# Runs the export against the app in a process of its own, so the peak RSS
+# is the one of the export. The body is counted as it is sent, without
+# keeping it
+EXPORT = """
+import asyncio
+import json
+import os
+import resource
+import sys
+
+import app.core.settings.loggin_config  # noqa: F401  # loads `.env` first
+
+os.environ.update(json.loads(sys.argv[1]))
+
+from app.infrastructure.db import dispose_engines
+from main import app
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def export():
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("test", 80),
+        "path": "/api/v1/restaurants/export",
+        "raw_path": b"/api/v1/restaurants/export",
+        "root_path": "",
+        "query_string": b"format=ndjson",
+        "headers": [],
+    }
+    requested = asyncio.Event()
+    result = {"status": None, "bytes": 0, "lines": 0}
+
+    async def receive():
+        if requested.is_set():
+            await asyncio.Event().wait()
+        requested.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        else:
+            body = message.get("body", b"")
+            result["bytes"] += len(body)
+            result["lines"] += body.count(b"\\n")
+
+    await app(scope, receive, send)
+    # Like the shutdown of the app, the connections hold threads
+    await dispose_engines()
+    return result
+
+
+before = peak_rss_mb()
+result = asyncio.run(export())
+result["rss_growth_mb"] = peak_rss_mb() - before
+print(json.dumps(result))
+"""
+
+
+def populate(database_uri: str, rows: int) -> None:
+    engine = create_engine(database_uri)
+    configure_backend(engine)
+    with engine.begin() as connection:
+        create_schema(connection)
+    restaurants = generate(rows, seed=5)
+    while batch := list(islice(restaurants, 10000)):
+        with engine.begin() as connection:
+            connection.execute(insert(Restaurant.__table__), batch)
+    engine.dispose()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs the resource module")
+def test_export_streams_in_bounded_memory(tmp_path):
+    database_uri = f"sqlite:///{tmp_path / 'export.db'}"
+    populate(database_uri, ROWS)
+    settings = {
+        "ENVIRONMENT": "test",
+        "SECRET_KEY": "test",
+        "DATABASE_URI": database_uri,
+        "ASYNC_DATABASE_URI": make_async_uri(database_uri),
+        "READ_REPLICA_URIS": "[]",
+        "STATISTICS_ENGINE": "database",
+        "STATISTICS_CACHE_ENABLED": "false",
+    }
+
+    process = subprocess.run(
+        [sys.executable, "-c", EXPORT, json.dumps(settings)],
+        cwd=tmp_path,
+        env=os.environ | {"PYTHONPATH": os.getcwd()},
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=600,
+    )
+    result = json.loads(process.stdout.splitlines()[-1])
+
+    assert result["status"] == 200
+    assert result["lines"] == ROWS
+    assert result["rss_growth_mb"] < MAX_RSS_GROWTH_MB, result
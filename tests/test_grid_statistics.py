@@ -0,0 +1,82 @@
+import math
+import statistics
+from collections import defaultdict
+
+import pytest
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
+
+from app.repositories.restaurant_repository import RestaurantRepository
+from app.utils.errors import AppError
+from app.utils.geo import grid_shape
+from benchmarks.dataset import generate
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1/restaurants"
+
+# Around Mexico City, with its north and east edges inside the last cells
+BOX = (19.2, -99.4, 19.65, -98.9)
+CELL_SIZE = 0.1
+
+
+def expected_grid(rows: list[dict]) -> dict:
+    min_lat, min_lng, max_lat, max_lng = BOX
+    grid_rows, grid_cols = grid_shape(*BOX, CELL_SIZE)
+    cells = defaultdict(list)
+    for row in rows:
+        if min_lat <= row["lat"] <= max_lat and min_lng <= row["lng"] <= max_lng:
+            y = min(math.floor((row["lat"] - min_lat) / CELL_SIZE), grid_rows - 1)
+            x = min(math.floor((row["lng"] - min_lng) / CELL_SIZE), grid_cols - 1)
+            cells[y, x].append(row["rating"])
+    return {
+        (y, x): (len(ratings), statistics.mean(ratings))
+        for (y, x), ratings in sorted(cells.items())
+    }
+
+
+async def test_grid_statistics_of_each_cell(repository):
+    rows = list(generate(3000, seed=8))
+    await repository.bulk_create(rows, 1000)
+
+    result = await repository.get_grid_statistics(*BOX, CELL_SIZE)
+
+    expected = expected_grid(rows)
+    assert list(zip(result["row"], result["col"])) == list(expected)
+    assert result["count"] == [count for count, _ in expected.values()]
+    assert result["avg"] == pytest.approx([avg for _, avg in expected.values()])
+
+
+class RecordingSession:
+    """
+    Session keeping the statements it is given, without a database
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        raise ConnectionRefusedError("no database")
+
+
+async def test_grid_statistics_group_by_the_selected_cells():
+    session = RecordingSession()
+    repository = RestaurantRepository(session, session)
+
+    result = await repository.get_grid_statistics(*BOX, CELL_SIZE)
+    assert isinstance(result, AppError)
+
+    # asyncpg binds each copy of an expression to parameters of its own
+    sql = str(session.statements[0].compile(dialect=PGDialect_asyncpg()))
+    grouping = sql[sql.index("GROUP BY") :]
+    assert grouping == "GROUP BY cells.row, cells.col ORDER BY cells.row, cells.col"
+
+
+@pytest.mark.parametrize("cell_size", [5e-324, 1e-300])
+async def test_grid_of_too_small_cells_is_rejected(client, cell_size):
+    response = client.get(
+        f"{API}/statistics/grid",
+        params={"bbox": "-99.4,19.2,-98.9,19.65", "cell_size": cell_size},
+    )
+
+    assert response.status_code == 400
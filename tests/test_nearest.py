@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import insert
+
+from app.models import Restaurant
+from app.utils.geo import haversine_distance
+from benchmarks.dataset import generate
+
+API = "/api/v1/restaurants"
+CENTER = (19.4326, -99.1332)
+
+
+@pytest.fixture
+def restaurants(empty_database) -> list[dict]:
+    """
+    Restaurants of a seeded dataset, three of them at the same point so the
+    pages have to break the ties on `id`
+    """
+    from app.infrastructure.db import engine
+
+    rows = list(generate(300, seed=14))
+    for row in rows[:3]:
+        row.update(lat=CENTER[0] + 0.001, lng=CENTER[1])
+    with engine.begin() as connection:
+        connection.execute(insert(Restaurant.__table__), rows)
+    return rows
+
+
+def by_distance(rows: list[dict]) -> list[tuple[float, str]]:
+    return sorted(
+        (haversine_distance(r["lat"], r["lng"], *CENTER), r["id"]) for r in rows
+    )
+
+
+def walk_nearest(client, k: int, **params) -> list[dict]:
+    found, cursor = [], None
+    while True:
+        response = client.get(
+            f"{API}/nearest",
+            params={"latitude": CENTER[0], "longitude": CENTER[1], "k": k}
+            | params
+            | ({"cursor": cursor} if cursor else {}),
+        )
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["data"]) <= k
+        found += page["data"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return found
+
+
+def test_nearest_restaurants_are_sorted_by_distance(client, restaurants):
+    response = client.get(
+        f"{API}/nearest", params={"latitude": CENTER[0], "longitude": CENTER[1], "k": 5}
+    )
+
+    data = response.json()["data"]
+    expected = by_distance(restaurants)[:5]
+    assert [row["id"] for row in data] == [id for _, id in expected]
+    assert [row["distance"] for row in data] == pytest.approx(
+        [distance for distance, _ in expected]
+    )
+
+
+def test_nearest_restaurants_within_max_distance(client, restaurants):
+    found = walk_nearest(client, 50, max_distance=20000)
+
+    expected = [(d, id) for d, id in by_distance(restaurants) if d <= 20000]
+    assert 0 < len(expected) < len(restaurants)
+    assert [row["id"] for row in found] == [id for _, id in expected]
+
+
+def test_nearest_cursor_continues_across_ties(client, restaurants):
+    found = walk_nearest(client, 2, max_distance=50000)
+
+    expected = [id for d, id in by_distance(restaurants) if d <= 50000]
+    assert [row["id"] for row in found] == expected
+
+
+def test_nearest_rejects_a_malformed_cursor(client, restaurants):
+    response = client.get(
+        f"{API}/nearest",
+        params={"latitude": CENTER[0], "longitude": CENTER[1], "cursor": "nope"},
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,127 @@
+import base64
+from datetime import datetime as dt
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.models import Restaurant
+from app.utils import decode_cursor, encode_cursor
+from benchmarks.dataset import generate
+
+API = "/api/v1/restaurants"
+
+
+def raw_cursor(payload: bytes) -> str:
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ["2023-02-01T10:00:00.123456", "9b2d4a8e-2f0c-4a51-9a3e-6f1c0d7e5b21"],
+        [0.875, "a"],
+        ["ünïcödé", None, 3],
+        [],
+    ],
+)
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(values)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == values
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor!",
+        "€",
+        raw_cursor(b"not json"),
+        raw_cursor(b'{"created_at": "2023-02-01"}'),
+        raw_cursor(b"42"),
+    ],
+)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor!",
+        raw_cursor(b"not json"),
+        raw_cursor(b'{"created_at": "2023-02-01"}'),
+        encode_cursor([]),
+        encode_cursor(["2023-02-01T10:00:00"]),
+        encode_cursor(["yesterday", "a"]),
+        encode_cursor([1675245600, "a"]),
+        encode_cursor([["2023-02-01"], "a"]),
+        encode_cursor(["2023-02-01T10:00:00", "a", "b"]),
+    ],
+)
+def test_listing_rejects_malformed_cursors(client, empty_database, cursor):
+    response = client.get(f"{API}/", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.fixture
+def restaurants(empty_database) -> list[dict]:
+    """
+    Restaurants sharing their `created_at` three by three, so the pages
+    have to break the ties on `id`
+    """
+    from app.infrastructure.db import engine
+
+    start = dt(2023, 2, 1, 10)
+    rows = [
+        restaurant | {"created_at": start + timedelta(seconds=index // 3)}
+        for index, restaurant in enumerate(generate(20, seed=4))
+    ]
+    with engine.begin() as connection:
+        connection.execute(insert(Restaurant.__table__), rows)
+    return rows
+
+
+def walk_listing(client, limit: int, descending: bool) -> list[str]:
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, "descending": descending}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = client.get(f"{API}/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["data"]) <= limit
+        ids += [restaurant["id"] for restaurant in page["data"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+@pytest.mark.parametrize("descending", [False, True])
+def test_listing_pages_break_ties_on_id(client, restaurants, limit, descending):
+    expected = [
+        r["id"]
+        for r in sorted(
+            restaurants,
+            key=lambda r: (r["created_at"], r["id"]),
+            reverse=descending,
+        )
+    ]
+
+    assert walk_listing(client, limit, descending) == expected
+
+
+def test_listing_cursor_holds_the_key_of_the_last_row(client, restaurants):
+    last = sorted(restaurants, key=lambda r: (r["created_at"], r["id"]))[3]
+
+    page = client.get(f"{API}/", params={"limit": 4}).json()
+    created_at, last_id = decode_cursor(page["next_cursor"])
+
+    assert last_id == page["data"][-1]["id"] == last["id"]
+    assert dt.fromisoformat(created_at) == last["created_at"]
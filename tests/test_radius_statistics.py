@@ -0,0 +1,256 @@
+import math
+import random
+import statistics
+
+import pytest
+from sqlalchemy import func, insert, text
+from sqlmodel import select
+
+from app.infrastructure.statistics_cache import StatisticsCache
+from app.models import Restaurant
+from app.schemas import StatisticsCircle
+from app.services import restaurant_services
+from app.services.restaurant_services import RestaurantService
+from app.utils.geo import haversine_distance
+from benchmarks.dataset import generate
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1/restaurants"
+CENTER = (19.4326, -99.1332)
+
+# Circles whose boundary cells reach the poles or the antimeridian
+EDGE_CIRCLES = [
+    (89.9, 0.0, 50000),
+    (-89.95, 45.0, 20000),
+    (10.0, 179.95, 20000),
+    (-10.0, -179.95, 20000),
+]
+
+
+# Radius of the sphere of `ST_DWithin` without the spheroid, the mean radius
+# of WGS84
+POSTGIS_RADIUS_M = (2 * 6378137.0 + 6356752.314245179) / 3
+
+
+def postgis_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Sphere distance in meters of PostGIS, the `sphere_distance` of
+    liblwgeom, a formula other than the haversine of the SQLite backend
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    d_lng = lng2 - lng1
+    a = math.hypot(
+        math.cos(lat2) * math.sin(d_lng),
+        math.cos(lat1) * math.sin(lat2)
+        - math.sin(lat1) * math.cos(lat2) * math.cos(d_lng),
+    )
+    b = math.sin(lat1) * math.sin(lat2) + math.cos(lat1) * math.cos(lat2) * math.cos(
+        d_lng
+    )
+    return math.atan2(a, b) * POSTGIS_RADIUS_M
+
+
+def expected_statistics(rows: list[dict], lat: float, lng: float, radius: float):
+    ratings = [
+        row["rating"]
+        for row in rows
+        if haversine_distance(row["lat"], row["lng"], lat, lng) <= radius
+    ]
+    return len(ratings), sum(ratings) / len(ratings)
+
+
+@pytest.mark.parametrize("radius", [500, 2000, 10000])
+async def test_radius_statistics_match_the_distances(repository, radius):
+    rows = list(generate(2000, seed=1))
+    await repository.bulk_create(rows, 1000)
+
+    result = await repository.get_near_restaurants_by_radius(*CENTER, radius)
+
+    count, avg = expected_statistics(rows, *CENTER, radius)
+    assert result["count"] == count
+    assert float(result["avg"]) == pytest.approx(avg)
+
+
+async def test_radius_filter_is_answered_by_the_gist_index(postgres_repository):
+    await postgres_repository.bulk_create(list(generate(5000, seed=2)), 1000)
+    statement = select(func.count(Restaurant.id)).where(
+        postgres_repository.within_radius(*CENTER, 1000)
+    )
+    connection = await postgres_repository.session.connection()
+    sql = statement.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+
+    await connection.exec_driver_sql("ANALYZE restaurant")
+    # Only tells whether the index can answer the filter, a table this small
+    # may be cheaper to scan
+    await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plan = (await connection.exec_driver_sql(f"EXPLAIN {sql}")).scalars().all()
+
+    assert any("idx_restaurant_location" in line for line in plan), "\n".join(plan)
+
+
+async def test_rollup_statistics_at_the_edges_of_the_grid(postgres_repository):
+    rng = random.Random(7)
+    rows = []
+    for lat, lng, _ in EDGE_CIRCLES:
+        for restaurant in generate(1000, seed=len(rows)):
+            point_lat = min(max(rng.gauss(lat, 0.3), -90), 90)
+            point_lng = (rng.gauss(lng, 0.3) + 180) % 360 - 180
+            rows.append(restaurant | {"lat": point_lat, "lng": point_lng})
+    await postgres_repository.bulk_create(rows, 1000)
+
+    for lat, lng, radius in EDGE_CIRCLES:
+        expected = await postgres_repository.get_near_restaurants_by_radius(
+            lat, lng, radius
+        )
+        result = await postgres_repository.get_near_restaurants_by_radius_from_rollups(
+            lat, lng, radius
+        )
+
+        # The same sums, the rollups only divide them in floats instead of
+        # numerics, so the average and deviation may differ in the last bits
+        circle = f"{radius} m around ({lat}, {lng})"
+        assert result["count"] == expected["count"], circle
+        assert float(result["avg"]) == pytest.approx(float(expected["avg"])), circle
+        assert float(result["std"]) == pytest.approx(float(expected["std"])), circle
+
+
+# Totals of the restaurants of each cell, as the rollup migration adds them up
+CELL_TOTALS = text(
+    """
+    SELECT l.level, floor(r.lat / l.size)::int, floor(r.lng / l.size)::int,
+           count(*), sum(r.rating), sum(r.rating * r.rating)
+    FROM restaurant AS r
+    CROSS JOIN (VALUES (0, 1.0::float8), (1, 0.1::float8), (2, 0.01::float8))
+        AS l(level, size)
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    """
+)
+ROLLUPS = text(
+    """
+    SELECT level, cell_y, cell_x, count, rating_sum, rating_sq_sum, xmin::text
+    FROM restaurant_cell_rollup
+    WHERE count > 0
+    ORDER BY 1, 2, 3
+    """
+)
+
+
+async def test_rollups_only_follow_the_updates_of_cells_and_ratings(
+    postgres_repository,
+):
+    rows = list(generate(300, seed=11))
+    await postgres_repository.bulk_create(rows, 1000)
+
+    async def rollups() -> list:
+        return (await postgres_repository.session.execute(ROLLUPS)).all()
+
+    before = await rollups()
+    renamed = [{"id": row["id"], "name": f"{row['name']} II"} for row in rows]
+    await postgres_repository.bulk_update(renamed, 1000)
+    # Not even written, the row versions are the same
+    assert await rollups() == before
+
+    moved = [
+        {"id": row["id"], "lat": row["lat"] + 0.5, "rating": (row["rating"] + 1) % 5}
+        for row in rows[:100]
+    ]
+    await postgres_repository.bulk_update(moved, 1000)
+    await postgres_repository.update(rows[100]["id"], {"id": "renamed", "lng": 0.5})
+
+    totals = (await postgres_repository.session.execute(CELL_TOTALS)).all()
+    assert [rollup[:6] for rollup in await rollups()] == [tuple(t) for t in totals]
+
+
+@pytest.mark.parametrize(
+    "circle",
+    [
+        {"latitude": 91, "longitude": 0, "radius": 1000},
+        {"latitude": 0, "longitude": -180.5, "radius": 1000},
+        {"latitude": 0, "longitude": 0, "radius": -1},
+    ],
+)
+async def test_batch_circles_are_validated(client, circle):
+    response = client.post(f"{API}/statistics/batch", json=[circle])
+
+    assert response.status_code == 422
+
+
+class EngineRepository:
+    """
+    Repository answering the radius statistics of any circle with its center,
+    recording the engine and whether the primary was read
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    async def answer(self, engine, circles, primary):
+        self.calls.append((engine, circles, primary))
+        return [{"count": 1, "avg": lat, "std": lng} for lat, lng, _ in circles]
+
+    async def get_near_restaurants_by_radius(self, lat, lng, radius, primary=False):
+        return (await self.answer("database", [(lat, lng, radius)], primary))[0]
+
+    async def get_near_restaurants_by_radius_batch(self, circles, primary=False):
+        return await self.answer("database", circles, primary)
+
+    async def get_near_restaurants_by_radius_from_rollups(
+        self, lat, lng, radius, primary=False
+    ):
+        return (await self.answer("rollup", [(lat, lng, radius)], primary))[0]
+
+
+@pytest.mark.parametrize("engine", ["database", "rollup"])
+async def test_batch_shares_the_engine_and_the_cache_of_a_circle(engine, monkeypatch):
+    monkeypatch.setattr(restaurant_services.app_settings, "STATISTICS_ENGINE", engine)
+    repository = EngineRepository()
+    service = RestaurantService(repository)
+    service.statistics_cache = StatisticsCache(10, 60, 4, 0.5)
+    circles = [(*CENTER, 1000), (25.6866, -100.3161, 1000), (*CENTER, 2000)]
+
+    single = await service.count_restaurants_by_radius(*circles[0])
+    batch = await service.count_restaurants_by_radius_batch(
+        [
+            StatisticsCircle(latitude=lat, longitude=lng, radius=radius)
+            for lat, lng, radius in circles
+        ]
+    )
+
+    assert batch[0] == single
+    assert [(result.avg, result.std) for result in batch] == [c[:2] for c in circles]
+    computed = [circle for _, found, _ in repository.calls for circle in found]
+    assert computed == circles
+    assert {(call[0], call[2]) for call in repository.calls} == {(engine, True)}
+
+
+@pytest.mark.parametrize("radius", [0, 500, 2000, 10000, 50000])
+def test_sqlite_statistics_match_postgis(client, empty_database, radius):
+    from app.infrastructure.db import engine
+
+    rows = list(generate(2000, seed=12))
+    # A restaurant at the center, found by a radius of 0
+    rows[0] |= {"lat": CENTER[0], "lng": CENTER[1]}
+    with engine.begin() as connection:
+        connection.execute(insert(Restaurant.__table__), rows)
+
+    response = client.get(
+        f"{API}/statistics",
+        params={"latitude": CENTER[0], "longitude": CENTER[1], "radius": radius},
+    )
+
+    ratings = [
+        row["rating"]
+        for row in rows
+        if postgis_distance(row["lat"], row["lng"], *CENTER) <= radius
+    ]
+    result = response.json()
+    assert result["count"] == len(ratings)
+    # Equal up to the rounding of the sums, the sample standard deviation is
+    # 0 below two ratings like the NULL `stddev` of PostgreSQL
+    assert result["avg"] == pytest.approx(statistics.mean(ratings))
+    std = statistics.stdev(ratings) if len(ratings) > 1 else 0
+    assert result["std"] == pytest.approx(std)
@@ -0,0 +1,143 @@
+# isort: skip_file
+from typing import Optional
+
+import anyio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.infrastructure import db
+from app.infrastructure.db_pool import PoolMetrics
+from app.infrastructure.db_replicas import ReplicaSet
+from app.infrastructure.sqlite import create_schema
+from app.infrastructure.statistics_cache import StatisticsCache
+from app.repositories.sqlite_restaurant_repository import SQLiteRestaurantRepository
+from app.schemas import RestaurantCreate
+from app.services.restaurant_services import RestaurantService
+from benchmarks.dataset import generate
+
+pytestmark = pytest.mark.anyio
+
+EJECTION_TIME = 0.2
+
+
+async def create_engine(path, name: str):
+    engine = db.create_api_engine(f"sqlite+aiosqlite:///{path}", PoolMetrics())
+    async with engine.begin() as connection:
+        await connection.exec_driver_sql("CREATE TABLE origin (name TEXT)")
+        await connection.execute(
+            text("INSERT INTO origin VALUES (:name)"), {"name": name}
+        )
+    return engine
+
+
+@pytest.fixture
+async def replicas(tmp_path, monkeypatch):
+    """
+    The read sessions of the app on a primary and a replica database, each
+    telling its name
+    """
+    primary = await create_engine(tmp_path / "primary.db", "primary")
+    replica = await create_engine(tmp_path / "replica.db", "replica")
+    replica_set = ReplicaSet([replica], [PoolMetrics()], EJECTION_TIME)
+    monkeypatch.setattr(db, "async_engine", primary)
+    monkeypatch.setattr(db, "read_replicas", replica_set)
+    yield replica_set
+    await primary.dispose()
+    await replica_set.dispose()
+
+
+async def read_origin(x_read_your_writes: Optional[str] = None) -> str:
+    sessions = db.get_db_read_session(x_read_your_writes)
+    session = await sessions.__anext__()
+    try:
+        return (await session.execute(text("SELECT name FROM origin"))).scalar_one()
+    finally:
+        await sessions.aclose()
+
+
+async def stop(monkeypatch, engine) -> None:
+    """
+    Drops the connections of the engine and refuses new ones, like a
+    database that went down
+    """
+
+    def connect(*args, **kwargs):
+        raise ConnectionRefusedError("replica is down")
+
+    monkeypatch.setattr(engine.sync_engine.dialect, "connect", connect)
+    await engine.dispose()
+
+
+async def test_reads_go_to_the_replica(replicas):
+    assert await read_origin() == "replica"
+    assert await read_origin("false") == "replica"
+
+
+async def test_read_your_writes_go_to_the_primary(replicas):
+    assert await read_origin("true") == "primary"
+    assert await read_origin("1") == "primary"
+
+
+async def test_reads_fall_back_to_the_primary_and_recover(replicas, monkeypatch):
+    assert await read_origin() == "replica"
+
+    with monkeypatch.context() as patch:
+        await stop(patch, replicas.engines[0])
+
+        # The read landing on the replica ejects it and is retried
+        assert await read_origin() == "primary"
+        assert [replica["healthy"] for replica in replicas.status()] == [False]
+        assert await read_origin() == "primary"
+
+    # Back up, but still ejected
+    assert await read_origin() == "primary"
+
+    await anyio.sleep(EJECTION_TIME + 0.05)
+    assert await read_origin() == "replica"
+    assert [replica["healthy"] for replica in replicas.status()] == [True]
+
+
+async def test_replicas_are_chosen_round_robin_skipping_the_ejected(tmp_path):
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path / n}") for n in "abc"]
+    replica_set = ReplicaSet(engines, [PoolMetrics() for _ in engines], 60)
+
+    assert [replica_set.choose() for _ in range(6)] == engines * 2
+
+    replica_set.eject(1)
+    chosen = [replica_set.choose() for _ in range(6)]
+    assert engines[1] not in chosen
+    assert set(chosen) == {engines[0], engines[2]}
+
+    for index in range(len(engines)):
+        replica_set.eject(index)
+    assert replica_set.choose() is None
+    await replica_set.dispose()
+
+
+async def test_cached_statistics_see_the_writes_of_the_worker(tmp_path):
+    primary, replica = (
+        db.create_api_engine(f"sqlite+aiosqlite:///{tmp_path / name}", PoolMetrics())
+        for name in ("primary.db", "replica.db")
+    )
+    # The replica never catches up with the primary
+    for engine in (primary, replica):
+        async with engine.begin() as connection:
+            await connection.run_sync(create_schema)
+
+    row = next(generate(1, seed=10))
+    circle = (row["lat"], row["lng"], 100)
+    async with AsyncSession(primary, expire_on_commit=False) as session:
+        async with AsyncSession(replica) as read_session:
+            service = RestaurantService(
+                SQLiteRestaurantRepository(session, read_session)
+            )
+            service.statistics_cache = StatisticsCache(10, 60, 4, 0.5)
+
+            assert (await service.count_restaurants_by_radius(*circle)).count == 0
+            await service.create(RestaurantCreate(**row))
+            assert (await service.count_restaurants_by_radius(*circle)).count == 1
+
+    await primary.dispose()
+    await replica.dispose()
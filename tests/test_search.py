@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import insert
+
+from app.models import Restaurant
+from benchmarks.dataset import generate
+
+API = "/api/v1/restaurants"
+CENTER = (19.4326, -99.1332)
+FAR = (25.6866, -100.3161)
+
+# Name and position of the restaurants to search, on top of unrelated ones
+SEARCHED = [
+    ("Orinoco Grill", CENTER),
+    ("Cafe Orinocco", (CENTER[0] + 0.01, CENTER[1])),
+    ("Orinoco Express", FAR),
+    ("Taqueria Sol", CENTER),
+]
+
+
+@pytest.fixture
+def restaurants(empty_database) -> dict[str, dict]:
+    """
+    Restaurants of `SEARCHED` by name, with streets and cities no query
+    matches
+    """
+    from app.infrastructure.db import engine
+
+    rows = list(generate(20, seed=16))
+    for row, (name, (lat, lng)) in zip(rows, SEARCHED):
+        row.update(name=name, street="Calle 5", city="Ciudad", lat=lat, lng=lng)
+    with engine.begin() as connection:
+        connection.execute(insert(Restaurant.__table__), rows)
+    return {row["name"]: row for row in rows}
+
+
+def search(client, q: str, **params) -> list[dict]:
+    response = client.get(f"{API}/search", params={"q": q} | params)
+    assert response.status_code == 200
+    return response.json()["data"]
+
+
+def test_search_ranks_the_exact_matches_first(client, restaurants):
+    found = search(client, "orinoco")
+
+    names = [row["name"] for row in found]
+    assert names[:2] == sorted(
+        ["Orinoco Grill", "Orinoco Express"], key=lambda name: restaurants[name]["id"]
+    )
+    assert names[2:] == ["Cafe Orinocco"]
+    assert [row["score"] for row in found] == pytest.approx([1, 1, 7 / 8])
+
+
+def test_search_matches_typos_and_prefixes(client, restaurants):
+    assert {row["name"] for row in search(client, "Orinocco")} == {
+        "Orinoco Grill",
+        "Cafe Orinocco",
+        "Orinoco Express",
+    }
+    assert "Taqueria Sol" in {row["name"] for row in search(client, "taqu")}
+    assert search(client, "zzyzx") == []
+
+
+def test_search_within_a_radius(client, restaurants):
+    found = search(
+        client, "orinoco", latitude=CENTER[0], longitude=CENTER[1], radius=5000
+    )
+
+    assert [row["name"] for row in found] == ["Orinoco Grill", "Cafe Orinocco"]
+
+
+def test_search_pages_follow_the_ranking(client, restaurants):
+    names, cursor = [], None
+    while True:
+        params = {"limit": 1} | ({"cursor": cursor} if cursor else {})
+        response = client.get(f"{API}/search", params={"q": "orinoco"} | params)
+        names += [row["name"] for row in response.json()["data"]]
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    assert names == [row["name"] for row in search(client, "orinoco")]
+
+
+def test_search_needs_the_whole_circle(client, restaurants):
+    response = client.get(
+        f"{API}/search", params={"q": "orinoco", "latitude": CENTER[0]}
+    )
+
+    assert response.status_code == 400
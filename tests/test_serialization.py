@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.schemas import Restaurant as RestaurantSchema
+from app.schemas import RestaurantPage
+from app.utils.serialization import FastJSONResponse
+
+ROW = {
+    "id": "9b2d4a8e-2f0c-4a51-9a3e-6f1c0d7e5b21",
+    "rating": 3,
+    "name": "Café Ñandú",
+    "site": None,
+    "email": None,
+    "phone": "534 814 7903",
+    "street": "Calle de Tacuba 28",
+    "city": "Mexico City",
+    "state": "CDMX",
+    "lat": 19.4355411,
+    "lng": -99.1377702,
+    "created_at": datetime(2023, 2, 1, 10, 0, 0, 123456),
+    "updated_at": datetime(2023, 2, 8, 9, 31, 17, tzinfo=timezone.utc),
+}
+
+
+def test_row_matches_the_response_schema():
+    assert list(ROW) == list(RestaurantSchema.__fields__)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        ROW,
+        {"data": [ROW, ROW | {"updated_at": None}], "next_cursor": None},
+        {"data": [], "next_cursor": "WyIyMDIzLTAyLTAxIl0"},
+        ROW | {"lat": Decimal("19.4355411"), "rating": 0},
+    ],
+)
+def test_fast_response_matches_the_encoded_one(content):
+    expected = JSONResponse(jsonable_encoder(content)).body
+
+    assert FastJSONResponse(content).body == expected
+
+
+def test_fast_response_matches_the_response_model():
+    page = {"data": [ROW], "next_cursor": None}
+    expected = JSONResponse(jsonable_encoder(RestaurantPage(**page))).body
+
+    assert FastJSONResponse(page).body == expected
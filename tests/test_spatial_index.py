@@ -0,0 +1,83 @@
+import math
+import random
+
+import pytest
+
+from app.infrastructure.spatial_index import RestaurantSpatialIndex
+from app.utils.geo import EARTH_RADIUS_M
+from benchmarks.dataset import generate
+
+pytestmark = pytest.mark.anyio
+
+# Circles around the poles and across the antimeridian too
+CIRCLES = [
+    (19.4326, -99.1332, 100),
+    (19.4326, -99.1332, 5000),
+    (-33.45, -70.66, 50000),
+    (89.999, 0.0, 5000),
+    (-89.95, 120.0, 50000),
+    (0.0, 179.999, 5000),
+    (-16.5, -179.99, 50000),
+    (65.0, 180.0, 100),
+]
+
+
+def destination(lat: float, lng: float, distance: float, bearing: float):
+    """
+    Point `distance` meters away from the given one in the direction of the
+    bearing, in radians, on the sphere of PostGIS
+    """
+    angle = distance / EARTH_RADIUS_M
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2 = math.asin(
+        math.sin(lat1) * math.cos(angle)
+        + math.cos(lat1) * math.sin(angle) * math.cos(bearing)
+    )
+    lng2 = lng1 + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat1),
+        math.cos(angle) - math.sin(lat1) * math.sin(lat2),
+    )
+    lng2 = (math.degrees(lng2) + 180) % 360 - 180
+    return math.degrees(lat2), lng2
+
+
+def random_points(rng: random.Random) -> list[tuple[float, float]]:
+    """
+    Points spread over the globe, around each circle, and on both sides of
+    each circle boundary, a millionth of the radius away
+    """
+    points = [
+        (math.degrees(math.asin(rng.uniform(-1, 1))), rng.uniform(-180, 180))
+        for _ in range(500)
+    ]
+    for lat, lng, radius in CIRCLES:
+        for _ in range(100):
+            distance = radius * rng.uniform(0, 2)
+            points.append(destination(lat, lng, distance, rng.uniform(0, 2 * math.pi)))
+        for _ in range(50):
+            bearing = rng.uniform(0, 2 * math.pi)
+            points.append(destination(lat, lng, radius * (1 - 1e-6), bearing))
+            points.append(destination(lat, lng, radius * (1 + 1e-6), bearing))
+    return points
+
+
+async def test_index_statistics_match_the_database(repository):
+    rng = random.Random(0)
+    points = random_points(rng)
+    rows = [
+        restaurant | {"lat": lat, "lng": lng}
+        for restaurant, (lat, lng) in zip(generate(len(points), seed=3), points)
+    ]
+    await repository.bulk_create(rows, 1000)
+
+    index = RestaurantSpatialIndex(cell_size=0.05)
+    index.build((r["id"], r["lat"], r["lng"], r["rating"]) for r in rows)
+
+    for lat, lng, radius in CIRCLES:
+        expected = await repository.get_near_restaurants_by_radius(lat, lng, radius)
+        result = index.radius_statistics(lat, lng, radius)
+
+        circle = f"{radius} m around ({lat}, {lng})"
+        assert result["count"] == expected["count"], circle
+        assert result["avg"] == pytest.approx(float(expected["avg"])), circle
+        assert result["std"] == pytest.approx(float(expected["std"])), circle
@@ -0,0 +1,109 @@
+import pytest
+
+from app.infrastructure import statistics_cache as cache_module
+from app.infrastructure.statistics_cache import StatisticsCache
+from app.schemas import RestaurantCountResponse
+from app.services.restaurant_services import RestaurantService
+
+pytestmark = pytest.mark.anyio
+
+CENTER = (19.4326, -99.1332)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Monotonic clock of the cache, moved forward by hand
+    """
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(clock) -> StatisticsCache:
+    return StatisticsCache(max_size=4, ttl=30, precision=4, region_size=0.5)
+
+
+def fill(cache: StatisticsCache, lat: float, lng: float, radius: int, value):
+    key = cache.make_key(lat, lng, radius)
+    cached, token = cache.get(key)
+    assert cached is None
+    cache.put(key, value, token)
+    return key
+
+
+def test_hits_share_the_rounded_key(cache):
+    fill(cache, *CENTER, 1000, "value")
+
+    key = cache.make_key(CENTER[0] + 0.00001, CENTER[1], 1000)
+    assert cache.get(key)[0] == "value"
+    assert cache.get(cache.make_key(*CENTER, 2000))[0] is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    key = fill(cache, *CENTER, 1000, "value")
+
+    clock[0] += 29
+    assert cache.get(key)[0] == "value"
+    clock[0] += 2
+    assert cache.get(key)[0] is None
+
+
+def test_writes_invalidate_the_overlapping_circles_only(cache):
+    near = fill(cache, *CENTER, 1000, "near")
+    far = fill(cache, 25.6866, -100.3161, 1000, "far")
+
+    cache.invalidate([(CENTER[0] + 0.001, CENTER[1])])
+
+    assert cache.get(near)[0] is None
+    assert cache.get(far)[0] == "far"
+
+
+def test_values_computed_across_a_write_are_stale(cache):
+    key = cache.make_key(*CENTER, 1000)
+    _, token = cache.get(key)
+    cache.invalidate([CENTER])
+    cache.put(key, "computed before the write", token)
+
+    assert cache.get(key)[0] is None
+
+
+def test_region_versions_are_evicted_with_the_entries(cache):
+    # Each circle inside a region of its own
+    for index in range(50):
+        fill(cache, 10.25 + index, 10.25, 1000, index)
+        cache.invalidate([(10.25 + index, 10.25)])
+
+    assert cache.stats()["size"] == cache.max_size
+    assert len(cache._region_versions) == cache.max_size
+    assert cache.evictions == 46
+
+
+class RecordingRepository:
+    """
+    Repository answering the radius statistics of any circle with its center
+    """
+
+    def __init__(self):
+        self.circles = []
+
+    async def get_near_restaurants_by_radius(self, lat, lng, radius, primary=False):
+        self.circles.append((lat, lng, radius, primary))
+        return {"count": len(self.circles), "avg": lat, "std": lng}
+
+
+async def test_misses_are_answered_for_the_requested_point(cache):
+    repository = RecordingRepository()
+    service = RestaurantService(repository)
+    service.statistics_cache = cache
+    point = (19.43264, -99.13316)
+
+    first = await service.count_restaurants_by_radius(*point, 1000)
+    second = await service.count_restaurants_by_radius(*CENTER, 1000)
+
+    assert repository.circles == [(*point, 1000, True)]
+    assert (
+        first == second == RestaurantCountResponse(count=1, avg=point[0], std=point[1])
+    )